@@ -0,0 +1,38 @@
+"""Meter AI history usage
+
+Revision ID: 9b1d4e7a2c63
+Revises: 3f5c2eff0247
+Create Date: 2026-10-17 13:40:12.518934
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9b1d4e7a2c63'
+down_revision: Union[str, Sequence[str], None] = '3f5c2eff0247'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('ai_history', sa.Column('prompt_tokens', sa.Integer(), nullable=True))
+    op.add_column('ai_history', sa.Column('completion_tokens', sa.Integer(), nullable=True))
+    op.add_column('ai_history', sa.Column('llm_calls', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('ai_history', sa.Column('latency_ms', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('ai_history', sa.Column('cache_status', sa.String(length=20), server_default='miss', nullable=False))
+    op.add_column('ai_history', sa.Column('succeeded', sa.Boolean(), server_default='true', nullable=False))
+    op.create_index(op.f('ix_ai_history_user_id'), 'ai_history', ['user_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_ai_history_user_id'), table_name='ai_history')
+    op.drop_column('ai_history', 'succeeded')
+    op.drop_column('ai_history', 'cache_status')
+    op.drop_column('ai_history', 'latency_ms')
+    op.drop_column('ai_history', 'llm_calls')
+    op.drop_column('ai_history', 'completion_tokens')
+    op.drop_column('ai_history', 'prompt_tokens')
@@ -1,5 +1,7 @@
+import os
+import tempfile
 from pydantic_settings import BaseSettings
-from typing import List, Union
+from typing import Any, Dict, List, Optional, Union
 
 from pydantic import validator
 
@@ -17,7 +19,16 @@ class Settings(BaseSettings):
             return json.loads(v)
         return v
     
-    groq_api_key: str    
+    # LLM provider: "groq", or "fake" for offline load testing and CI
+    llm_provider: str = "groq"
+    llm_model: str = "llama-3.1-8b-instant"
+    groq_api_key: Optional[str] = None
+
+    # Fake provider behaviour
+    fake_llm_latency_ms: int = 800
+    fake_llm_jitter_ms: int = 400
+    fake_llm_error_rate: float = 0.0
+    fake_llm_seed: Optional[int] = None
     
     database_url: str
     
@@ -46,8 +57,179 @@ class Settings(BaseSettings):
     min_password_length: int = 8
     
     google_client_id: str
-    
-    
+
+    # Shared Redis instance (optional); used by the generation cache and the
+    # idempotency store when set
+    redis_url: Optional[str] = None
+
+    # Flashcard generation cache
+    generation_cache_enabled: bool = True
+    generation_cache_max_entries: int = 1024
+    generation_cache_ttl_seconds: int = 24 * 60 * 60
+
+    # Responses of authenticated /generate and /upload requests sent with an Idempotency-Key
+    # are kept this long for replay to retries
+    idempotency_max_entries: int = 10000
+    idempotency_ttl_seconds: int = 24 * 60 * 60
+
+    # Long documents: texts over the prompt's input token budget are either
+    # reduced to their most salient sentences for a single call ("salience") or
+    # split into chunks generated concurrently and merged ("chunked", map-reduce).
+    # The budget comes from the token limits below; generation_chunk_chars
+    # optionally caps it further in characters.
+    generation_chunk_chars: Optional[int] = None
+    long_text_strategy: str = "salience"
+    # With the "chunked" strategy, False truncates long texts instead
+    chunked_generation_enabled: bool = True
+    # At most this many chunks are generated from; longer texts are sampled,
+    # with consecutive chunks grouped into this many sections that are each
+    # reduced to their most salient sentences
+    generation_max_chunks: int = 8
+    generation_chunk_concurrency: int = 4
+
+    # Model routing table, tried in order of preference with fallback on 429s
+    # and timeouts. Each entry needs "model"; "context_window",
+    # "max_completion_tokens", "requests_per_minute" and "tokens_per_minute"
+    # default to the llm_* values below, and "difficulties" lists the
+    # difficulties the model is preferred for. Set as JSON in LLM_ROUTES; an
+    # empty list routes everything to llm_model. Defaults are Groq free tier limits.
+    llm_routes: List[Dict[str, Any]] = [
+        {
+            "model": "llama-3.1-8b-instant",
+            "tokens_per_minute": 6000,
+            "difficulties": ["easy", "intermediate"],
+        },
+        {
+            "model": "meta-llama/llama-4-scout-17b-16e-instruct",
+            "tokens_per_minute": 30000,
+            "difficulties": ["intermediate", "advanced"],
+        },
+        {
+            "model": "llama-3.3-70b-versatile",
+            "tokens_per_minute": 12000,
+            "max_completion_tokens": 32768,
+            "difficulties": ["advanced"],
+        },
+    ]
+    llm_call_timeout_seconds: float = 60.0
+
+    # Per-model circuit breaker: over a rolling window of at least
+    # breaker_min_calls calls, open when the failure or slow-call ratio is
+    # reached, reject calls (503) for breaker_open_seconds, then let
+    # breaker_half_open_probes calls probe for recovery
+    breaker_enabled: bool = True
+    breaker_window_seconds: float = 60.0
+    breaker_min_calls: int = 5
+    breaker_failure_ratio: float = 0.5
+    breaker_slow_call_seconds: float = 20.0
+    breaker_slow_call_ratio: float = 0.8
+    breaker_open_seconds: float = 30.0
+    breaker_half_open_probes: int = 1
+
+    # Request hedging: when a generation call runs past this percentile of
+    # the model's recent latency (once hedge_min_samples calls were seen),
+    # send one identical call and keep the first to finish. Hedges are capped
+    # at hedge_budget_ratio of calls.
+    hedge_enabled: bool = False
+    hedge_percentile: float = 0.95
+    hedge_min_samples: int = 20
+    hedge_budget_ratio: float = 0.05
+
+    # Model token limits used to size prompts and max_tokens before calling.
+    # Estimates are multiplied by the margin so they err on the high side.
+    llm_context_window: int = 131072
+    llm_max_completion_tokens: int = 8192
+    token_estimate_margin: float = 1.15
+
+    # Outbound LLM budgets (per model unless a route overrides them) and retry policy
+    llm_requests_per_minute: int = 30
+    llm_tokens_per_minute: int = 6000
+    llm_max_retries: int = 3
+    llm_backoff_base_seconds: float = 1.0
+    llm_backoff_max_seconds: float = 30.0
+
+    # Opt-in micro-batching: small requests with the same mode, difficulty and
+    # summary option that arrive within the window share one model call
+    micro_batch_enabled: bool = False
+    micro_batch_window_ms: int = 50
+    micro_batch_max_items: int = 8
+    micro_batch_max_cards: int = 10
+    micro_batch_max_text_tokens: int = 1500
+
+    # When cards are salvaged from a truncated or malformed response, make one
+    # follow-up call for just the missing cards
+    salvage_request_remainder: bool = True
+
+    # Strip running headers/footers, page numbers and whitespace runs from input text
+    text_preprocessing_enabled: bool = True
+
+    # Near-duplicate card removal: MinHash-estimated Jaccard similarity of
+    # question character 3-grams at or above the threshold counts as a duplicate
+    dedupe_enabled: bool = True
+    dedupe_similarity_threshold: float = 0.7
+    dedupe_request_replacements: bool = True
+
+    # Background generation jobs
+    job_workers: int = 2
+    job_upload_dir: str = os.path.join(tempfile.gettempdir(), "flashcard_jobs")
+    # Running jobs not updated for this long are assumed orphaned and re-queued on startup
+    job_stale_after_seconds: int = 15 * 60
+
+    # Document text extraction runs in a pool of worker processes so parsing
+    # large PDFs never blocks the event loop. Each document must be parsed
+    # within the timeout and under the memory cap (address space, Unix only);
+    # workers are replaced after max_tasks documents to contain parser leaks.
+    # Uploads arriving while extraction_max_queued others already wait get a 503.
+    extraction_workers: int = 2
+    extraction_timeout_seconds: float = 60.0
+    extraction_memory_limit_mb: int = 1024
+    extraction_max_tasks_per_worker: int = 50
+    extraction_max_queued: int = 8
+    # PDFs are split into page ranges parsed in parallel across the workers;
+    # ranges are at least this many pages since each one reopens the file
+    extraction_min_pages_per_task: int = 8
+    # PDF text extractor: "pdfium" (fast; pages it cannot read are retried
+    # with pdfplumber) or "pdfplumber" (layout analysis on every page)
+    pdf_extractor: str = "pdfium"
+    # Uploaded PDFs stop extracting once the text holds this many times the
+    # source tokens of one generation call (at least generation_max_chunks
+    # times with the chunked strategy). Pages are sampled across the whole
+    # document, so salience selection and chunking still cover all of it;
+    # 0 extracts whole documents
+    extraction_budget_multiple: float = 4.0
+
+    # Every generate/upload request must finish within this many seconds;
+    # queueing, model calls and retries are cut short to honour it
+    request_deadline_seconds: float = 180.0
+    # How often in-progress requests check whether the client is still connected
+    disconnect_poll_seconds: float = 0.5
+    # Keep generating and save the deck for authenticated users who disconnect
+    # mid-request; otherwise abandoned work is cancelled and nothing is saved
+    save_abandoned_results: bool = False
+
+    # Weighted fair queuing of generation requests. Under contention tiers
+    # get generation slots in proportion to their weight; each user (each
+    # client address for anonymous traffic) runs at most their tier's
+    # concurrency, and requests still queued after the timeout get a 429.
+    # Client addresses come from X-Forwarded-For only for proxies listed in
+    # uvicorn's FORWARDED_ALLOW_IPS, and many anonymous users can share one,
+    # so the anonymous tier as a whole is capped by fair_tier_concurrency
+    fair_max_concurrent: int = 8
+    fair_tier_weights: Dict[str, float] = {"premium": 4, "free": 2, "anonymous": 1}
+    fair_user_concurrency: Dict[str, int] = {"premium": 3, "free": 1, "anonymous": 1}
+    fair_tier_concurrency: Dict[str, int] = {"anonymous": 3}
+    fair_queue_timeout_seconds: float = 20.0
+
+    # Usage metering: one ai_history row per generation, buffered in memory and
+    # written in bulk when the batch fills or the flush interval elapses
+    metering_enabled: bool = True
+    metering_batch_size: int = 200
+    metering_flush_seconds: float = 5.0
+    # Rows kept while the database is unreachable; the oldest are dropped beyond this
+    metering_max_buffer: int = 10000
+    # Only the head of the source text is stored with each record
+    metering_input_chars: int = 500
+
 
     class Config:
         env_file = ".env"
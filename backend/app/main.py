@@ -5,6 +5,17 @@ from .routers import flashcard, auth, route1, deck, export_deck
 from .core.config import settings
 from .models import Base
 from .database import engine, AsyncSessionLocal
+from .services.generation_cache import generation_cache
+from .services.extraction_pool import extraction_pool
+from .services.idempotency import idempotency_store
+from .services.job_queue import job_queue
+from .services.fair_scheduler import fair_scheduler
+from .services.ai_flashcard_generator import generation_batcher, generation_flight
+from .services.model_router import model_router
+from .services.request_context import cancellation_stats
+from .services.text_preprocessor import preprocess_stats
+from .services.token_budget import token_usage
+from .services.usage_meter import usage_meter
 from sqlalchemy.sql import text
 import logging
 
@@ -34,12 +45,21 @@ app.add_middleware(
 async def startup():
     async with engine.begin() as conn:
         await conn.run_sync(lambda sync_conn: Base.metadata.create_all(bind=sync_conn))
+    await job_queue.start()
+    await usage_meter.start()
+    await extraction_pool.start()
 
 
 @app.on_event("shutdown")
 async def shutdown():
+    await job_queue.stop()
+    # Buffered usage records are written before the connection pool closes
+    await usage_meter.stop()
     await engine.dispose()
     logger.info("Closed database connections")
+    await generation_cache.close()
+    await idempotency_store.close()
+    extraction_pool.close()
 
 @app.get("/health")
 async def health_check():
@@ -53,11 +73,31 @@ async def health_check():
         db_status = "disconnected"
         
     return {
-        "status": "healthy",
+        "status": "degraded" if model_router.all_circuits_open() else "healthy",
         "database": db_status,
+        "llm": model_router.circuit_states(),
         "version": settings.version
     }
 
+@app.get("/metrics")
+async def generation_metrics():
+    """Runtime counters for the flashcard generation pipeline"""
+    return {
+        "generation_cache": generation_cache.stats(),
+        "single_flight": generation_flight.stats(),
+        "micro_batching": generation_batcher.stats(),
+        "idempotency": idempotency_store.stats(),
+        "llm_models": model_router.stats(),
+        "hedging": model_router.hedger.stats(),
+        "generation_jobs": job_queue.stats(),
+        "document_extraction": extraction_pool.stats(),
+        "fair_queue": fair_scheduler.stats(),
+        "cancelled_work": cancellation_stats.stats(),
+        "text_preprocessing": preprocess_stats.stats(),
+        "token_usage": token_usage.stats(),
+        "usage_metering": usage_meter.stats()
+    }
+
 app.include_router(flashcard.router)
 app.include_router(auth.router)
 app.include_router(route1.router)
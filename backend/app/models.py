@@ -136,9 +136,58 @@ class AIHistory(Base):
         DateTime(timezone=True),
         server_default=func.now()
     )
+    # Usage metering; token counts are null when the provider reported no usage
+    prompt_tokens: Mapped[Optional[int]] = mapped_column(nullable=True)
+    completion_tokens: Mapped[Optional[int]] = mapped_column(nullable=True)
+    llm_calls: Mapped[int] = mapped_column(default=0, server_default="0", nullable=False)
+    latency_ms: Mapped[int] = mapped_column(default=0, server_default="0", nullable=False)
+    cache_status: Mapped[str] = mapped_column(String(20), default="miss", server_default="miss", nullable=False)
+    succeeded: Mapped[bool] = mapped_column(default=True, server_default="true", nullable=False)
 
     user_id: Mapped[Optional[uuid.UUID]] = mapped_column(
         ForeignKey("users.id", ondelete="SET NULL"),
-        nullable=True
+        nullable=True,
+        index=True
     )
     user: Mapped[Optional["User"]] = relationship("User", back_populates="ai_history")
+
+
+class GenerationJob(Base):
+    __tablename__ = "generation_jobs"
+
+    id: Mapped[uuid.UUID] = mapped_column(
+        primary_key=True,
+        default=uuid.uuid4,
+        index=True
+    )
+    kind: Mapped[str] = mapped_column(String(20), nullable=False)  # "generate" or "upload"
+    state: Mapped[str] = mapped_column(String(20), default="queued", index=True, nullable=False)
+    progress: Mapped[int] = mapped_column(default=0, nullable=False)  # 0-100
+    params: Mapped[dict] = mapped_column(JSON, nullable=False)
+    input_text: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    file_path: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    result: Mapped[Optional[dict]] = mapped_column(JSON, nullable=True)
+    error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now(),
+        nullable=False
+    )
+
+    deck_id: Mapped[Optional[uuid.UUID]] = mapped_column(
+        ForeignKey("decks.id", ondelete="SET NULL"),
+        nullable=True
+    )
+    user_id: Mapped[Optional[uuid.UUID]] = mapped_column(
+        ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=True
+    )
+
+    def __repr__(self):
+        return f"<GenerationJob(id={self.id}, state={self.state})>"
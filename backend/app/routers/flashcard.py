@@ -1,27 +1,91 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, status, Form, Depends
+from fastapi import APIRouter, UploadFile, File, HTTPException, status, Form, Depends, Header, Request
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-import tempfile
-from app.services.file_parser import extract_text_from_file
-from app.services.ai_flashcard_generator import generate_flashcards_with_groq
+from app.services.document_extraction import extract_document_text
+from app.services.file_parser import parse_page_ranges
+from app.services.ai_flashcard_generator import (
+    generate_flashcards_with_groq,
+    plan_generation_budget,
+    remove_duplicate_cards,
+    source_token_budget,
+    stream_flashcards_with_groq,
+)
+from app.services.card_dedupe import QuestionIndex
+from app.services.fair_scheduler import fair_scheduler, requester
+from app.services.flashcard_store import get_deck_questions, get_target_deck, save_generated_flashcards
+from app.services.idempotency import idempotency_store, request_fingerprint
+from app.services.upload_ingest import StoredUpload, ingested_upload, remove_upload, store_upload
+from app.services.request_context import (
+    DISCONNECT, cancellation_stats, ensure_connected, run_watched, start_deadline
+)
+from app.services.job_queue import job_queue
 from app import schemas
-import os
-from datetime import datetime, timezone
+import asyncio
+import json
+import logging
 from uuid import uuid4
 from typing import Optional
 
-from ..database import get_db
-from ..models import User, Deck, Flashcard
-from ..schemas import FlashcardsRequest, FlashcardsResponse, FlashcardResponse
+from ..database import get_db, AsyncSessionLocal
+from ..models import User, Deck, Flashcard, GenerationJob
+from ..schemas import MAX_FLASHCARD_COUNT, FlashcardsRequest, FlashcardsResponse, FlashcardResponse
 from ..core.security import get_current_user, get_optional_current_user
+from ..core.config import settings
 from typing import List
 from uuid import UUID, uuid4
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(
     prefix="/flashcards",
     tags=["Flashcards"]
 )
 
+
+def _sse(event: str, data) -> str:
+    """Format one Server-Sent Events message."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def _client_host(http_request: Request) -> Optional[str]:
+    return http_request.client.host if http_request.client else None
+
+
+def _keeps_abandoned(current_user: Optional[User]) -> bool:
+    """Whether results are still saved when the client disconnects mid-request."""
+    return current_user is not None and settings.save_abandoned_results
+
+
+async def _generate_watched(
+    http_request: Request,
+    current_user: Optional[User],
+    text: str,
+    count: int,
+    mode: str,
+    difficulty: str
+) -> dict:
+    """
+    Queue for a generation slot and generate, giving up when the deadline
+    passes or (unless the results are kept) the client disconnects.
+    """
+    async def generate():
+        async with fair_scheduler.slot(requester(current_user, _client_host(http_request))):
+            return await generate_flashcards_with_groq(
+                text=text,
+                count=count,
+                mode=mode,
+                difficulty=difficulty,
+                include_summary=True,
+                user_id=current_user.id if current_user else None
+            )
+
+    return await run_watched(
+        http_request, "generate", generate(), watch_disconnect=not _keeps_abandoned(current_user)
+    )
+
+
 @router.get("/{deck_id}", response_model=List[FlashcardResponse])
 async def get_flashcards(
     deck_id: UUID,
@@ -66,6 +130,8 @@ async def get_shared_flashcards(share_id: str, db: AsyncSession = Depends(get_db
 @router.post("/generate", response_model=FlashcardsResponse)
 async def generate_flashcards(
     request: FlashcardsRequest,
+    http_request: Request,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
     db: AsyncSession = Depends(get_db),
     current_user: Optional[User] = Depends(get_optional_current_user)
 ):
@@ -73,14 +139,39 @@ async def generate_flashcards(
     Generate flashcards from text.
     - Authenticated users: flashcards are saved to a new or existing deck
     - Anonymous users: flashcards are returned without being saved
+    - With an `Idempotency-Key` header, retries of an authenticated request
+      replay the first response (including its deck) instead of generating
+      again; anonymous requests ignore the header
+    - Work is cancelled if the client disconnects, unless
+      `save_abandoned_results` keeps authenticated results
     """
+    start_deadline()
+
+    def generate():
+        return _generate_and_save(request, http_request, db, current_user)
+
+    # Anonymous callers have no identity to scope a key to: a client address
+    # is shared by everyone behind the same NAT or proxy
+    if idempotency_key is None or current_user is None:
+        return await generate()
+    return await idempotency_store.run(
+        f"user:{current_user.id}",
+        idempotency_key,
+        request_fingerprint("generate", request.model_dump(mode="json")),
+        generate
+    )
+
+
+async def _generate_and_save(
+    request: FlashcardsRequest,
+    http_request: Request,
+    db: AsyncSession,
+    current_user: Optional[User]
+) -> dict:
     try:
-        flashcards_data = await generate_flashcards_with_groq(
-            text=request.text,
-            count=request.count,
-            mode=request.question_mode,
-            difficulty=request.difficulty,
-            include_summary=True
+        flashcards_data = await _generate_watched(
+            http_request, current_user,
+            request.text, request.count, request.question_mode, request.difficulty
         )
 
         if not flashcards_data or "cards" not in flashcards_data:
@@ -100,49 +191,18 @@ async def generate_flashcards(
             return flashcards_data
 
         # For authenticated users, save flashcards to a deck
+        deck = None
         if request.deck_id:
-            deck = await db.scalar(
-                select(Deck).where(Deck.id == request.deck_id, Deck.user_id == current_user.id)
-            )
-            if not deck:
-                raise HTTPException(status_code=404, detail="Target deck not found")
-        else:
-            deck_uuid = str(uuid4())[:8]
-            deck_name = f"Deck_{datetime.now(timezone.utc).strftime('%Y%m%d')}_{deck_uuid}"
-            summary = flashcards_data.get("summary", "")
-            
-            deck = Deck(
-                id=uuid4(),
-                name=deck_name,
-                summary=summary,
-                user_id=current_user.id,
-                created_at=datetime.now(timezone.utc),
-                updated_at=datetime.now(timezone.utc)
+            deck = await get_target_deck(db, request.deck_id, current_user.id)
+            flashcards_data = await remove_duplicate_cards(
+                flashcards_data, request.text, request.question_mode, request.difficulty,
+                existing_questions=await get_deck_questions(db, deck.id)
             )
-            db.add(deck)
-            await db.commit()
-            await db.refresh(deck)
-        
-
-        for card in flashcards_data["cards"]:
-            question = card.get("question")
-            answer = card.get("answer")
-
-            if "options" in card and "correct_answer" in card:
-                answer = card["correct_answer"]
-
-            new_flashcard = Flashcard(
-                id=uuid4(),
-                question=question,
-                answer=answer,
-                options=card.get("options"),
-                deck_id=deck.id,
-                user_id=current_user.id,
-                created_at=datetime.now(timezone.utc)
-            )
-            db.add(new_flashcard)
 
-        await db.commit()
+        await ensure_connected(http_request, "persist", keep_results=_keeps_abandoned(current_user))
+        deck = await save_generated_flashcards(db, current_user.id, flashcards_data, deck)
+        flashcards_data["deck_id"] = str(deck.id)
+        flashcards_data["deck_name"] = deck.name
         return flashcards_data
 
     except HTTPException:
@@ -156,13 +216,110 @@ async def generate_flashcards(
 
 
 
+@router.post("/generate/stream")
+async def stream_generated_flashcards(
+    request: FlashcardsRequest,
+    http_request: Request,
+    db: AsyncSession = Depends(get_db),
+    current_user: Optional[User] = Depends(get_optional_current_user)
+):
+    """
+    Generate flashcards from text and stream them as Server-Sent Events.
+    - `card`: one flashcard, sent as soon as the model finishes it
+    - `summary`: the deck summary, sent after the last card
+    - `done`: the deck the cards were saved to (null for anonymous users)
+    - `error`: generation failed after the stream started
+    """
+    if current_user is None and request.deck_id:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Authentication required to save flashcards to a deck"
+        )
+
+    # Reject impossible requests and resolve the target deck before streaming
+    # so these are plain 400/413/404 responses rather than stream errors
+    plan_generation_budget(request.count, request.question_mode, request.difficulty, True)
+    deck = None
+    deck_index = None
+    if current_user is not None and request.deck_id:
+        deck = await get_target_deck(db, request.deck_id, current_user.id)
+        if settings.dedupe_enabled:
+            # Cards already in the deck are skipped as they stream in
+            deck_index = await asyncio.to_thread(QuestionIndex, await get_deck_questions(db, deck.id))
+    user_id = current_user.id if current_user is not None else None
+    # Bounds queueing and opening each model stream; tasks started while
+    # streaming inherit it
+    start_deadline()
+    # Queue for a generation slot before streaming so shedding is a plain 429
+    ticket = await fair_scheduler.acquire(requester(current_user, _client_host(http_request)))
+
+    async def event_stream():
+        result = {"cards": []}
+        try:
+            async for item in stream_flashcards_with_groq(
+                text=request.text,
+                count=request.count,
+                mode=request.question_mode,
+                difficulty=request.difficulty,
+                include_summary=True,
+                user_id=user_id
+            ):
+                if "card" in item:
+                    if deck_index is not None and not deck_index.add_if_new(item["card"].get("question", "")):
+                        continue
+                    result["cards"].append(item["card"])
+                    yield _sse("card", item["card"])
+                else:
+                    result["summary"] = item["summary"]
+                    yield _sse("summary", {"summary": item["summary"]})
+        except (asyncio.CancelledError, GeneratorExit):
+            # The client went away; generation was stopped with the stream
+            cancellation_stats.record("stream", DISCONNECT)
+            raise
+        except HTTPException as e:
+            yield _sse("error", {"detail": e.detail})
+            return
+        except Exception as e:
+            logger.error(f"Error in stream_generated_flashcards: {str(e)}", exc_info=True)
+            yield _sse("error", {"detail": "Failed to generate flashcards"})
+            return
+        finally:
+            fair_scheduler.release(ticket)
+
+        done = {"deck_id": None, "deck_name": None, "card_count": len(result["cards"])}
+        if user_id is not None:
+            # The request-scoped session is not guaranteed to outlive the
+            # handler, so persist with a session owned by the stream
+            try:
+                async with AsyncSessionLocal() as session:
+                    saved = await save_generated_flashcards(session, user_id, result, deck)
+                done["deck_id"] = str(saved.id)
+                done["deck_name"] = saved.name
+            except Exception as e:
+                logger.error(f"Failed to save streamed flashcards: {str(e)}", exc_info=True)
+                yield _sse("error", {"detail": "Failed to save flashcards"})
+                return
+        yield _sse("done", done)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        # Also frees the slot if the client left before the stream started
+        background=BackgroundTask(fair_scheduler.release, ticket)
+    )
+
+
 @router.post("/upload", response_model=schemas.FlashcardsResponse)
 async def upload_file_for_flashcards(
+    http_request: Request,
     file: UploadFile = File(...),
-    count: int = Form(10),
+    count: int = Form(10, ge=1, le=MAX_FLASHCARD_COUNT),
     question_mode: str = Form("open-ended"),
     difficulty: str = Form("intermediate"),
     deck_id: Optional[UUID] = Form(None),
+    pages: Optional[str] = Form(None),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
     db: AsyncSession = Depends(get_db),
     current_user: Optional[User] = Depends(get_optional_current_user)
 ):
@@ -170,29 +327,72 @@ async def upload_file_for_flashcards(
     Upload a file (PDF, DOCX, TXT, MD) and generate flashcards from its content.
     - Authenticated users: flashcards are saved to a new or existing deck
     - Anonymous users: flashcards are returned without being saved
+    - `pages` (PDF only) limits generation to 1-based pages and ranges such
+      as `3`, `10-25` or `1-5,8,12-`; other pages are not parsed
+    - Long PDFs are parsed only until enough text has been read for the
+      requested cards, sampling pages across the whole document (see
+      `extraction_budget_multiple`)
+    - With an `Idempotency-Key` header, retries of an authenticated upload
+      replay the first response (including its deck) instead of generating
+      again; anonymous uploads ignore the header
+    - Parsing and generation are cancelled if the client disconnects, unless
+      `save_abandoned_results` keeps authenticated results
     """
+    _check_page_selection(pages)
+    start_deadline()
+    # The upload is copied to a temporary file in bounded chunks and removed
+    # however the request ends
+    async with ingested_upload(file) as upload:
+        def generate():
+            return _upload_and_generate(
+                http_request, upload, pages, count, question_mode, difficulty, deck_id, db, current_user
+            )
+
+        if idempotency_key is None or current_user is None:
+            return await generate()
+        fingerprint = request_fingerprint(
+            "upload",
+            {
+                "count": count,
+                "question_mode": question_mode,
+                "difficulty": difficulty,
+                "deck_id": deck_id,
+                "pages": pages,
+                "filename": file.filename,
+            },
+            upload.sha256
+        )
+        return await idempotency_store.run(
+            f"user:{current_user.id}", idempotency_key, fingerprint, generate
+        )
+
+
+async def _upload_and_generate(
+    http_request: Request,
+    upload: StoredUpload,
+    pages: Optional[str],
+    count: int,
+    question_mode: str,
+    difficulty: str,
+    deck_id: Optional[UUID],
+    db: AsyncSession,
+    current_user: Optional[User]
+) -> dict:
     try:
-        suffix = os.path.splitext(file.filename)[-1]
-        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-            tmp.write(await file.read())
-            tmp_path = tmp.name
+        text = await run_watched(
+            http_request, "parse",
+            extract_document_text(
+                upload.path, pages, max_tokens=source_token_budget(count, question_mode, difficulty, True)
+            ),
+            watch_disconnect=not _keeps_abandoned(current_user)
+        )
 
-        text = extract_text_from_file(tmp_path)
-        
-        os.unlink(tmp_path)
-        
-        if not text.strip():
+        if not text or not text.strip():
             raise HTTPException(status_code=400, detail="No text could be extracted from the file.")
         
         
         try:
-            result = await generate_flashcards_with_groq(
-                text=text,
-                count=count,
-                mode=question_mode,
-                difficulty=difficulty,
-                include_summary=True
-            )
+            result = await _generate_watched(http_request, current_user, text, count, question_mode, difficulty)
         
             if not isinstance(result, dict) or "cards" not in result:
                 raise HTTPException(
@@ -211,48 +411,18 @@ async def upload_file_for_flashcards(
                 return result
 
             # For authenticated users, save flashcards to a deck
+            deck = None
             if deck_id:
-                deck = await db.scalar(
-                    select(Deck).where(Deck.id == deck_id, Deck.user_id == current_user.id)
-                )
-                if not deck:
-                    raise HTTPException(status_code=404, detail="Target deck not found")
-            else:
-                deck_uuid = str(uuid4())[:8]
-                deck_name = f"Deck_{datetime.now(timezone.utc).strftime('%Y%m%d')}_{deck_uuid}"
-                summary = result.get("summary", "")
-                
-                deck = Deck(
-                    id=uuid4(),
-                    name=deck_name,
-                    summary=summary,
-                    user_id=current_user.id,
-                    created_at=datetime.now(timezone.utc),
-                    updated_at=datetime.now(timezone.utc)
+                deck = await get_target_deck(db, deck_id, current_user.id)
+                result = await remove_duplicate_cards(
+                    result, text, question_mode, difficulty,
+                    existing_questions=await get_deck_questions(db, deck.id)
                 )
-                db.add(deck)
-                await db.commit()
-                await db.refresh(deck)
-            
-            for card in result["cards"]:
-                question = card.get("question")
-                answer = card.get("answer")
-
-                if "options" in card and "correct_answer" in card:
-                    answer = card["correct_answer"]
-
-                new_flashcard = Flashcard(
-                    id=uuid4(),
-                    question=question,
-                    answer=answer,
-                    options=card.get("options"),
-                    deck_id=deck.id,
-                    user_id=current_user.id,
-                    created_at=datetime.now(timezone.utc)
-                )
-                db.add(new_flashcard)
 
-            await db.commit()
+            await ensure_connected(http_request, "persist", keep_results=_keeps_abandoned(current_user))
+            deck = await save_generated_flashcards(db, current_user.id, result, deck)
+            result["deck_id"] = str(deck.id)
+            result["deck_name"] = deck.name
             return result
         except HTTPException:
             raise
@@ -270,4 +440,121 @@ async def upload_file_for_flashcards(
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, 
             detail=f"Unexpected error: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+def _check_page_selection(pages: Optional[str]) -> None:
+    """Reject a malformed `pages` field before the upload is stored and parsed."""
+    if not pages:
+        return
+    try:
+        parse_page_ranges(pages)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+async def _check_job_target(deck_id: Optional[UUID], db: AsyncSession, current_user: Optional[User]) -> None:
+    """Reject a job up front if its target deck cannot be used."""
+    if deck_id is None:
+        return
+    if current_user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Authentication required to save flashcards to a deck"
+        )
+    await get_target_deck(db, deck_id, current_user.id)
+
+
+@router.post("/jobs/generate", response_model=schemas.GenerationJobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def submit_generate_job(
+    request: FlashcardsRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: Optional[User] = Depends(get_optional_current_user)
+):
+    """
+    Queue flashcard generation from text and return the job immediately.
+    Poll `GET /flashcards/jobs/{job_id}` for progress and the resulting deck.
+    """
+    plan_generation_budget(request.count, request.question_mode, request.difficulty, True)
+    await _check_job_target(request.deck_id, db, current_user)
+
+    job = GenerationJob(
+        kind="generate",
+        params={
+            "count": request.count,
+            "question_mode": request.question_mode,
+            "difficulty": request.difficulty,
+            "deck_id": str(request.deck_id) if request.deck_id else None,
+        },
+        input_text=request.text,
+        user_id=current_user.id if current_user else None
+    )
+    db.add(job)
+    await db.commit()
+    await db.refresh(job)
+
+    job_queue.submit(job.id)
+    return job
+
+
+@router.post("/jobs/upload", response_model=schemas.GenerationJobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def submit_upload_job(
+    file: UploadFile = File(...),
+    count: int = Form(10, ge=1, le=MAX_FLASHCARD_COUNT),
+    question_mode: str = Form("open-ended"),
+    difficulty: str = Form("intermediate"),
+    deck_id: Optional[UUID] = Form(None),
+    pages: Optional[str] = Form(None),
+    db: AsyncSession = Depends(get_db),
+    current_user: Optional[User] = Depends(get_optional_current_user)
+):
+    """
+    Queue flashcard generation from an uploaded file (PDF, DOCX, TXT, MD).
+    The file is stored until a worker has extracted its text; `pages`
+    selects PDF pages as for `/flashcards/upload`.
+    """
+    plan_generation_budget(count, question_mode, difficulty, True)
+    _check_page_selection(pages)
+    await _check_job_target(deck_id, db, current_user)
+
+    job_id = uuid4()
+    upload = await store_upload(file, settings.job_upload_dir, str(job_id))
+
+    job = GenerationJob(
+        id=job_id,
+        kind="upload",
+        params={
+            "count": count,
+            "question_mode": question_mode,
+            "difficulty": difficulty,
+            "deck_id": str(deck_id) if deck_id else None,
+            "pages": pages,
+        },
+        file_path=upload.path,
+        user_id=current_user.id if current_user else None
+    )
+    db.add(job)
+    try:
+        await db.commit()
+    except BaseException:
+        remove_upload(upload.path)
+        raise
+    await db.refresh(job)
+
+    job_queue.submit(job.id)
+    return job
+
+
+@router.get("/jobs/{job_id}", response_model=schemas.GenerationJobResponse)
+async def get_generation_job(
+    job_id: UUID,
+    db: AsyncSession = Depends(get_db),
+    current_user: Optional[User] = Depends(get_optional_current_user)
+):
+    """
+    Report a generation job's state, progress and, once finished, its deck and cards.
+    """
+    job = await db.get(GenerationJob, job_id)
+    # Jobs owned by a user are only visible to that user
+    if not job or (job.user_id is not None and (current_user is None or current_user.id != job.user_id)):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
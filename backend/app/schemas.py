@@ -1,4 +1,4 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
 from typing import List, Optional
 from datetime import datetime
 from uuid import UUID
@@ -107,11 +107,16 @@ class FlashcardBase(BaseModel):
     correct_answer: Optional[str] = None  # For multiple choice (A, B, C, D)
 
 
+# Upper bound on cards per generation request; the model's output limit
+# may reject smaller counts still
+MAX_FLASHCARD_COUNT = 100
+
+
 class FlashcardsRequest(BaseModel):
     text: str
     question_mode: str = "open_ended"  # "multiple_choice", "true_false", "open_ended"
     difficulty: str = "intermediate"  # "easy", "intermediate", "advanced"
-    count: Optional[int] = 10
+    count: int = Field(10, ge=1, le=MAX_FLASHCARD_COUNT)
     deck_id: Optional[UUID] = None
 
 
@@ -154,6 +159,20 @@ class FlashcardResponse(FlashcardBase):
     model_config = {"from_attributes": True}
 
 
+class GenerationJobResponse(BaseModel):
+    id: UUID
+    kind: str
+    state: str  # "queued", "running", "succeeded", "failed"
+    progress: int
+    deck_id: Optional[UUID] = None
+    error: Optional[str] = None
+    result: Optional[FlashcardsResponse] = None
+    created_at: datetime
+    updated_at: datetime
+
+    model_config = {"from_attributes": True}
+
+
 # ---------------------------
 # AI HISTORY SCHEMAS
 # ---------------------------
@@ -1,13 +1,39 @@
 from ..core.config import settings
-from groq import AsyncGroq
-import json
-from typing import Dict, List, Any
+import asyncio
+import contextvars
+import copy
+import math
+import re
+import time
+from dataclasses import dataclass
+from typing import AsyncIterator, Dict, Iterable, List, Any, Optional, Tuple
+from uuid import UUID
 from fastapi import HTTPException
+from .card_dedupe import QuestionIndex, dedupe_cards
+from .circuit_breaker import CircuitOpenError
+from .generation_cache import generation_cache, generation_key
+from .llm_json import CardStreamParser, extract_summary, parse_flashcards_output
+from .llm_provider import LLMCompletion, llm_provider
+from .model_router import RequestTooLargeError, model_router
+from .request_context import DeadlineExceeded, deadline_error
+from .llm_scheduler import retry_after_seconds
+from .micro_batcher import MicroBatcher, RunAlone
+from .salience import select_salient_text
+from .single_flight import SingleFlight
+from .text_chunker import allocate_counts, group_evenly, split_into_chunks
+from .text_preprocessor import preprocess_text
+from .token_budget import chars_for_tokens, completion_budget, count_tokens, token_usage
+from .usage_meter import (
+    CACHE_COALESCED, CACHE_HIT, CACHE_MISS, GenerationUsage, current_usage, record_llm_call, usage_meter
+)
 
 import logging
 
 logger = logging.getLogger(__name__)
-client = AsyncGroq(api_key=settings.groq_api_key)
+generation_flight = SingleFlight()
+
+# Fewest source-text tokens worth sending; below this a request is rejected
+MIN_INPUT_TOKENS = 256
 
 
 async def generate_flashcards_with_groq(
@@ -15,122 +41,800 @@ async def generate_flashcards_with_groq(
     count: int = 10,
     mode: str = "open_ended",  # "multiple_choice", "true_false", "open_ended"
     difficulty: str = "intermediate",  # "easy", "intermediate", "advanced"
-    include_summary: bool = True
+    include_summary: bool = True,
+    user_id: Optional[UUID] = None
 ) -> Dict[str, Any]:
     """
     Generate AI flashcards with custom mode and difficulty.
+
+    The text is first stripped of extraction boilerplate (running headers,
+    page numbers, hyphenation breaks, whitespace runs). Results are served
+    from the generation cache when the same normalized text has already
+    been processed with the same options, and identical
+    requests that arrive while one is in flight share its model call.
+    Every generation is metered to ``ai_history`` under ``user_id``.
     """
+    # Reject impossible requests before any work
+    plan_generation_budget(count, mode, difficulty, include_summary)
+    start = time.monotonic()
+    usage = GenerationUsage()
+    usage_token = current_usage.set(usage)
+    cache_status = CACHE_MISS
+    result: Optional[Dict[str, Any]] = None
+    try:
+        text = await _preprocess(text)
+        key = generation_key(text, count, mode, difficulty, include_summary)
+        if settings.generation_cache_enabled:
+            cached = await generation_cache.get(key)
+            if cached is not None:
+                logger.info(f"Generation cache hit for {key}")
+                cache_status = CACHE_HIT
+                result = cached
+                return cached
+
+        async def generate() -> Dict[str, Any]:
+            result = await _generate_flashcards(text, count, mode, difficulty, include_summary)
+            result = await remove_duplicate_cards(result, text, mode, difficulty)
+            if settings.generation_cache_enabled and isinstance(result, dict) and result.get("cards"):
+                await generation_cache.set(key, result)
+            return result
+
+        if generation_flight.in_flight(key):
+            cache_status = CACHE_COALESCED
+        # Every coalesced caller gets its own copy of the shared result
+        result = copy.deepcopy(await generation_flight.do(key, generate))
+        return result
+    finally:
+        current_usage.reset(usage_token)
+        usage_meter.record(
+            text, user_id, usage,
+            generated_flashcards=len(result.get("cards", [])) if result else 0,
+            latency_seconds=time.monotonic() - start,
+            cache_status=cache_status,
+            succeeded=result is not None
+        )
 
-    # Truncate text to avoid rate limits (TPM) and context limits
-    # 15,000 characters is roughly 3,500-4,000 tokens, safe for Groq's free tier (6k TPM)
-    max_chars = 15000
+
+async def _preprocess(text: str) -> str:
+    """Strip boilerplate from ``text``; a 400 when nothing is left to prompt with."""
+    if settings.text_preprocessing_enabled:
+        text = await asyncio.to_thread(preprocess_text, text)
+    if not text.strip():
+        raise HTTPException(status_code=400, detail="No text could be extracted from the file.")
+    return text
+
+
+async def _generate_flashcards(
+    text: str,
+    count: int,
+    mode: str,
+    difficulty: str,
+    include_summary: bool
+) -> Dict[str, Any]:
+    """
+    Generate flashcards in one call. Texts over the prompt's input token
+    budget are either reduced to their most salient sentences or map-reduced
+    over chunks, depending on ``settings.long_text_strategy``.
+    """
+    max_tokens, input_tokens = plan_generation_budget(count, mode, difficulty, include_summary)
+    text_tokens = await asyncio.to_thread(count_tokens, text)
+    max_chars = _max_input_chars(text, input_tokens, text_tokens)
     if len(text) > max_chars:
-        logger.warning(f"Text too long ({len(text)} chars), truncating to {max_chars} chars")
-        text = text[:max_chars] + "... [Text truncated due to length for processing]"
-
-    base_prompt = f"""
-    You are an intelligent flashcard generator.
-
-    Generate exactly {count} {difficulty} flashcards from the following text:
-
-    {text}
-
-    The question mode is: {mode}.
-    Return only a JSON object — no explanations, no markdown, no code fences.
-
-    """
-    
-    if mode == "multiple_choice":
-        base_prompt += """
-        For each flashcard, generate:
-        - "question": the question text
-        - "options": a dictionary with keys A, B, C, and D
-        - "correct_answer": the correct option key (A, B, C, or D)
-        
-        Example:
-        {
-            "cards": [
-                {
-                    "question": "What is the capital of France?",
-                    "options": {
-                        "A": "Paris",
-                        "B": "Rome",
-                        "C": "Berlin",
-                        "D": "Madrid"
-                    },
-                    "correct_answer": "A"
-                }
-            ]
-        }
-        """
-
-    elif mode == "true_false":
-        base_prompt += """
-        For each flashcard, generate:
-        - "question": the question text
-        - "answer": "True" or "False"
-        Example:
-        {
-            "cards": [
-                {"question": "The Earth orbits the Sun.", "answer": "True"}
-            ]
-        }
-        """
-
-    else:  # open_ended
-        base_prompt += """
-        For each flashcard, generate:
-        - "question": a short open-ended question
-        - "answer": a brief answer (1-3 sentences)
-        """
+        if settings.long_text_strategy == "salience":
+            text = await _select_salient(text, max_chars, input_tokens)
+        elif settings.chunked_generation_enabled:
+            return await _generate_chunked(text, count, mode, difficulty, include_summary, max_chars, input_tokens)
+        else:
+            logger.warning(f"Text too long (~{text_tokens} tokens), truncating to {max_chars} chars")
+            text = text[:max_chars] + "... [Text truncated due to length for processing]"
+    elif (
+        settings.micro_batch_enabled
+        and count <= settings.micro_batch_max_cards
+        and text_tokens <= settings.micro_batch_max_text_tokens
+    ):
+        return await _request_batched(text, count, mode, difficulty, include_summary, text_tokens, max_tokens)
+
+    return await _request_flashcards(text, count, mode, difficulty, include_summary, max_tokens)
+
+
+def plan_generation_budget(count: int, mode: str, difficulty: str, include_summary: bool) -> Tuple[int, int]:
+    """
+    Return ``(max_tokens, input_tokens)`` for one generation call: the
+    completion budget for ``count`` cards and the tokens left for source text.
+
+    Requests that cannot succeed are rejected here, before any model call:
+    400 when the cards alone exceed every model's output limit, 413 when no
+    single model can take the prompt and completion within its per-request
+    token limit. The input budget is that of the largest model whose output
+    limit admits the completion.
+    """
+    max_tokens = completion_budget(count, mode, include_summary)
+    request_limit = model_router.request_token_limit(max_tokens)
+    if request_limit is None:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many flashcards requested: {count} cards need about {max_tokens} output tokens, "
+                   f"the largest model allows {model_router.max_completion_tokens}"
+        )
 
+    overhead = count_tokens(_SYSTEM_PROMPT) + count_tokens(_build_prompt("", count, mode, difficulty, include_summary))
+    input_tokens = request_limit - overhead - max_tokens
+    if input_tokens < MIN_INPUT_TOKENS:
+        raise HTTPException(
+            status_code=413,
+            detail="Request too large for the model's token limit. Request fewer flashcards."
+        )
+    return max_tokens, input_tokens
+
+
+def source_token_budget(count: int, mode: str, difficulty: str, include_summary: bool) -> Optional[int]:
+    """
+    Tokens of source text worth extracting from an upload for this request,
+    per ``settings.extraction_budget_multiple``; None to extract everything.
+    """
+    if not settings.extraction_budget_multiple:
+        return None
+    _, input_tokens = plan_generation_budget(count, mode, difficulty, include_summary)
+    multiple = settings.extraction_budget_multiple
+    if settings.long_text_strategy != "salience" and settings.chunked_generation_enabled:
+        multiple = max(multiple, settings.generation_max_chunks)
+    return int(input_tokens * multiple)
+
+
+def _max_input_chars(text: str, input_tokens: int, text_tokens: Optional[int] = None) -> int:
+    max_chars = chars_for_tokens(text, input_tokens, text_tokens)
+    if settings.generation_chunk_chars:
+        max_chars = min(max_chars, settings.generation_chunk_chars)
+    return max_chars
+
+
+async def _select_salient(text: str, max_chars: int, input_tokens: int) -> str:
+    selected = await asyncio.to_thread(select_salient_text, text, max_chars)
+    # Salient sentences can be denser than the text as a whole; shrink to fit
+    for _ in range(3):
+        selected_tokens = count_tokens(selected)
+        if selected_tokens <= input_tokens:
+            break
+        max_chars = int(max_chars * 0.95 * input_tokens / selected_tokens)
+        selected = await asyncio.to_thread(select_salient_text, text, max_chars)
+    logger.info(f"Salience selection: kept {len(selected)} of {len(text)} chars")
+    return selected
+
+
+async def _split_for_chunks(text: str, max_chars: int, input_tokens: int) -> List[str]:
+    """
+    Split ``text`` on page and paragraph boundaries into chunks of at most
+    ``max_chars`` characters.
+
+    No more than ``settings.generation_max_chunks`` chunks are generated
+    from, so a longer text is sampled rather than covered in full: its
+    chunks are grouped into that many runs of consecutive chunks, and each
+    run is reduced to its most salient sentences. Every part of the document
+    still contributes to the cards.
+    """
+    chunks = split_into_chunks(text, max_chars)
+    limit = settings.generation_max_chunks
+    if len(chunks) <= limit:
+        return chunks
+    logger.info(
+        f"Chunked generation: {len(chunks)} chunks over the limit of {limit}, "
+        f"reducing {limit} sections to their salient sentences"
+    )
+    sections = group_evenly(chunks, limit)
+    return list(await asyncio.gather(
+        *(_select_salient("\n\n".join(section), max_chars, input_tokens) for section in sections)
+    ))
+
+
+async def _generate_chunked(
+    text: str,
+    count: int,
+    mode: str,
+    difficulty: str,
+    include_summary: bool,
+    max_chars: int,
+    input_tokens: int
+) -> Dict[str, Any]:
+    """
+    Split a long text into chunks (see ``_split_for_chunks``), generate each
+    chunk's share of ``count`` concurrently and merge the results into one set.
+    """
+    chunks = await _split_for_chunks(text, max_chars, input_tokens)
+    counts = allocate_counts([len(chunk) for chunk in chunks], count)
+    logger.info(f"Chunked generation: {len(text)} chars in {len(chunks)} chunks, cards per chunk {counts}")
+
+    semaphore = asyncio.Semaphore(settings.generation_chunk_concurrency)
+
+    async def run_chunk(chunk: str, chunk_count: int) -> Dict[str, Any]:
+        async with semaphore:
+            return await _request_flashcards(chunk, chunk_count, mode, difficulty, include_summary)
+
+    jobs = [(chunk, n) for chunk, n in zip(chunks, counts) if n > 0]
+    results = await asyncio.gather(
+        *(run_chunk(chunk, n) for chunk, n in jobs),
+        return_exceptions=True
+    )
+
+    cards: List[Dict[str, Any]] = []
+    summaries: List[str] = []
+    errors: List[BaseException] = []
+    for result in results:
+        if isinstance(result, BaseException):
+            errors.append(result)
+            continue
+        cards.extend(result.get("cards", []))
+        if result.get("summary"):
+            summaries.append(result["summary"])
+
+    if not cards:
+        raise errors[0] if errors else HTTPException(
+            status_code=500,
+            detail="Failed to generate flashcards"
+        )
+    if errors:
+        logger.warning(f"{len(errors)} of {len(jobs)} chunks failed, returning partial results")
+
+    merged: Dict[str, Any] = {"cards": cards}
     if include_summary:
-        base_prompt += """
-        After generating all flashcards, include a "summary" field that gives a short (2–3 sentence)
-        summary of the text or what the flashcards cover.
-        Example:
-        {
-            "cards": [...],
-            "summary": "This set of flashcards covers key facts about..."
-        }
-        """
+        merged["summary"] = await _reduce_summaries(summaries)
+    return merged
+
 
+async def _reduce_summaries(summaries: List[str]) -> str:
+    """Condense per-chunk summaries into one short summary of the whole text."""
+    if len(summaries) <= 1:
+        return summaries[0] if summaries else ""
+
+    joined = "\n".join(f"- {summary}" for summary in summaries)
+    prompt = (
+        "Combine these section summaries of one document into a single short "
+        "(2-3 sentence) summary. Return only the summary text.\n\n" + joined
+    )
     try:
-        response = await client.chat.completions.create(
-            model="llama-3.1-8b-instant",
-            messages=[
-                {"role": "system", "content": "You are a flashcard generator. Always respond with valid JSON only."},
-                {"role": "user", "content": base_prompt},
-            ],
-            temperature=0.7,
-            max_tokens=2000
+        return (await _chat(prompt, max_tokens=200)).strip()
+    except Exception as e:
+        logger.warning(f"Summary reduction failed, joining chunk summaries: {str(e)}")
+        return " ".join(summaries)
+
+
+_SYSTEM_PROMPT = "You are a flashcard generator. Always respond with valid JSON only."
+
+_MODE_INSTRUCTIONS = {
+    "multiple_choice": (
+        "For each flashcard, generate:\n"
+        '- "question": the question text\n'
+        '- "options": a dictionary with keys A, B, C, and D\n'
+        '- "correct_answer": the correct option key (A, B, C, or D)\n'
+        'Example: {"cards": [{"question": "What is the capital of France?", '
+        '"options": {"A": "Paris", "B": "Rome", "C": "Berlin", "D": "Madrid"}, "correct_answer": "A"}]}\n'
+    ),
+    "true_false": (
+        "For each flashcard, generate:\n"
+        '- "question": the question text\n'
+        '- "answer": "True" or "False"\n'
+        'Example: {"cards": [{"question": "The Earth orbits the Sun.", "answer": "True"}]}\n'
+    ),
+    "open_ended": (
+        "For each flashcard, generate:\n"
+        '- "question": a short open-ended question\n'
+        '- "answer": a brief answer (1-3 sentences)\n'
+    ),
+}
+
+_SUMMARY_INSTRUCTIONS = (
+    'After generating all flashcards, include a "summary" field that gives a short (2–3 sentence) '
+    "summary of the text or what the flashcards cover.\n"
+    'Example: {"cards": [...], "summary": "This set of flashcards covers key facts about..."}\n'
+)
+
+
+def _build_prompt(
+    text: str,
+    count: int,
+    mode: str,
+    difficulty: str,
+    include_summary: bool,
+    exclude_questions: Optional[List[str]] = None
+) -> str:
+    # Instructions are kept flush-left and examples on one line: every
+    # indentation space and pretty-printed brace is billed as prompt tokens
+    base_prompt = (
+        "You are an intelligent flashcard generator.\n"
+        f"Generate exactly {count} {difficulty} flashcards from the following text:\n\n"
+        f"{text}\n\n"
+        f"The question mode is: {mode}.\n"
+        "Return only a JSON object — no explanations, no markdown, no code fences.\n"
+    )
+    base_prompt += _MODE_INSTRUCTIONS.get(mode, _MODE_INSTRUCTIONS["open_ended"])
+
+    if include_summary:
+        base_prompt += _SUMMARY_INSTRUCTIONS
+
+    if exclude_questions:
+        listed = "\n".join(f"- {question}" for question in exclude_questions)
+        base_prompt += f"These questions were already generated; do not repeat or rephrase them:\n{listed}\n"
+
+    return base_prompt
+
+
+def _messages(prompt: str) -> List[Dict[str, str]]:
+    return [
+        {"role": "system", "content": _SYSTEM_PROMPT},
+        {"role": "user", "content": prompt},
+    ]
+
+
+async def _complete(prompt: str, max_tokens: int, difficulty: Optional[str] = None) -> LLMCompletion:
+    prompt_tokens = count_tokens(_SYSTEM_PROMPT) + count_tokens(prompt)
+    completion = await model_router.call(
+        lambda model: llm_provider.complete(_messages(prompt), model, max_tokens),
+        prompt_tokens, max_tokens, difficulty, hedge=True
+    )
+    token_usage.record(prompt_tokens, max_tokens, completion.prompt_tokens, completion.completion_tokens)
+    return completion
+
+
+async def _chat(prompt: str, max_tokens: int, difficulty: Optional[str] = None) -> str:
+    completion = await _complete(prompt, max_tokens, difficulty)
+    record_llm_call(completion.model, completion.prompt_tokens, completion.completion_tokens)
+    return completion.text
+
+
+async def _stream_chat(prompt: str, max_tokens: int, difficulty: Optional[str] = None) -> AsyncIterator[str]:
+    # Only opening the stream is routed and retried; a stream that fails
+    # midway is not replayed because its cards have already been sent
+    async def open_stream(model: str) -> Tuple[str, AsyncIterator[str]]:
+        return model, await llm_provider.open_stream(_messages(prompt), model, max_tokens)
+
+    prompt_tokens = count_tokens(_SYSTEM_PROMPT) + count_tokens(prompt)
+    model, deltas = await model_router.call(open_stream, prompt_tokens, max_tokens, difficulty)
+    # Streams report no usage, so they are metered with local estimates
+    streamed: List[str] = []
+    try:
+        async for delta in deltas:
+            streamed.append(delta)
+            yield delta
+    finally:
+        record_llm_call(model, prompt_tokens, count_tokens("".join(streamed)))
+
+
+def _provider_error(e: Exception) -> HTTPException:
+    """Map a provider failure to the HTTP error returned to the client."""
+    logger.error(f"Error in generate_flashcards_with_groq: {str(e)}")
+    if isinstance(e, DeadlineExceeded):
+        return deadline_error()
+    if isinstance(e, CircuitOpenError):
+        return HTTPException(
+            status_code=503,
+            detail="The AI service is temporarily unavailable. Please try again shortly.",
+            headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))}
+        )
+    if getattr(e, "status_code", None) == 429:
+        retry_after = retry_after_seconds(e)
+        return HTTPException(
+            status_code=429,
+            detail="The AI service is busy. Please try again shortly.",
+            headers={"Retry-After": str(math.ceil(retry_after or settings.llm_backoff_max_seconds))}
+        )
+    if isinstance(e, RequestTooLargeError) or "context_length_exceeded" in str(e):
+        return HTTPException(
+            status_code=413,
+            detail="The input text is too long for the AI to process. Please try a smaller file or text snippet."
         )
+    return HTTPException(
+        status_code=500,
+        detail=f"Failed to generate flashcards: {str(e)}"
+    )
 
-        raw_output = response.choices[0].message.content.strip()
-        if raw_output.startswith("```json"):
-            raw_output = raw_output[7:-3].strip()
-        elif raw_output.startswith("```"):
-            raw_output = raw_output[3:-3].strip()
 
-        try:
-            parsed = json.loads(raw_output)
-            return parsed
+async def _request_flashcards(
+    text: str,
+    count: int,
+    mode: str,
+    difficulty: str,
+    include_summary: bool,
+    max_tokens: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Call the model and parse its JSON output.
+
+    Damaged output (truncated at ``max_tokens``, trailing commas, fences) is
+    salvaged card by card. If that leaves the set short, one follow-up call
+    asks for just the missing cards instead of re-running the whole request.
+    """
+    if max_tokens is None:
+        max_tokens = completion_budget(count, mode, include_summary)
+    try:
+        prompt = _build_prompt(text, count, mode, difficulty, include_summary)
+        raw_output = await _chat(prompt, max_tokens, difficulty)
+        result, complete = parse_flashcards_output(raw_output)
 
-        except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse AI response: {str(e)} | Raw: {raw_output}")
+        if not result["cards"]:
+            logger.error(f"Failed to parse AI response | Raw: {raw_output}")
             raise HTTPException(
                 status_code=500,
-                detail=f"Failed to parse AI response: {str(e)}"
+                detail="Failed to parse AI response"
             )
 
+        await _fill_salvaged(result, complete, text, count, mode, difficulty, include_summary)
+        return result
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise _provider_error(e)
+
+
+async def _fill_salvaged(
+    result: Dict[str, Any],
+    complete: bool,
+    text: str,
+    count: int,
+    mode: str,
+    difficulty: str,
+    include_summary: bool
+) -> None:
+    missing = count - len(result["cards"])
+    if not complete:
+        logger.warning(f"Salvaged {len(result['cards'])} of {count} cards from malformed AI response")
+        if missing > 0 and settings.salvage_request_remainder:
+            await _request_remainder(result, text, missing, mode, difficulty, include_summary)
+
+
+@dataclass
+class _BatchItem:
+    text: str
+    count: int
+    text_tokens: int
+    max_tokens: int
+
+
+@dataclass
+class _BatchShare:
+    """One request's part of a batched response, with its share of the call's usage."""
+    result: Dict[str, Any]
+    complete: bool
+    model: str
+    prompt_tokens: Optional[int]
+    completion_tokens: Optional[int]
+
+
+class _SectionFailed(Exception):
+    """A request's section of a batched response was missing or unusable."""
+
+
+_BATCH_MARKER_RE = re.compile(r"^=== ITEM (\d+) ===[ \t]*$", re.MULTILINE)
+
+
+def _build_batch_prompt(items: List[_BatchItem], mode: str, difficulty: str, include_summary: bool) -> str:
+    # Every text keeps its own "Generate exactly N" line so each section is
+    # sized like a standalone request
+    prompt = (
+        "You are an intelligent flashcard generator.\n"
+        f"Below are {len(items)} unrelated texts, each introduced by a marker line such as === ITEM 1 ===. "
+        f"Generate {difficulty} flashcards for each text from that text alone.\n"
+        f"The question mode is: {mode}.\n"
+        "Answer with one section per text, in order: its marker line on its own, then a JSON object "
+        "for that text only. No explanations, no markdown, no code fences.\n"
+    )
+    prompt += _MODE_INSTRUCTIONS.get(mode, _MODE_INSTRUCTIONS["open_ended"])
+    if include_summary:
+        prompt += _SUMMARY_INSTRUCTIONS
+    for number, item in enumerate(items, 1):
+        prompt += f"\n=== ITEM {number} ===\nGenerate exactly {item.count} flashcards from this text:\n{item.text}\n"
+    return prompt
+
+
+def _split_batch_output(raw_output: str) -> Dict[int, str]:
+    """Sections of a batched response by item number."""
+    parts = _BATCH_MARKER_RE.split(raw_output)
+    return {int(number): section for number, section in zip(parts[1::2], parts[2::2])}
+
+
+def _batch_has_room(items: List[_BatchItem], item: _BatchItem) -> bool:
+    """Whether ``item`` can join ``items`` and the combined call still fit some model's limits."""
+    max_tokens = sum(i.max_tokens for i in items) + item.max_tokens
+    text_tokens = sum(i.text_tokens for i in items) + item.text_tokens
+    # About 15 tokens of markers and count line per item, plus the shared instructions
+    prompt_tokens = text_tokens + 15 * (len(items) + 1) + 250
+    return model_router.fits_any(prompt_tokens, max_tokens)
+
+
+async def _run_generation_batch(key: Tuple[str, str, bool], items: List[_BatchItem]) -> List[Any]:
+    mode, difficulty, include_summary = key
+    prompt = _build_batch_prompt(items, mode, difficulty, include_summary)
+    completion = await _complete(prompt, sum(item.max_tokens for item in items), difficulty)
+    sections = _split_batch_output(completion.text)
+    logger.info(f"Micro-batch of {len(items)} requests answered with {len(sections)} sections")
+
+    # Usage is split by each text's share of the prompt and each section's share of the output
+    total_text = sum(item.text_tokens for item in items) or 1
+    total_output = sum(len(section) for section in sections.values()) or 1
+    outcomes: List[Any] = []
+    for number, item in enumerate(items, 1):
+        section = sections.get(number)
+        result, complete = parse_flashcards_output(section) if section else ({"cards": []}, False)
+        if not result["cards"]:
+            outcomes.append(_SectionFailed(f"No usable section {number} in batched response"))
+            continue
+        outcomes.append(_BatchShare(
+            result=result,
+            complete=complete,
+            model=completion.model,
+            prompt_tokens=(
+                completion.prompt_tokens * item.text_tokens // total_text
+                if completion.prompt_tokens is not None else None
+            ),
+            completion_tokens=(
+                completion.completion_tokens * len(section) // total_output
+                if completion.completion_tokens is not None else None
+            ),
+        ))
+    return outcomes
+
+
+generation_batcher = MicroBatcher(_run_generation_batch, _batch_has_room)
+
+
+async def _request_batched(
+    text: str,
+    count: int,
+    mode: str,
+    difficulty: str,
+    include_summary: bool,
+    text_tokens: int,
+    max_tokens: int
+) -> Dict[str, Any]:
+    """
+    Generate cards for a small request as part of a micro-batch: compatible
+    requests arriving within a few milliseconds share one model call with
+    one delimited section each. A request whose section is missing or
+    unparseable, or that ends up alone, makes its own call instead.
+    """
+    item = _BatchItem(text, count, text_tokens, max_tokens)
+    try:
+        share = await generation_batcher.submit((mode, difficulty, include_summary), item)
+    except RunAlone:
+        return await _request_flashcards(text, count, mode, difficulty, include_summary, max_tokens)
+    except _SectionFailed as e:
+        generation_batcher.record_fallback()
+        logger.warning(f"{e}, generating on its own")
+        return await _request_flashcards(text, count, mode, difficulty, include_summary, max_tokens)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise _provider_error(e)
+
+    record_llm_call(share.model, share.prompt_tokens, share.completion_tokens)
+    result = share.result
+    await _fill_salvaged(result, share.complete, text, count, mode, difficulty, include_summary)
+    return result
+
+
+async def _request_remainder(
+    result: Dict[str, Any],
+    text: str,
+    missing: int,
+    mode: str,
+    difficulty: str,
+    include_summary: bool
+) -> None:
+    """Ask for the ``missing`` cards a salvaged response lacked and merge them into ``result``."""
+    need_summary = include_summary and not result.get("summary")
+    try:
+        extra = await _request_extra_cards(
+            text, missing, mode, difficulty, need_summary,
+            [card["question"] for card in result["cards"]]
+        )
     except Exception as e:
-        logger.error(f"Error in generate_flashcards_with_groq: {str(e)}")
-        if "context_length_exceeded" in str(e):
-             raise HTTPException(
-                status_code=413,
-                detail="The input text is too long for the AI to process. Please try a smaller file or text snippet."
+        logger.warning(f"Remainder request failed, returning salvaged cards only: {str(e)}")
+        return
+
+    result["cards"].extend(extra["cards"][:missing])
+    if need_summary and extra.get("summary"):
+        result["summary"] = extra["summary"]
+
+
+async def _request_extra_cards(
+    text: str,
+    count: int,
+    mode: str,
+    difficulty: str,
+    include_summary: bool,
+    exclude_questions: List[str]
+) -> Dict[str, Any]:
+    """One follow-up call for ``count`` more cards that avoid ``exclude_questions``."""
+    prompt = _build_prompt(
+        text, count, mode, difficulty, include_summary,
+        exclude_questions=exclude_questions
+    )
+    max_tokens = completion_budget(count, mode, include_summary)
+    extra, _ = parse_flashcards_output(await _chat(prompt, max_tokens, difficulty))
+    return extra
+
+
+async def remove_duplicate_cards(
+    result: Dict[str, Any],
+    text: str,
+    mode: str,
+    difficulty: str,
+    existing_questions: Iterable[str] = ()
+) -> Dict[str, Any]:
+    """
+    Drop cards whose question nearly repeats another card in the set or one
+    of ``existing_questions`` (e.g. the target deck's cards).
+
+    When ``settings.dedupe_request_replacements`` is set, one follow-up call
+    asks for as many new cards as were dropped; replacements go through the
+    same check. Texts too long for a single prompt keep the shorter set.
+    """
+    if not settings.dedupe_enabled or not result.get("cards"):
+        return result
+
+    # Hashing a large deck's questions takes seconds; keep it off the event loop
+    index = await asyncio.to_thread(QuestionIndex, existing_questions)
+    kept, dropped = await asyncio.to_thread(dedupe_cards, result["cards"], index)
+    if not dropped:
+        return result
+    logger.info(f"Dropped {dropped} near-duplicate cards")
+
+    if settings.dedupe_request_replacements and _fits_single_prompt(text, dropped, mode, difficulty):
+        try:
+            extra = await _request_extra_cards(
+                text, dropped, mode, difficulty, False,
+                [card["question"] for card in result["cards"]]
             )
-        raise HTTPException(
+            replacements, _ = await asyncio.to_thread(dedupe_cards, extra["cards"], index)
+            kept.extend(replacements[:dropped])
+        except Exception as e:
+            logger.warning(f"Replacement request failed, returning deduplicated cards only: {str(e)}")
+
+    return {**result, "cards": kept}
+
+
+def _fits_single_prompt(text: str, count: int, mode: str, difficulty: str) -> bool:
+    try:
+        _, input_tokens = plan_generation_budget(count, mode, difficulty, False)
+    except HTTPException:
+        return False
+    return len(text) <= _max_input_chars(text, input_tokens)
+
+
+async def stream_flashcards_with_groq(
+    text: str,
+    count: int = 10,
+    mode: str = "open_ended",
+    difficulty: str = "intermediate",
+    include_summary: bool = True,
+    user_id: Optional[UUID] = None
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Stream AI flashcards as the model produces them.
+
+    Yields ``{"card": {...}}`` for every card as soon as its JSON object is
+    complete, then a single ``{"summary": ...}`` when ``include_summary`` is
+    set. Text is preprocessed and long texts are reduced or chunked as in
+    ``generate_flashcards_with_groq``, with chunk streams interleaved. The
+    complete set is written to the generation cache, and cache hits are
+    replayed without calling the model. Impossible requests raise before
+    anything is yielded. The stream is metered like a regular generation,
+    including streams the client abandons.
+    """
+    _, input_tokens = plan_generation_budget(count, mode, difficulty, include_summary)
+    start = time.monotonic()
+    usage = GenerationUsage()
+    # Chunk tasks run in this context so their calls are metered to this request
+    context = contextvars.copy_context()
+    context.run(current_usage.set, usage)
+    cache_status = CACHE_MISS
+    cards = 0
+    succeeded = False
+    try:
+        text = await _preprocess(text)
+        key = generation_key(text, count, mode, difficulty, include_summary)
+        if settings.generation_cache_enabled:
+            cached = await generation_cache.get(key)
+            if cached is not None:
+                cache_status = CACHE_HIT
+                for card in cached.get("cards", []):
+                    cards += 1
+                    yield {"card": card}
+                if include_summary:
+                    yield {"summary": cached.get("summary", "")}
+                succeeded = True
+                return
+
+        async for item in _stream_generated(
+            text, key, count, mode, difficulty, include_summary, input_tokens, context
+        ):
+            if "card" in item:
+                cards += 1
+            yield item
+        succeeded = True
+    finally:
+        usage_meter.record(
+            text, user_id, usage,
+            generated_flashcards=cards,
+            latency_seconds=time.monotonic() - start,
+            cache_status=cache_status,
+            succeeded=succeeded
+        )
+
+
+async def _stream_generated(
+    text: str,
+    key: str,
+    count: int,
+    mode: str,
+    difficulty: str,
+    include_summary: bool,
+    input_tokens: int,
+    context: contextvars.Context
+) -> AsyncIterator[Dict[str, Any]]:
+    text_tokens = await asyncio.to_thread(count_tokens, text)
+    max_chars = _max_input_chars(text, input_tokens, text_tokens)
+    if len(text) <= max_chars:
+        jobs = [(text, count)]
+    elif settings.long_text_strategy == "salience":
+        jobs = [(await _select_salient(text, max_chars, input_tokens), count)]
+    elif settings.chunked_generation_enabled:
+        chunks = await _split_for_chunks(text, max_chars, input_tokens)
+        counts = allocate_counts([len(chunk) for chunk in chunks], count)
+        jobs = [(chunk, n) for chunk, n in zip(chunks, counts) if n > 0]
+    else:
+        logger.warning(f"Text too long (~{text_tokens} tokens), truncating to {max_chars} chars")
+        jobs = [(text[:max_chars] + "... [Text truncated due to length for processing]", count)]
+
+    queue: asyncio.Queue = asyncio.Queue()
+    semaphore = asyncio.Semaphore(settings.generation_chunk_concurrency)
+
+    async def run_chunk(chunk: str, chunk_count: int) -> Optional[str]:
+        async with semaphore:
+            prompt = _build_prompt(chunk, chunk_count, mode, difficulty, include_summary)
+            parser = CardStreamParser()
+            try:
+                async for fragment in _stream_chat(prompt, completion_budget(chunk_count, mode, include_summary), difficulty):
+                    for card in parser.feed(fragment):
+                        queue.put_nowait(card)
+            except Exception as e:
+                raise _provider_error(e)
+            return extract_summary(parser.text)
+
+    tasks = [asyncio.create_task(run_chunk(chunk, n), context=context) for chunk, n in jobs]
+    for task in tasks:
+        task.add_done_callback(lambda _: queue.put_nowait(None))
+
+    cards: List[Dict[str, Any]] = []
+    index = QuestionIndex() if settings.dedupe_enabled else None
+    try:
+        pending = len(tasks)
+        while pending:
+            item = await queue.get()
+            if item is None:
+                pending -= 1
+                continue
+            if index is not None and not index.add_if_new(item.get("question", "")):
+                continue
+            cards.append(item)
+            yield {"card": item}
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    errors = [task.exception() for task in tasks if not task.cancelled() and task.exception()]
+    if not cards:
+        raise errors[0] if errors else HTTPException(
             status_code=500,
-            detail=f"Failed to generate flashcards: {str(e)}"
+            detail="Failed to generate flashcards"
         )
+    if errors:
+        logger.warning(f"{len(errors)} of {len(tasks)} streamed chunks failed, returning partial results")
+
+    result: Dict[str, Any] = {"cards": cards}
+    if include_summary:
+        summaries = [task.result() for task in tasks if not task.exception() and task.result()]
+        result["summary"] = await asyncio.create_task(_reduce_summaries(summaries), context=context)
+        yield {"summary": result["summary"]}
+
+    if settings.generation_cache_enabled and not errors:
+        await generation_cache.set(key, result)
@@ -1,11 +1,9 @@
 from ..core.config import settings
-from groq import AsyncGroq
 import json
 import asyncio
 from typing import Dict, List, Any
 from fastapi import HTTPException
-
-client = AsyncGroq(api_key=settings.groq_api_key)
+from .llm_provider import llm_provider
 
 async def generate_flashcards_with_groq(text: str, count: int = 10) -> Dict[str, List[Dict[str, str]]]:
     prompt = f"""
@@ -27,17 +25,17 @@ async def generate_flashcards_with_groq(text: str, count: int = 10) -> Dict[str,
     """
 
     try:
-        response = await client.chat.completions.create(
-            model="llama-3.1-8b-instant",
-            messages=[
+        completion = await llm_provider.complete(
+            [
                 {"role": "system", "content": "You are a flashcard generator. Always respond with valid JSON only."},
                 {"role": "user", "content": prompt},
             ],
-            temperature=0.7,
-            max_tokens=800
+            model=settings.llm_model,
+            max_tokens=800,
+            temperature=0.7
         )
 
-        raw_output = response.choices[0].message.content.strip()
+        raw_output = completion.text.strip()
 
         try:
             parsed = json.loads(raw_output)
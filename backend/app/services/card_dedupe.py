@@ -0,0 +1,116 @@
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from ..core.config import settings
+
+NUM_PERMUTATIONS = 64
+# Signature rows computed per batch, keeps the (permutations x shingles) matrix small
+_BATCH_QUESTIONS = 4096
+
+_rng = np.random.default_rng(0x5EED)
+# Multiply-shift hash family: h(x) = (a * x + b) >> 32 over uint64, with odd a
+_HASH_A = (_rng.integers(1, 2**63, size=NUM_PERMUTATIONS, dtype=np.uint64) | np.uint64(1))[:, None]
+_HASH_B = _rng.integers(0, 2**63, size=NUM_PERMUTATIONS, dtype=np.uint64)[:, None]
+
+_NON_WORD_RE = re.compile(r"[\W_]+")
+# Function words carry no topic; dropping them lets "What's the role of the X"
+# match "What is the role of X"
+_STOPWORD_RE = re.compile(
+    r"\b(?:a|an|and|are|at|be|by|do|does|for|in|is|it|its|of|on|s|the|to|was|were|with)\b"
+)
+
+
+def _normalize(question: str) -> bytes:
+    text = _NON_WORD_RE.sub(" ", question.lower())
+    # Questions made only of function words keep them rather than all colliding
+    words = _STOPWORD_RE.sub(" ", text).split() or text.split()
+    # Padding guarantees at least one 3-byte shingle per question
+    return (" " + " ".join(words) + " ").encode("utf-8").ljust(3)
+
+
+def minhash_signatures(questions: List[str]) -> np.ndarray:
+    """
+    Compute MinHash signatures, one row of ``NUM_PERMUTATIONS`` uint32 per question.
+
+    Shingles are the byte 3-grams of each normalized question. A batch of
+    questions is concatenated into one byte array, every 3-gram is packed
+    into an integer and hashed under all permutations in a single vectorized
+    pass, and ``np.minimum.reduceat`` takes the per-question minimum. The
+    fraction of equal positions between two signatures estimates the Jaccard
+    similarity of their shingle sets.
+    """
+    signatures = np.empty((len(questions), NUM_PERMUTATIONS), dtype=np.uint32)
+    for start in range(0, len(questions), _BATCH_QUESTIONS):
+        encoded = [_normalize(q) for q in questions[start:start + _BATCH_QUESTIONS]]
+        lengths = np.fromiter((len(e) for e in encoded), dtype=np.int64, count=len(encoded))
+        data = np.frombuffer(b"".join(encoded), dtype=np.uint8).astype(np.uint64)
+
+        grams = (data[:-2] << np.uint64(16)) | (data[1:-1] << np.uint64(8)) | data[2:]
+        # Drop 3-grams that straddle two questions
+        ends = np.cumsum(lengths)
+        valid = np.ones(len(grams), dtype=bool)
+        for back in (1, 2):
+            cut = ends[:-1] - back
+            valid[cut[cut < len(valid)]] = False
+        grams = grams[valid]
+
+        hashed = ((_HASH_A * grams + _HASH_B) >> np.uint64(32)).astype(np.uint32)
+        offsets = np.concatenate(([0], np.cumsum(lengths - 2)[:-1]))
+        signatures[start:start + len(encoded)] = np.minimum.reduceat(hashed, offsets, axis=1).T
+    return signatures
+
+
+class QuestionIndex:
+    """
+    Growable MinHash index for near-duplicate question detection.
+
+    Lookups compare one signature against every indexed row at once, so a
+    deck of tens of thousands of cards costs a single vectorized comparison
+    per new card.
+    """
+
+    def __init__(self, questions: Iterable[str] = (), threshold: Optional[float] = None):
+        self.threshold = settings.dedupe_similarity_threshold if threshold is None else threshold
+        initial = minhash_signatures([q for q in questions if q])
+        self._signatures = np.empty((max(16, 2 * len(initial)), NUM_PERMUTATIONS), dtype=np.uint32)
+        self._signatures[:len(initial)] = initial
+        self._size = len(initial)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def is_duplicate(self, question: str) -> bool:
+        return self._matches(minhash_signatures([question])[0])
+
+    def add(self, question: str) -> None:
+        self._append(minhash_signatures([question])[0])
+
+    def add_if_new(self, question: str) -> bool:
+        """Index ``question`` unless it is a near duplicate; return whether it was added."""
+        signature = minhash_signatures([question])[0]
+        if self._matches(signature):
+            return False
+        self._append(signature)
+        return True
+
+    def _matches(self, signature: np.ndarray) -> bool:
+        if not self._size:
+            return False
+        similarity = (self._signatures[:self._size] == signature).mean(axis=1)
+        return bool(similarity.max() >= self.threshold)
+
+    def _append(self, signature: np.ndarray) -> None:
+        if self._size == len(self._signatures):
+            grown = np.empty((2 * len(self._signatures), NUM_PERMUTATIONS), dtype=np.uint32)
+            grown[:self._size] = self._signatures[:self._size]
+            self._signatures = grown
+        self._signatures[self._size] = signature
+        self._size += 1
+
+
+def dedupe_cards(cards: List[Dict[str, Any]], index: QuestionIndex) -> Tuple[List[Dict[str, Any]], int]:
+    """Keep the cards whose questions are not near duplicates of the index or of each other."""
+    kept = [card for card in cards if card.get("question") and index.add_if_new(card["question"])]
+    return kept, len(cards) - len(kept)
@@ -0,0 +1,116 @@
+import time
+from collections import deque
+from typing import Any, Dict
+
+from ..core.config import settings
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a model whose circuit is open."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"LLM provider unavailable, retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Rolling-window circuit breaker for one model.
+
+    Outcomes of the last ``settings.breaker_window_seconds`` are kept. Once
+    at least ``breaker_min_calls`` calls are in the window, the circuit
+    opens when the share of failures (5xx, timeouts, connection errors) or
+    of calls slower than ``breaker_slow_call_seconds`` reaches its ratio.
+    An open circuit rejects calls for ``breaker_open_seconds``, then goes
+    half-open and lets ``breaker_half_open_probes`` calls through: a
+    successful probe closes it, a failed one opens it again.
+    """
+
+    def __init__(self):
+        self.state = CLOSED
+        self._outcomes: deque = deque()
+        self._opened_at = 0.0
+        self._probes = 0
+        self.times_opened = 0
+        self.rejected = 0
+
+    def _refresh(self, now: float) -> None:
+        if self.state == OPEN and now - self._opened_at >= settings.breaker_open_seconds:
+            self.state = HALF_OPEN
+            self._probes = 0
+        while self._outcomes and now - self._outcomes[0][0] > settings.breaker_window_seconds:
+            self._outcomes.popleft()
+
+    def available(self) -> bool:
+        """Whether a call would be let through right now (without reserving it)."""
+        if not settings.breaker_enabled:
+            return True
+        self._refresh(time.monotonic())
+        if self.state == OPEN:
+            return False
+        return self.state == CLOSED or self._probes < settings.breaker_half_open_probes
+
+    def try_acquire(self) -> bool:
+        """Reserve permission for one call; half-open circuits hand out a limited number of probes."""
+        if not self.available():
+            self.rejected += 1
+            return False
+        if self.state == HALF_OPEN:
+            self._probes += 1
+        return True
+
+    def release(self) -> None:
+        """Give back a probe whose call was cancelled before it had an outcome."""
+        if self.state == HALF_OPEN and self._probes:
+            self._probes -= 1
+
+    def retry_after(self) -> float:
+        if self.state != OPEN:
+            return 0.0
+        return max(0.0, settings.breaker_open_seconds - (time.monotonic() - self._opened_at))
+
+    def record(self, failed: bool, seconds: float) -> None:
+        if not settings.breaker_enabled:
+            return
+        now = time.monotonic()
+        self._refresh(now)
+        slow = seconds >= settings.breaker_slow_call_seconds
+
+        if self.state == HALF_OPEN:
+            self._probes = max(0, self._probes - 1)
+            if failed or slow:
+                self._open(now)
+            else:
+                self.state = CLOSED
+                self._outcomes.clear()
+            return
+
+        self._outcomes.append((now, failed, slow))
+        calls = len(self._outcomes)
+        if self.state == CLOSED and calls >= settings.breaker_min_calls:
+            failures = sum(1 for _, f, _ in self._outcomes if f)
+            slow_calls = sum(1 for _, _, s in self._outcomes if s)
+            if (failures / calls >= settings.breaker_failure_ratio
+                    or slow_calls / calls >= settings.breaker_slow_call_ratio):
+                self._open(now)
+
+    def _open(self, now: float) -> None:
+        self.state = OPEN
+        self._opened_at = now
+        self._outcomes.clear()
+        self.times_opened += 1
+
+    def stats(self) -> Dict[str, Any]:
+        self._refresh(time.monotonic())
+        return {
+            "state": self.state,
+            "retry_after_seconds": round(self.retry_after(), 1),
+            "recent_calls": len(self._outcomes),
+            "recent_failures": sum(1 for _, failed, _ in self._outcomes if failed),
+            "times_opened": self.times_opened,
+            "rejected": self.rejected,
+        }
@@ -0,0 +1,115 @@
+import asyncio
+import logging
+import math
+import os
+from collections import deque
+from typing import Deque, Dict, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, status
+
+from ..core.config import settings
+from .extraction_pool import extraction_pool
+from .file_parser import count_pdf_pages, extract_pdf_pages, extract_text_from_file, join_pages, select_pages
+from .token_budget import count_tokens
+
+logger = logging.getLogger(__name__)
+
+
+def split_pages(page_indexes: Sequence[int], workers: int, min_pages: int) -> List[List[int]]:
+    """
+    Split pages into at most ``workers`` contiguous runs of near-equal
+    length, none shorter than ``min_pages`` (each run reopens the PDF).
+    """
+    if not page_indexes:
+        return []
+    parts = max(1, min(workers, len(page_indexes) // max(1, min_pages)))
+    size = math.ceil(len(page_indexes) / parts)
+    return [list(page_indexes[i:i + size]) for i in range(0, len(page_indexes), size)]
+
+
+def spread_order(n: int) -> List[int]:
+    """
+    Indexes ``0..n-1`` in bit-reversed order (0, n/2, n/4, 3n/4, ...), so
+    every prefix is spread evenly over the whole range.
+    """
+    bits = max(1, (n - 1).bit_length())
+    order = (int(format(i, f"0{bits}b")[::-1], 2) for i in range(1 << bits))
+    return [i for i in order if i < n]
+
+
+async def extract_document_text(
+    file_path: str, pages: Optional[str] = None, shed: bool = True, max_tokens: Optional[int] = None
+) -> Optional[str]:
+    """
+    Extract a document's text in the extraction pool.
+
+    PDFs are split into page ranges that are parsed in parallel by up to
+    ``settings.extraction_workers`` processes and joined in page order;
+    ``pages`` (e.g. "1-5,8,12-") limits parsing to the selected pages. Other
+    formats are parsed whole by a single worker. PDF text comes from the
+    ``settings.pdf_extractor`` backend. ``shed`` is passed to the pool for
+    the first step only: once a document is admitted, its remaining ranges
+    wait for a worker rather than fail half-way.
+
+    With ``max_tokens`` a PDF is read in small ranges started in
+    ``spread_order``, and no new range is started once the ranges finished
+    so far hold that many tokens. A long document is thus sampled from
+    beginning to end rather than cut off after its opening chapters.
+    """
+    if os.path.splitext(file_path)[-1].lower() != ".pdf":
+        # Stopping early could only keep the start of the file, and DOCX and
+        # text files are cheap to read whole next to a PDF
+        return await _run(extract_text_from_file, file_path, pages, shed=shed)
+
+    # Chosen here rather than in the workers so runtime overrides of the setting apply
+    backend = settings.pdf_extractor
+    page_count = await _run(count_pdf_pages, file_path, backend, shed=shed)
+    try:
+        page_indexes = select_pages(pages, page_count)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    # A budget is met part-way through the document, so it is read in small ranges rather than one per worker
+    parts = settings.extraction_workers if max_tokens is None else len(page_indexes)
+    ranges = split_pages(page_indexes, parts, settings.extraction_min_pages_per_task)
+    texts = await _extract_ranges(file_path, ranges, backend, max_tokens)
+    logger.debug(f"Extracted {len(texts)} of {page_count} pages in up to {len(ranges)} ranges")
+    return join_pages(texts)
+
+
+async def _extract_ranges(
+    file_path: str, ranges: List[List[int]], backend: str, max_tokens: Optional[int]
+) -> List[str]:
+    """Page texts of the ranges read, in page order, with at most one range per worker in flight."""
+    pending = deque(range(len(ranges)) if max_tokens is None else spread_order(len(ranges)))
+    running: Deque[Tuple[int, asyncio.Task]] = deque()
+    done: Dict[int, List[str]] = {}
+    tokens = 0
+    try:
+        while pending or running:
+            while pending and len(running) < settings.extraction_workers and (max_tokens is None or tokens < max_tokens):
+                index = pending.popleft()
+                running.append((index, asyncio.ensure_future(
+                    _run(extract_pdf_pages, file_path, ranges[index], backend, max_tokens)
+                )))
+            if not running:
+                break
+            index, task = running.popleft()
+            done[index] = await task
+            if max_tokens is not None:
+                tokens += sum(count_tokens(text) for text in done[index])
+    except BaseException:
+        # Stop the other ranges too, which frees their workers
+        for _, task in running:
+            task.cancel()
+        await asyncio.gather(*(task for _, task in running), return_exceptions=True)
+        raise
+    return [text for index in sorted(done) for text in done[index]]
+
+
+async def _run(fn, *args, shed: bool = False):
+    try:
+        return await extraction_pool.run(fn, *args, shed=shed)
+    except ValueError as e:
+        # Invalid documents or page selections
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
@@ -0,0 +1,204 @@
+import asyncio
+import logging
+import math
+import multiprocessing
+from multiprocessing.connection import Connection
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+
+from ..core.config import settings
+
+try:
+    import resource
+except ImportError:  # Windows: no address space limits
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# Spawned workers do not inherit the server's event loop, threads or open sockets
+_context = multiprocessing.get_context("spawn")
+
+
+def _serve(conn: Connection, memory_limit_mb: int) -> None:
+    """Worker process: run ``(fn, args)`` jobs from ``conn`` and send back ``(ok, result)``."""
+    if resource is not None and memory_limit_mb > 0:
+        limit = memory_limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    while True:
+        try:
+            fn, args = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            return
+        try:
+            outcome = (True, fn(*args))
+        except Exception as e:
+            outcome = (False, e)
+        try:
+            conn.send(outcome)
+        except Exception:
+            # The exception could not be pickled
+            conn.send((False, RuntimeError(f"{type(outcome[1]).__name__}: {str(outcome[1])}")))
+
+
+class _Worker:
+    def __init__(self, memory_limit_mb: int):
+        self.conn, child_conn = _context.Pipe()
+        self.process = _context.Process(
+            target=_serve, args=(child_conn, memory_limit_mb), name="extraction-worker", daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self.jobs = 0
+
+    def exchange(self, job: Tuple[Callable, tuple], timeout: float) -> Optional[Tuple[bool, Any]]:
+        """Blocking: send a job and wait for its outcome; None when it timed out."""
+        self.conn.send(job)
+        if not self.conn.poll(timeout):
+            return None
+        return self.conn.recv()
+
+    def stop(self) -> None:
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join(timeout=1)
+        self.conn.close()
+
+
+class ExtractionPool:
+    """
+    Bounded pool of worker processes for CPU-heavy document parsing.
+
+    Parsing a large PDF takes seconds of pure Python; running it here keeps
+    the event loop (and ``/health``) responsive and lets parsers run on
+    several cores. At most ``settings.extraction_workers`` jobs run at once
+    and ``settings.extraction_max_queued`` more may wait; beyond that callers
+    get a 503 instead of queueing without limit.
+
+    Each job must finish within ``settings.extraction_timeout_seconds`` and
+    its worker may use at most ``settings.extraction_memory_limit_mb`` of
+    address space; a worker that times out, runs out of memory, crashes or
+    whose caller is cancelled is killed and replaced. Workers are also
+    replaced after ``settings.extraction_max_tasks_per_worker`` jobs to
+    contain memory leaked by the parsers.
+    """
+
+    def __init__(self):
+        self._idle: List[_Worker] = []
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._running = 0
+        self._waiting = 0
+        self.completed = 0
+        self.failed = 0
+        self.timeouts = 0
+        self.crashes = 0
+        self.rejected = 0
+        self.recycled = 0
+
+    async def start(self) -> None:
+        """Start the workers ahead of the first upload, which would otherwise wait for them to boot."""
+        while len(self._idle) < settings.extraction_workers:
+            self._idle.append(await asyncio.to_thread(_Worker, settings.extraction_memory_limit_mb))
+
+    async def run(self, fn: Callable[..., Any], *args: Any, shed: bool = True) -> Any:
+        """
+        Run ``fn(*args)`` in a worker process and return its result. ``fn``
+        must be importable by the worker; its exceptions are re-raised here.
+        With ``shed`` (interactive requests) a full pool is a 503; otherwise
+        the caller waits its turn (background jobs, already bounded).
+        """
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(settings.extraction_workers)
+        if shed and self._slots.locked() and self._waiting >= settings.extraction_max_queued:
+            self.rejected += 1
+            retry_after = max(1, math.ceil(settings.extraction_timeout_seconds / 4))
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="The server is busy processing other documents, please try again shortly",
+                headers={"Retry-After": str(retry_after)}
+            )
+
+        self._waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self._waiting -= 1
+        try:
+            self._running += 1
+            return await self._run(fn, args)
+        finally:
+            self._running -= 1
+            self._slots.release()
+
+    async def _run(self, fn: Callable[..., Any], args: tuple) -> Any:
+        worker = self._idle.pop() if self._idle else await asyncio.to_thread(
+            _Worker, settings.extraction_memory_limit_mb
+        )
+        reusable = False
+        try:
+            try:
+                outcome = await asyncio.to_thread(worker.exchange, (fn, args), settings.extraction_timeout_seconds)
+            except (EOFError, OSError) as e:
+                self.crashes += 1
+                logger.error(f"Extraction worker died: {str(e)}")
+                raise HTTPException(
+                    status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                    detail="The document could not be processed"
+                )
+            if outcome is None:
+                self.timeouts += 1
+                logger.warning(f"Document extraction timed out after {settings.extraction_timeout_seconds}s")
+                raise HTTPException(
+                    status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                    detail="The document took too long to process. Please try a smaller file."
+                )
+
+            worker.jobs += 1
+            ok, value = outcome
+            if ok:
+                self.completed += 1
+            else:
+                self.failed += 1
+            if isinstance(value, MemoryError):
+                logger.warning("Document extraction ran out of memory")
+                raise HTTPException(
+                    status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                    detail="The document is too large to process. Please try a smaller file."
+                )
+            if worker.jobs >= settings.extraction_max_tasks_per_worker:
+                self.recycled += 1
+            else:
+                reusable = True
+            if not ok:
+                raise value
+            return value
+        finally:
+            # Killed on timeouts and cancellation too, so abandoned parses stop using CPU
+            if reusable:
+                self._idle.append(worker)
+            else:
+                worker.stop()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": settings.extraction_workers,
+            "running": self._running,
+            "queued": self._waiting,
+            "idle_processes": len(self._idle),
+            "completed": self.completed,
+            "failed": self.failed,
+            "timeouts": self.timeouts,
+            "crashes": self.crashes,
+            "rejected": self.rejected,
+            "recycled": self.recycled,
+        }
+
+    def close(self) -> None:
+        """Stop the idle workers; busy ones are stopped by their job on the way out."""
+        while self._idle:
+            self._idle.pop().stop()
+        # Sized and bound to the event loop again on next use
+        self._slots = None
+
+
+extraction_pool = ExtractionPool()
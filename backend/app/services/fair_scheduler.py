@@ -0,0 +1,238 @@
+import asyncio
+import logging
+import math
+import time
+from collections import OrderedDict, defaultdict, deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Deque, Dict, Optional
+
+from fastapi import HTTPException, status
+
+from ..core.config import settings
+from ..models import User
+from .request_context import bounded_timeout
+
+logger = logging.getLogger(__name__)
+
+PREMIUM = "premium"
+FREE = "free"
+ANONYMOUS = "anonymous"
+TIERS = (PREMIUM, FREE, ANONYMOUS)
+
+
+@dataclass
+class Ticket:
+    """Who a generation request is for; once it is granted a slot, release it exactly once."""
+
+    key: str
+    tier: str
+    released: bool = False
+
+
+def requester(user: Optional[User], client: Optional[str] = None) -> Ticket:
+    """
+    The fairness key and tier of a request. Anonymous callers are keyed by
+    client address, which many of them may share (NAT, or a proxy whose
+    forwarded headers are not trusted); the anonymous tier's overall cap
+    bounds them regardless.
+    """
+    if user is None:
+        return Ticket(f"anonymous:{client or 'unknown'}", ANONYMOUS)
+    return Ticket(f"user:{user.id}", PREMIUM if user.is_premium else FREE)
+
+
+class TierStats:
+    def __init__(self, window: int = 500):
+        self.admitted = 0
+        self.shed = 0
+        self._waits: Deque[float] = deque(maxlen=window)
+
+    def record_wait(self, seconds: float) -> None:
+        self._waits.append(seconds)
+
+    def wait_percentile(self, p: float) -> Optional[float]:
+        if not self._waits:
+            return None
+        waits = sorted(self._waits)
+        return round(1000 * waits[min(len(waits) - 1, int(p * len(waits)))], 1)
+
+
+class FairScheduler:
+    """
+    Weighted fair queue in front of the generation pipeline.
+
+    At most ``settings.fair_max_concurrent`` generations run at once. When
+    they are all busy, requests wait in a queue per tier (premium, free,
+    anonymous) and freed slots go to the tiers by stride scheduling, so
+    under contention each tier gets slots in proportion to its weight in
+    ``settings.fair_tier_weights``, and a tier is never starved. Within a
+    tier, users are served round-robin, and no user runs more than their
+    tier's ``settings.fair_user_concurrency`` generations at once, so one
+    user submitting in a loop only competes with themselves. A tier listed
+    in ``settings.fair_tier_concurrency`` runs at most that many
+    generations in total, which bounds anonymous traffic however many
+    client addresses it comes from.
+
+    A request that has not been admitted within
+    ``settings.fair_queue_timeout_seconds`` is shed with a 429.
+    """
+
+    def __init__(self):
+        self._running = 0
+        self._user_running: Dict[str, int] = defaultdict(int)
+        # Per tier: user key -> that user's waiting futures, in arrival order
+        self._queues: Dict[str, "OrderedDict[str, Deque[asyncio.Future]]"] = {tier: OrderedDict() for tier in TIERS}
+        self._pass: Dict[str, float] = {tier: 0.0 for tier in TIERS}
+        self._virtual_time = 0.0
+        self._stats: Dict[str, TierStats] = {tier: TierStats() for tier in TIERS}
+        self._tier_running: Dict[str, int] = defaultdict(int)
+
+    def _user_limit(self, tier: str) -> int:
+        return max(1, settings.fair_user_concurrency.get(tier, 1))
+
+    def _tier_has_room(self, tier: str) -> bool:
+        limit = settings.fair_tier_concurrency.get(tier)
+        return limit is None or self._tier_running[tier] < max(1, limit)
+
+    def _can_start(self, ticket: Ticket) -> bool:
+        return (
+            self._tier_has_room(ticket.tier)
+            and self._user_running.get(ticket.key, 0) < self._user_limit(ticket.tier)
+        )
+
+    async def acquire(self, ticket: Ticket, timeout: Optional[float] = -1.0) -> Ticket:
+        """
+        Wait for a slot for ``ticket``. ``timeout`` defaults to the queue
+        deadline; ``None`` waits indefinitely (background jobs).
+        """
+        if timeout is not None and timeout < 0:
+            timeout = settings.fair_queue_timeout_seconds
+        timeout = bounded_timeout(timeout)
+        stats = self._stats[ticket.tier]
+        start = time.monotonic()
+
+        # Whenever a slot is free every queued request is held back by its
+        # user's or tier's cap, so a request under both caps can start now
+        if self._running < settings.fair_max_concurrent and self._can_start(ticket):
+            self._grant(ticket)
+            stats.record_wait(0.0)
+            return ticket
+
+        queue = self._queues[ticket.tier]
+        if not queue:
+            # A tier that was idle resumes at the current virtual time instead of using saved-up credit
+            self._pass[ticket.tier] = max(self._pass[ticket.tier], self._virtual_time)
+        waiter = asyncio.get_running_loop().create_future()
+        queue.setdefault(ticket.key, deque()).append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # Granted just as the wait ended; hand the slot back
+                self.release(ticket)
+            else:
+                waiter.cancel()
+                self._forget(ticket, waiter)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            stats.shed += 1
+            logger.warning(f"Shed {ticket.tier} generation request after {timeout:.0f}s in queue")
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="The server is busy generating flashcards, please try again shortly",
+                headers={"Retry-After": str(max(1, math.ceil(timeout)))}
+            )
+        stats.record_wait(time.monotonic() - start)
+        return ticket
+
+    def release(self, ticket: Ticket) -> None:
+        if ticket.released:
+            return
+        ticket.released = True
+        self._running -= 1
+        self._tier_running[ticket.tier] -= 1
+        self._user_running[ticket.key] -= 1
+        if not self._user_running[ticket.key]:
+            del self._user_running[ticket.key]
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, ticket: Ticket, timeout: Optional[float] = -1.0) -> AsyncIterator[Ticket]:
+        await self.acquire(ticket, timeout)
+        try:
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    def _grant(self, ticket: Ticket) -> None:
+        self._running += 1
+        self._tier_running[ticket.tier] += 1
+        self._user_running[ticket.key] += 1
+        self._stats[ticket.tier].admitted += 1
+
+    def _forget(self, ticket: Ticket, waiter: asyncio.Future) -> None:
+        queue = self._queues[ticket.tier]
+        waiters = queue.get(ticket.key)
+        if waiters is None:
+            return
+        try:
+            waiters.remove(waiter)
+        except ValueError:
+            pass
+        if not waiters:
+            del queue[ticket.key]
+
+    def _next_user(self, tier: str) -> Optional[str]:
+        """The first user of ``tier``, in round-robin order, who is under their concurrency cap."""
+        if not self._tier_has_room(tier):
+            return None
+        limit = self._user_limit(tier)
+        for key in self._queues[tier]:
+            if self._user_running.get(key, 0) < limit:
+                return key
+        return None
+
+    def _dispatch(self) -> None:
+        while self._running < settings.fair_max_concurrent:
+            eligible = [(tier, user) for tier in TIERS if (user := self._next_user(tier)) is not None]
+            if not eligible:
+                return
+            tier, key = min(eligible, key=lambda item: (self._pass[item[0]], TIERS.index(item[0])))
+            queue = self._queues[tier]
+            waiter = queue[key].popleft()
+            if queue[key]:
+                queue.move_to_end(key)
+            else:
+                del queue[key]
+            if waiter.done():
+                continue
+
+            self._virtual_time = self._pass[tier]
+            weight = max(settings.fair_tier_weights.get(tier, 1), 1e-6)
+            self._pass[tier] += 1 / weight
+            self._grant(Ticket(key, tier))
+            waiter.set_result(None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrent": settings.fair_max_concurrent,
+            "running": self._running,
+            "tiers": {
+                tier: {
+                    "weight": settings.fair_tier_weights.get(tier, 1),
+                    "running": self._tier_running[tier],
+                    "max_running": settings.fair_tier_concurrency.get(tier),
+                    "queued": sum(len(waiters) for waiters in self._queues[tier].values()),
+                    "queued_users": len(self._queues[tier]),
+                    "admitted": self._stats[tier].admitted,
+                    "shed": self._stats[tier].shed,
+                    "wait_p50_ms": self._stats[tier].wait_percentile(0.5),
+                    "wait_p95_ms": self._stats[tier].wait_percentile(0.95),
+                }
+                for tier in TIERS
+            },
+        }
+
+
+fair_scheduler = FairScheduler()
@@ -1,14 +1,30 @@
 import os
-from typing import Optional
+import re
+import unicodedata
+from abc import ABC, abstractmethod
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
 
 import docx
 import pdfplumber
+import pypdfium2 as pdfium
+
+from ..core.config import settings
+from .token_budget import count_tokens
 
 
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB limit
 CHUNK_SIZE = 1024 * 1024  # 1MB chunks for streaming
 
-def extract_text_from_file(file_path: str) -> Optional[str]:
+_PAGE_RANGE = re.compile(r"^(\d+)(?:\s*-\s*(\d*))?$")
+# Share of a page's characters that may be unreadable before pdfplumber is tried instead
+GARBLED_TEXT_RATIO = 0.1
+
+def extract_text_from_file(
+    file_path: str,
+    pages: Optional[str] = None,
+    pdf_backend: Optional[str] = None,
+    max_tokens: Optional[int] = None
+) -> Optional[str]:
     """
     Extract text from supported file formats with size validation and streaming support.
     
@@ -20,14 +36,29 @@ def extract_text_from_file(file_path: str) -> Optional[str]:
     
     Args:
         file_path: Path to the file
+        pages: Optional page selection for PDFs, e.g. "1-5,8,12-" (see parse_page_ranges)
+        pdf_backend: PDF extractor ("pdfium" or "pdfplumber"), settings.pdf_extractor by default
+        max_tokens: Stop reading once the text holds about this many tokens (see until_tokens)
         
     Returns:
         Extracted text or None if file is empty
         
     Raises:
-        ValueError: For unsupported file types or oversized files
+        ValueError: For unsupported file types, oversized files or invalid page selections
         IOError: For file access errors
     """
+    return "".join(until_tokens(iter_text_from_file(file_path, pages, pdf_backend), max_tokens)).strip()
+
+
+def iter_text_from_file(
+    file_path: str, pages: Optional[str] = None, pdf_backend: Optional[str] = None
+) -> Iterator[str]:
+    """
+    Validate a file as for extract_text_from_file and return an iterator over
+    its text, a page (PDF) or paragraph (DOCX, TXT, MD) at a time. The pieces
+    keep their separators, so joined they are the document's text; nothing
+    past the last piece taken is read.
+    """
     # Validate file exists
     if not os.path.exists(file_path):
         raise ValueError(f"File not found: {file_path}")
@@ -41,32 +72,239 @@ def extract_text_from_file(file_path: str) -> Optional[str]:
     ext = os.path.splitext(file_path)[-1].lower()
     if ext not in [".pdf", ".docx", ".txt", ".md"]:
         raise ValueError(f"Unsupported file type: {ext}")
+    if pages and ext != ".pdf":
+        raise ValueError("Page selection is only supported for PDF files")
 
     # Extract based on type
     if ext == ".pdf":
-        return extract_text_from_pdf(file_path)
+        return iter_pdf_text(file_path, pages, pdf_backend)
     elif ext == ".docx":
-        return extract_text_from_docx(file_path)
-    elif ext in [".txt", ".md"]:
-        return extract_text_from_text(file_path)
-    
-    return None  # Shouldn't reach here due to extension validation
+        return iter_docx_text(file_path)
+    return iter_text_file(file_path)
+
 
+def until_tokens(pieces: Iterable[str], max_tokens: Optional[int]) -> Iterator[str]:
+    """
+    Pass pieces of text through until they add up to at least ``max_tokens``
+    estimated tokens, then close the source so the rest is never extracted.
+    """
+    pieces = iter(pieces)
+    try:
+        tokens = 0
+        for piece in pieces:
+            yield piece
+            if max_tokens is not None:
+                tokens += count_tokens(piece)
+                if tokens >= max_tokens:
+                    return
+    finally:
+        close = getattr(pieces, "close", None)
+        if close is not None:
+            close()
+
+
+def parse_page_ranges(spec: str) -> List[Tuple[int, Optional[int]]]:
+    """
+    Parse a page selection of comma-separated 1-based, inclusive pages and
+    ranges such as "3", "10-25" or "1-5,8,12-" (an open range runs to the
+    last page) into (first, last) pairs, with None for an open last page.
+    """
+    ranges = []
+    for part in spec.split(","):
+        match = _PAGE_RANGE.match(part.strip())
+        if match is None:
+            raise ValueError(f"Invalid page range: {part.strip()!r}")
+        first = int(match.group(1))
+        last = first if match.group(2) is None else (int(match.group(2)) if match.group(2) else None)
+        if first < 1 or (last is not None and last < first):
+            raise ValueError(f"Invalid page range: {part.strip()!r}")
+        ranges.append((first, last))
+    return ranges
 
-def extract_text_from_pdf(file_path: str) -> str:
-    text = ""
-    with pdfplumber.open(file_path) as pdf:
-        for page in pdf.pages:
-            text += page.extract_text() or ""
-    return text.strip()
 
+def select_pages(spec: Optional[str], page_count: int) -> List[int]:
+    """Zero-based indexes of the pages a selection covers, in order; all pages without one."""
+    if not spec:
+        return list(range(page_count))
+    selected = set()
+    for first, last in parse_page_ranges(spec):
+        if first > page_count:
+            raise ValueError(f"Page {first} is out of range: the document has {page_count} pages")
+        selected.update(range(first - 1, min(last or page_count, page_count)))
+    return sorted(selected)
 
-def extract_text_from_docx(file_path: str) -> str:
+
+class PdfExtractor(ABC):
+    """Text extraction from the pages of one open PDF; use as a context manager."""
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+
+    @abstractmethod
+    def page_count(self) -> int:
+        ...
+
+    @abstractmethod
+    def page_text(self, index: int) -> str:
+        """Text of the zero-based page ``index``."""
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self) -> "PdfExtractor":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class PdfplumberExtractor(PdfExtractor):
+    """pdfminer layout analysis: slow, but copes with unusual fonts and encodings."""
+
+    def __init__(self, file_path: str):
+        super().__init__(file_path)
+        self._pdf = pdfplumber.open(file_path)
+
+    def page_count(self) -> int:
+        return len(self._pdf.pages)
+
+    def page_text(self, index: int) -> str:
+        page = self._pdf.pages[index]
+        try:
+            return page.extract_text() or ""
+        finally:
+            # Parsed layout is cached on the page; drop it once the text is out
+            page.close()
+
+    def close(self) -> None:
+        self._pdf.close()
+
+
+class PdfiumExtractor(PdfExtractor):
+    """
+    PDFium's native text extraction, many times faster than pdfplumber.
+    Pages where it finds garbled text (e.g. fonts without a Unicode map)
+    are extracted again with pdfplumber; pages without text (blank or
+    scanned) are not, since pdfplumber finds nothing there either.
+    """
+
+    def __init__(self, file_path: str):
+        super().__init__(file_path)
+        self._pdf = pdfium.PdfDocument(file_path)
+        self._fallback: Optional[PdfplumberExtractor] = None
+        self.fallback_pages = 0
+
+    def page_count(self) -> int:
+        return len(self._pdf)
+
+    def page_text(self, index: int) -> str:
+        page = self._pdf[index]
+        try:
+            textpage = page.get_textpage()
+            try:
+                text = textpage.get_text_range()
+            finally:
+                textpage.close()
+        finally:
+            page.close()
+        # PDFium ends lines with CRLF and replaces a hyphenated line break with
+        # U+FFFE (STX in older releases); dropping it rejoins the word
+        text = text.replace("\r\n", "\n").replace("\r", "\n").replace("\ufffe", "").replace("\x02", "")
+        if not _looks_garbled(text):
+            return text
+        if self._fallback is None:
+            self._fallback = PdfplumberExtractor(self.file_path)
+        self.fallback_pages += 1
+        return self._fallback.page_text(index) or text
+
+    def close(self) -> None:
+        if self._fallback is not None:
+            self._fallback.close()
+        self._pdf.close()
+
+
+PDF_EXTRACTORS = {
+    "pdfium": PdfiumExtractor,
+    "pdfplumber": PdfplumberExtractor,
+}
+
+
+def open_pdf(file_path: str, backend: Optional[str] = None) -> PdfExtractor:
+    """Open a PDF with the given extractor backend, ``settings.pdf_extractor`` by default."""
+    backend = backend or settings.pdf_extractor
+    if backend not in PDF_EXTRACTORS:
+        raise ValueError(f"Unknown PDF extractor: {backend}")
+    return PDF_EXTRACTORS[backend](file_path)
+
+
+def _looks_garbled(text: str) -> bool:
+    """True for text dominated by replacement, control or private-use characters."""
+    text = text.strip()
+    if not text:
+        return False
+    bad = sum(
+        1 for ch in text
+        if ch == "\ufffd" or (unicodedata.category(ch) in ("Cc", "Co", "Cn") and ch not in "\n\t\f")
+    )
+    return bad / len(text) > GARBLED_TEXT_RATIO
+
+
+def count_pdf_pages(file_path: str, backend: Optional[str] = None) -> int:
+    with open_pdf(file_path, backend) as pdf:
+        return pdf.page_count()
+
+
+def iter_pdf_pages(file_path: str, page_indexes: Iterable[int], backend: Optional[str] = None) -> Iterator[str]:
+    """Yield the text of the given zero-based pages, in the order given."""
+    with open_pdf(file_path, backend) as pdf:
+        for index in page_indexes:
+            yield pdf.page_text(index)
+
+
+def extract_pdf_pages(
+    file_path: str, page_indexes: Sequence[int], backend: Optional[str] = None, max_tokens: Optional[int] = None
+) -> List[str]:
+    """Text of the given zero-based pages, in the order given, stopping early at ``max_tokens``."""
+    return list(until_tokens(iter_pdf_pages(file_path, page_indexes, backend), max_tokens))
+
+
+def join_pages(texts: Sequence[str]) -> str:
+    # Pages are separated by form feeds so later stages can split on page boundaries
+    return "\f".join(texts).strip()
+
+
+def iter_pdf_text(file_path: str, pages: Optional[str] = None, backend: Optional[str] = None) -> Iterator[str]:
+    with open_pdf(file_path, backend) as pdf:
+        for i, index in enumerate(select_pages(pages, pdf.page_count())):
+            yield pdf.page_text(index) if i == 0 else "\f" + pdf.page_text(index)
+
+
+def iter_docx_text(file_path: str) -> Iterator[str]:
     doc = docx.Document(file_path)
-    text = "\n".join([para.text for para in doc.paragraphs])
-    return text.strip()
+    for i, para in enumerate(doc.paragraphs):
+        yield para.text if i == 0 else "\n" + para.text
 
 
-def extract_text_from_text(file_path: str) -> str:
+def iter_text_file(file_path: str) -> Iterator[str]:
+    # Read line by line so only the paragraphs taken are held in memory
     with open(file_path, "r", encoding="utf-8") as f:
-        return f.read().strip()
+        paragraph = []
+        for line in f:
+            paragraph.append(line)
+            if not line.strip():
+                yield "".join(paragraph)
+                paragraph = []
+        if paragraph:
+            yield "".join(paragraph)
+
+
+def extract_text_from_pdf(file_path: str, pages: Optional[str] = None, backend: Optional[str] = None) -> str:
+    return "".join(iter_pdf_text(file_path, pages, backend)).strip()
+
+
+def extract_text_from_docx(file_path: str) -> str:
+    return "".join(iter_docx_text(file_path)).strip()
+
+
+def extract_text_from_text(file_path: str) -> str:
+    return "".join(iter_text_file(file_path)).strip()
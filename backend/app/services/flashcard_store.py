@@ -0,0 +1,77 @@
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+from uuid import UUID, uuid4
+
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models import Deck, Flashcard
+
+
+async def get_target_deck(db: AsyncSession, deck_id: UUID, user_id: UUID) -> Deck:
+    """Load a deck owned by the user, raising 404 if it does not exist."""
+    deck = await db.scalar(
+        select(Deck).where(Deck.id == deck_id, Deck.user_id == user_id)
+    )
+    if not deck:
+        raise HTTPException(status_code=404, detail="Target deck not found")
+    return deck
+
+
+async def get_deck_questions(db: AsyncSession, deck_id: UUID) -> List[str]:
+    """Questions of every card already in the deck."""
+    return list(await db.scalars(
+        select(Flashcard.question).where(Flashcard.deck_id == deck_id)
+    ))
+
+
+async def save_generated_flashcards(
+    db: AsyncSession,
+    user_id: UUID,
+    result: Dict[str, Any],
+    deck: Optional[Deck] = None
+) -> Deck:
+    """
+    Persist generated cards for a user.
+
+    Cards are appended to ``deck`` when given, otherwise a new
+    ``Deck_YYYYMMDD_xxxx`` deck is created carrying the generated summary.
+    """
+    if deck is None:
+        deck_uuid = str(uuid4())[:8]
+        deck_name = f"Deck_{datetime.now(timezone.utc).strftime('%Y%m%d')}_{deck_uuid}"
+        summary = result.get("summary", "")
+
+        deck = Deck(
+            id=uuid4(),
+            name=deck_name,
+            summary=summary,
+            user_id=user_id,
+            created_at=datetime.now(timezone.utc),
+            updated_at=datetime.now(timezone.utc)
+        )
+        db.add(deck)
+        await db.commit()
+        await db.refresh(deck)
+
+    for card in result["cards"]:
+        question = card.get("question")
+        answer = card.get("answer")
+
+        if "options" in card and "correct_answer" in card:
+            answer = card["correct_answer"]
+
+        new_flashcard = Flashcard(
+            id=uuid4(),
+            question=question,
+            answer=answer,
+            options=card.get("options"),
+            deck_id=deck.id,
+            user_id=user_id,
+            created_at=datetime.now(timezone.utc)
+        )
+        db.add(new_flashcard)
+
+    await db.commit()
+    return deck
@@ -0,0 +1,123 @@
+import hashlib
+import json
+import logging
+import re
+import unicodedata
+from typing import Any, Dict, Optional
+
+from cachetools import TTLCache
+from redis import asyncio as redis
+
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "flashcards:generation:"
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Normalize input text so trivially different copies share a cache entry."""
+    text = unicodedata.normalize("NFKC", text)
+    return _WHITESPACE_RE.sub(" ", text).strip()
+
+
+def generation_key(
+    text: str,
+    count: int,
+    mode: str,
+    difficulty: str,
+    include_summary: bool
+) -> str:
+    """
+    Build a content-addressed key for a generation request.
+
+    The key is a SHA-256 digest of the normalized text together with every
+    parameter that changes the shape of the generated deck.
+    """
+    payload = json.dumps(
+        {
+            "text": normalize_text(text),
+            "count": count,
+            "mode": mode,
+            "difficulty": difficulty,
+            "include_summary": include_summary,
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return KEY_PREFIX + hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class GenerationCache:
+    """
+    Two-tier cache for generated flashcard sets.
+
+    Entries live in a size-bounded in-process LRU with a TTL and, when a Redis
+    URL is configured, in Redis as well so that every worker shares results.
+    Values are stored as JSON so each hit hands back an independent copy.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: int, redis_url: Optional[str] = None):
+        self.ttl_seconds = ttl_seconds
+        self._local: TTLCache = TTLCache(maxsize=max_entries, ttl=ttl_seconds)
+        self._redis: Optional[redis.Redis] = (
+            redis.from_url(redis_url, decode_responses=True) if redis_url else None
+        )
+        self.hits = 0
+        self.misses = 0
+        self.redis_errors = 0
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        raw = self._local.get(key)
+
+        if raw is None and self._redis is not None:
+            try:
+                raw = await self._redis.get(key)
+            except Exception as e:
+                self.redis_errors += 1
+                logger.warning(f"Generation cache Redis read failed: {str(e)}")
+            if raw is not None:
+                self._local[key] = raw
+
+        if raw is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return json.loads(raw)
+
+    async def set(self, key: str, value: Dict[str, Any]) -> None:
+        raw = json.dumps(value, ensure_ascii=False)
+        self._local[key] = raw
+
+        if self._redis is not None:
+            try:
+                await self._redis.set(key, raw, ex=self.ttl_seconds)
+            except Exception as e:
+                self.redis_errors += 1
+                logger.warning(f"Generation cache Redis write failed: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "backend": "memory+redis" if self._redis is not None else "memory",
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "entries": len(self._local),
+            "max_entries": self._local.maxsize,
+            "redis_errors": self.redis_errors,
+        }
+
+    async def close(self) -> None:
+        if self._redis is not None:
+            await self._redis.aclose()
+
+
+generation_cache = GenerationCache(
+    max_entries=settings.generation_cache_max_entries,
+    ttl_seconds=settings.generation_cache_ttl_seconds,
+    redis_url=settings.redis_url,
+)
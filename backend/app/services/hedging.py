@@ -0,0 +1,88 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional
+
+from ..core.config import settings
+
+
+class Hedger:
+    """
+    Hedge slow calls with a second identical call.
+
+    If a call has not finished after ``delay`` (a high percentile of recent
+    latency), a second copy is started and whichever succeeds first wins;
+    the other is cancelled. Hedges are capped at ``settings.hedge_budget_ratio``
+    of all hedge-eligible calls, so the extra cost stays bounded.
+
+    Latency saved by a winning hedge is estimated from the latency history:
+    had the primary been left to run, it would have taken the mean of past
+    latencies longer than the time the hedge finished at.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.saved_seconds = 0.0
+
+    def _within_budget(self) -> bool:
+        return settings.hedge_enabled and self.hedges < settings.hedge_budget_ratio * self.calls
+
+    async def run(
+        self,
+        call: Callable[[], Awaitable[Any]],
+        delay: Optional[float],
+        start_hedge: Callable[[], bool],
+        history: Iterable[float] = ()
+    ) -> Any:
+        """
+        Run ``call``, hedging it after ``delay`` seconds when the budget and
+        ``start_hedge()`` (e.g. a non-blocking rate-limit check) allow.
+        """
+        self.calls += 1
+        start = time.monotonic()
+        primary = asyncio.create_task(call())
+        if delay is None or not self._within_budget():
+            return await primary
+
+        hedge = None
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+            if done or not self._within_budget() or not start_hedge():
+                return await primary
+
+            self.hedges += 1
+            hedge = asyncio.create_task(call())
+            pending = {primary, hedge}
+            first_error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        first_error = first_error or task.exception()
+                        continue
+                    if task is hedge:
+                        self._record_win(time.monotonic() - start, history)
+                    return task.result()
+            raise first_error
+        finally:
+            primary.cancel()
+            if hedge is not None:
+                hedge.cancel()
+
+    def _record_win(self, elapsed: float, history: Iterable[float]) -> None:
+        self.hedge_wins += 1
+        slower = [latency for latency in history if latency > elapsed]
+        if slower:
+            self.saved_seconds += sum(slower) / len(slower) - elapsed
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": settings.hedge_enabled,
+            "calls": self.calls,
+            "hedges": self.hedges,
+            "hedge_rate": round(self.hedges / self.calls, 4) if self.calls else 0.0,
+            "hedge_wins": self.hedge_wins,
+            "estimated_latency_saved_ms": round(1000 * self.saved_seconds, 1),
+            "avg_saved_per_win_ms": round(1000 * self.saved_seconds / self.hedge_wins, 1) if self.hedge_wins else None,
+        }
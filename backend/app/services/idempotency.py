@@ -0,0 +1,160 @@
+import asyncio
+import hashlib
+import json
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from cachetools import TTLCache
+from fastapi import HTTPException, status
+from redis import asyncio as redis
+
+from ..core.config import settings
+from .request_context import CLIENT_CLOSED_REQUEST
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "flashcards:idempotency:"
+MAX_KEY_LENGTH = 255
+
+
+def request_fingerprint(endpoint: str, params: Dict[str, Any], content_sha256: Optional[str] = None) -> str:
+    """
+    Digest of everything that makes a request distinct, so a reused key can
+    be detected; uploads contribute the SHA-256 of their content.
+    """
+    payload = {"endpoint": endpoint, **params, "content_sha256": content_sha256}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class IdempotencyStore:
+    """
+    Replay the stored response of a request retried with the same ``Idempotency-Key``.
+
+    Keys are scoped to the caller (``scope``, e.g. the user); callers
+    without a stable identity should not use the store. A completed response is stored with the request's
+    fingerprint for ``ttl_seconds`` in a size-bounded in-process cache and,
+    when a Redis URL is configured, in Redis so every worker can replay it.
+    A retry that arrives while the first attempt is still running in this
+    process waits for that attempt, and takes over if that attempt is
+    abandoned by its client. Reusing a key with a different request is a
+    422. Failed attempts are not stored, so they can be retried.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: int, redis_url: Optional[str] = None):
+        self.ttl_seconds = ttl_seconds
+        self._local: TTLCache = TTLCache(maxsize=max_entries, ttl=ttl_seconds)
+        self._redis: Optional[redis.Redis] = (
+            redis.from_url(redis_url, decode_responses=True) if redis_url else None
+        )
+        self._in_flight: Dict[str, Tuple[str, asyncio.Future]] = {}
+        self.replays = 0
+        self.waits = 0
+        self.conflicts = 0
+        self.redis_errors = 0
+
+    async def run(
+        self,
+        scope: str,
+        key: str,
+        fingerprint: str,
+        fn: Callable[[], Awaitable[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        if not key or len(key) > MAX_KEY_LENGTH:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters"
+            )
+        storage_key = KEY_PREFIX + hashlib.sha256(f"{scope}\n{key}".encode("utf-8")).hexdigest()
+
+        while True:
+            stored = await self._get(storage_key)
+            if stored is not None:
+                self._check(stored["fingerprint"], fingerprint)
+                self.replays += 1
+                return stored["response"]
+
+            in_flight = self._in_flight.get(storage_key)
+            if in_flight is None:
+                break
+            self._check(in_flight[0], fingerprint)
+            self.waits += 1
+            try:
+                return await asyncio.shield(in_flight[1])
+            except asyncio.CancelledError:
+                # The first attempt was abandoned; run this one instead
+                if in_flight[1].cancelled():
+                    continue
+                raise
+
+        done: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._in_flight[storage_key] = (fingerprint, done)
+        try:
+            response = await fn()
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError) or getattr(e, "status_code", None) == CLIENT_CLOSED_REQUEST:
+                # Abandoned, e.g. by a client that went away; a waiting retry takes over
+                done.cancel()
+            else:
+                done.set_exception(e)
+                # Waiters (if any) re-raise it
+                done.exception()
+            raise
+        else:
+            await self._set(storage_key, {"fingerprint": fingerprint, "response": response})
+            done.set_result(response)
+            return response
+        finally:
+            self._in_flight.pop(storage_key, None)
+
+    def _check(self, stored_fingerprint: str, fingerprint: str) -> None:
+        if stored_fingerprint != fingerprint:
+            self.conflicts += 1
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Idempotency-Key was already used for a different request"
+            )
+
+    async def _get(self, key: str) -> Optional[Dict[str, Any]]:
+        raw = self._local.get(key)
+        if raw is None and self._redis is not None:
+            try:
+                raw = await self._redis.get(key)
+            except Exception as e:
+                self.redis_errors += 1
+                logger.warning(f"Idempotency store Redis read failed: {str(e)}")
+            if raw is not None:
+                self._local[key] = raw
+        return json.loads(raw) if raw is not None else None
+
+    async def _set(self, key: str, value: Dict[str, Any]) -> None:
+        raw = json.dumps(value, ensure_ascii=False, default=str)
+        self._local[key] = raw
+        if self._redis is not None:
+            try:
+                await self._redis.set(key, raw, ex=self.ttl_seconds)
+            except Exception as e:
+                self.redis_errors += 1
+                logger.warning(f"Idempotency store Redis write failed: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "memory+redis" if self._redis is not None else "memory",
+            "entries": len(self._local),
+            "max_entries": self._local.maxsize,
+            "in_flight": len(self._in_flight),
+            "replays": self.replays,
+            "waits": self.waits,
+            "conflicts": self.conflicts,
+            "redis_errors": self.redis_errors,
+        }
+
+    async def close(self) -> None:
+        if self._redis is not None:
+            await self._redis.aclose()
+
+
+idempotency_store = IdempotencyStore(
+    max_entries=settings.idempotency_max_entries,
+    ttl_seconds=settings.idempotency_ttl_seconds,
+    redis_url=settings.redis_url,
+)
@@ -0,0 +1,196 @@
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from typing import List, Set
+from uuid import UUID
+
+from fastapi import HTTPException
+from sqlalchemy import or_, select, update
+
+from ..core.config import settings
+from ..database import AsyncSessionLocal
+from ..models import GenerationJob, User
+from .ai_flashcard_generator import generate_flashcards_with_groq, remove_duplicate_cards, source_token_budget
+from .document_extraction import extract_document_text
+from .fair_scheduler import fair_scheduler, requester
+from .upload_ingest import remove_upload
+from .flashcard_store import get_deck_questions, get_target_deck, save_generated_flashcards
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+
+
+class GenerationJobQueue:
+    """
+    In-process queue that runs generation jobs on a bounded pool of asyncio workers.
+
+    Every job is a row in ``generation_jobs``; the queue only carries ids. On
+    startup, jobs that were queued, or left running by a worker that went away
+    without updating them, are picked up again. Workers claim a job with a
+    conditional UPDATE so a job is never run twice when several processes
+    share the database.
+    """
+
+    def __init__(self, workers: int):
+        self.worker_count = workers
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._workers: List[asyncio.Task] = []
+        self._running: Set[UUID] = set()
+
+    async def start(self) -> None:
+        os.makedirs(settings.job_upload_dir, exist_ok=True)
+
+        stale_before = datetime.now(timezone.utc) - timedelta(seconds=settings.job_stale_after_seconds)
+        async with AsyncSessionLocal() as db:
+            job_ids = (await db.scalars(
+                select(GenerationJob.id)
+                .where(or_(
+                    GenerationJob.state == JOB_QUEUED,
+                    (GenerationJob.state == JOB_RUNNING) & (GenerationJob.updated_at < stale_before)
+                ))
+                .order_by(GenerationJob.created_at)
+            )).all()
+            if job_ids:
+                await db.execute(
+                    update(GenerationJob)
+                    .where(GenerationJob.id.in_(job_ids))
+                    .values(state=JOB_QUEUED)
+                )
+                await db.commit()
+
+        for job_id in job_ids:
+            self._queue.put_nowait(job_id)
+        if job_ids:
+            logger.info(f"Resumed {len(job_ids)} generation jobs")
+
+        self._workers = [
+            asyncio.create_task(self._worker(), name=f"generation-job-worker-{i}")
+            for i in range(self.worker_count)
+        ]
+
+    async def stop(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+        # Hand interrupted jobs back to the queue so the next start resumes them
+        if self._running:
+            async with AsyncSessionLocal() as db:
+                await db.execute(
+                    update(GenerationJob)
+                    .where(GenerationJob.id.in_(self._running), GenerationJob.state == JOB_RUNNING)
+                    .values(state=JOB_QUEUED, progress=0)
+                )
+                await db.commit()
+            self._running.clear()
+
+    def submit(self, job_id: UUID) -> None:
+        self._queue.put_nowait(job_id)
+
+    def stats(self) -> dict:
+        return {
+            "workers": len(self._workers),
+            "queued": self._queue.qsize(),
+            "running": len(self._running)
+        }
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            self._running.add(job_id)
+            try:
+                await self._run(job_id)
+            except asyncio.CancelledError:
+                # Left in _running so stop() can hand the job back to the queue
+                raise
+            except Exception as e:
+                logger.error(f"Generation job {job_id} crashed: {str(e)}", exc_info=True)
+            self._running.discard(job_id)
+            self._queue.task_done()
+
+    async def _run(self, job_id: UUID) -> None:
+        async with AsyncSessionLocal() as db:
+            claimed = await db.execute(
+                update(GenerationJob)
+                .where(GenerationJob.id == job_id, GenerationJob.state == JOB_QUEUED)
+                .values(state=JOB_RUNNING, progress=5)
+            )
+            await db.commit()
+            if claimed.rowcount != 1:
+                return
+
+            job = await db.get(GenerationJob, job_id)
+            params = job.params
+            file_path = job.file_path
+            try:
+                text = job.input_text
+                if file_path:
+                    # Jobs are already bounded by the worker count, so they wait for a process rather than fail
+                    text = await extract_document_text(
+                        file_path, params.get("pages"), shed=False,
+                        max_tokens=source_token_budget(
+                            params["count"], params["question_mode"], params["difficulty"], True
+                        )
+                    )
+                    await self._set_progress(db, job, 30)
+                if not text or not text.strip():
+                    raise ValueError("No text could be extracted from the file.")
+
+                # Jobs share generation slots fairly with interactive requests but are never shed
+                owner = await db.get(User, job.user_id) if job.user_id is not None else None
+                async with fair_scheduler.slot(requester(owner, f"job:{job.id}"), timeout=None):
+                    result = await generate_flashcards_with_groq(
+                        text=text,
+                        count=params["count"],
+                        mode=params["question_mode"],
+                        difficulty=params["difficulty"],
+                        include_summary=True,
+                        user_id=job.user_id
+                    )
+                if not isinstance(result, dict) or "cards" not in result:
+                    raise ValueError("Failed to generate flashcards")
+                await self._set_progress(db, job, 80)
+
+                if job.user_id is not None:
+                    deck = None
+                    if params.get("deck_id"):
+                        deck = await get_target_deck(db, UUID(params["deck_id"]), job.user_id)
+                        result = await remove_duplicate_cards(
+                            result, text, params["question_mode"], params["difficulty"],
+                            existing_questions=await get_deck_questions(db, deck.id)
+                        )
+                    deck = await save_generated_flashcards(db, job.user_id, result, deck)
+                    job.deck_id = deck.id
+                    result = {**result, "deck_id": str(deck.id), "deck_name": deck.name}
+
+                job.result = result
+                job.state = JOB_SUCCEEDED
+                job.progress = 100
+            except HTTPException as e:
+                await db.rollback()
+                await db.refresh(job)
+                job.state = JOB_FAILED
+                job.error = str(e.detail)
+            except Exception as e:
+                await db.rollback()
+                await db.refresh(job)
+                logger.error(f"Generation job {job_id} failed: {str(e)}")
+                job.state = JOB_FAILED
+                job.error = str(e)
+
+            await db.commit()
+        remove_upload(file_path)
+
+    @staticmethod
+    async def _set_progress(db, job: GenerationJob, progress: int) -> None:
+        job.progress = progress
+        await db.commit()
+
+
+job_queue = GenerationJobQueue(workers=settings.job_workers)
@@ -0,0 +1,176 @@
+import json
+import logging
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class CardStreamParser:
+    """
+    Incremental parser that extracts card objects from a streamed completion.
+
+    Completion text is fed in arbitrary fragments. The parser tracks string
+    and nesting state character by character and returns every object in the
+    ``"cards"`` array as soon as its closing brace arrives, without waiting
+    for the rest of the document. Markdown fences and other text outside the
+    JSON structure are ignored. A bare top-level array of cards is accepted
+    as well.
+    """
+
+    def __init__(self):
+        self._parts: List[str] = []
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._last_key: Optional[str] = None
+        self._cards_depth: Optional[int] = None
+        # Pieces of the key string or card object currently being read;
+        # ``None`` when nothing is being captured
+        self._key_parts: Optional[List[str]] = None
+        self._card_parts: Optional[List[str]] = None
+
+    def feed(self, fragment: str) -> List[Dict[str, Any]]:
+        """Consume a fragment and return the cards completed by it."""
+        completed: List[Dict[str, Any]] = []
+        self._parts.append(fragment)
+        key_from = 0
+        card_from = 0
+
+        for i, ch in enumerate(fragment):
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._key_parts is not None:
+                        self._last_key = "".join(self._key_parts) + fragment[key_from:i]
+                        self._key_parts = None
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                if self._depth == 1:
+                    self._key_parts = []
+                    key_from = i + 1
+            elif ch in "{[":
+                if ch == "[" and self._cards_depth is None and (
+                    self._depth == 0 or (self._depth == 1 and self._last_key == "cards")
+                ):
+                    self._cards_depth = self._depth + 1
+                elif ch == "{" and self._cards_depth is not None and self._depth == self._cards_depth:
+                    self._card_parts = []
+                    card_from = i
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if ch == "}" and self._card_parts is not None and self._depth == self._cards_depth:
+                    card = self._decode("".join(self._card_parts) + fragment[card_from:i + 1])
+                    if card is not None:
+                        completed.append(card)
+                    self._card_parts = None
+                elif ch == "]" and self._cards_depth is not None and self._depth == self._cards_depth - 1:
+                    self._cards_depth = None
+                    self._last_key = None
+
+        if self._key_parts is not None:
+            self._key_parts.append(fragment[key_from:])
+        if self._card_parts is not None:
+            self._card_parts.append(fragment[card_from:])
+
+        return completed
+
+    @property
+    def text(self) -> str:
+        """Everything fed so far."""
+        return "".join(self._parts)
+
+    @staticmethod
+    def _decode(raw: str) -> Optional[Dict[str, Any]]:
+        try:
+            card = json.loads(raw)
+        except json.JSONDecodeError:
+            try:
+                card = json.loads(remove_trailing_commas(raw))
+            except json.JSONDecodeError:
+                logger.warning(f"Skipping malformed card in stream: {raw[:200]}")
+                return None
+        if not _is_card(card):
+            return None
+        return card
+
+
+def _is_card(card: Any) -> bool:
+    return isinstance(card, dict) and bool(card.get("question"))
+
+
+_FENCE_START_RE = re.compile(r"^\s*```[\w-]*\s*")
+_FENCE_END_RE = re.compile(r"\s*```\s*$")
+_TRAILING_COMMA_RE = re.compile(r",(\s*[}\]])")
+_SUMMARY_RE = re.compile(r'"summary"\s*:\s*("(?:[^"\\]|\\.)*")')
+
+
+def strip_code_fences(raw_output: str) -> str:
+    """
+    Remove Markdown code fences and any chatter before the JSON starts.
+
+    Unlike slicing off a fixed number of characters, this copes with a
+    missing closing fence, which is what truncated completions look like.
+    """
+    raw_output = _FENCE_END_RE.sub("", _FENCE_START_RE.sub("", raw_output))
+    starts = [i for i in (raw_output.find("{"), raw_output.find("[")) if i >= 0]
+    if starts:
+        raw_output = raw_output[min(starts):]
+    return raw_output.strip()
+
+
+def remove_trailing_commas(raw: str) -> str:
+    """Drop commas directly before a closing brace or bracket."""
+    return _TRAILING_COMMA_RE.sub(r"\1", raw)
+
+
+def extract_summary(raw_output: str) -> Optional[str]:
+    """Return the ``summary`` string of a completion, even if the rest is malformed."""
+    match = _SUMMARY_RE.search(raw_output)
+    if not match:
+        return None
+    try:
+        return json.loads(match.group(1))
+    except json.JSONDecodeError:
+        return None
+
+
+def parse_flashcards_output(raw_output: str) -> Tuple[Dict[str, Any], bool]:
+    """
+    Parse a flashcard completion, recovering what it can from damaged output.
+
+    Returns ``(result, complete)``. ``result`` always has a ``cards`` list
+    and, when one was found, a ``summary``. ``complete`` is False when the
+    output did not parse as-is (truncated at ``max_tokens``, trailing commas,
+    stray text) and the cards were salvaged one object at a time, or when
+    items of the ``cards`` list that are not card objects with a question
+    were dropped.
+    """
+    text = strip_code_fences(raw_output)
+
+    for candidate in (text, remove_trailing_commas(text)):
+        try:
+            parsed = json.loads(candidate)
+        except json.JSONDecodeError:
+            continue
+        if isinstance(parsed, list):
+            parsed = {"cards": parsed}
+        if isinstance(parsed, dict) and isinstance(parsed.get("cards"), list):
+            cards = [card for card in parsed["cards"] if _is_card(card)]
+            if len(cards) < len(parsed["cards"]):
+                logger.warning(f"Dropped {len(parsed['cards']) - len(cards)} malformed cards from parsed output")
+            return {**parsed, "cards": cards}, len(cards) == len(parsed["cards"])
+
+    parser = CardStreamParser()
+    result: Dict[str, Any] = {"cards": parser.feed(text)}
+    summary = extract_summary(text)
+    if summary is not None:
+        result["summary"] = summary
+    return result, False
@@ -0,0 +1,214 @@
+import asyncio
+import json
+import random
+import re
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import AsyncIterator, Dict, List, Optional
+
+from groq import AsyncGroq
+
+from ..core.config import settings
+
+Messages = List[Dict[str, str]]
+
+
+@dataclass
+class LLMCompletion:
+    text: str
+    model: str
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+
+
+class LLMProvider(ABC):
+    """Chat-completion backend used by the generation service."""
+
+    name: str
+
+    @abstractmethod
+    async def complete(
+        self,
+        messages: Messages,
+        model: str,
+        max_tokens: int,
+        temperature: float = 0.7
+    ) -> LLMCompletion:
+        """Return the full completion for ``messages``."""
+
+    @abstractmethod
+    async def open_stream(
+        self,
+        messages: Messages,
+        model: str,
+        max_tokens: int,
+        temperature: float = 0.7
+    ) -> AsyncIterator[str]:
+        """
+        Start a streamed completion and return an iterator over its text deltas.
+
+        Errors that prevent the stream from starting are raised here, before
+        any text is produced, so callers can retry the call safely.
+        """
+
+
+class GroqProvider(LLMProvider):
+    name = "groq"
+
+    def __init__(self, api_key: Optional[str]):
+        # Retries are handled by the model router so they respect each model's rate budget
+        self.client = AsyncGroq(api_key=api_key, max_retries=0)
+
+    async def complete(self, messages, model, max_tokens, temperature=0.7):
+        response = await self.client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens
+        )
+        usage = response.usage
+        return LLMCompletion(
+            text=response.choices[0].message.content,
+            model=model,
+            prompt_tokens=usage.prompt_tokens if usage else None,
+            completion_tokens=usage.completion_tokens if usage else None,
+        )
+
+    async def open_stream(self, messages, model, max_tokens, temperature=0.7):
+        stream = await self.client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=True
+        )
+        return self._deltas(stream)
+
+    @staticmethod
+    async def _deltas(stream) -> AsyncIterator[str]:
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+
+class FakeProviderError(Exception):
+    """Injected failure; carries a status code so retry logic treats it like a provider error."""
+
+    def __init__(self, status_code: int):
+        super().__init__(f"Fake LLM provider error {status_code}")
+        self.status_code = status_code
+        self.response = None
+
+
+class FakeLLMProvider(LLMProvider):
+    """
+    Offline provider for load tests and CI.
+
+    Reads the requested card count, question mode and summary flag from the
+    generation prompt (from each item of a micro-batched one) and answers
+    with schema-valid cards after a simulated latency. Content is derived
+    from a hash of the prompt, so the same request always yields the same
+    cards. Latency jitter and injected errors
+    (429 or 503) are random, optionally seeded.
+    """
+
+    name = "fake"
+
+    _COUNT_RE = re.compile(r"Generate exactly (\d+)")
+    _MODE_RE = re.compile(r"The question mode is: ([\w-]+)")
+    _ITEM_RE = re.compile(r"^(=== ITEM \d+ ===)[ \t]*$", re.MULTILINE)
+
+    def __init__(self, latency_ms: int, jitter_ms: int, error_rate: float, seed: Optional[int] = None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+
+    async def complete(self, messages, model, max_tokens, temperature=0.7):
+        await self._simulate_call()
+        text = self._respond(messages[-1]["content"])
+        prompt_chars = sum(len(m["content"]) for m in messages)
+        return LLMCompletion(
+            text=text,
+            model=model,
+            prompt_tokens=prompt_chars // 4 + 1,
+            completion_tokens=len(text) // 4 + 1,
+        )
+
+    async def open_stream(self, messages, model, max_tokens, temperature=0.7):
+        await self._simulate_call()
+        return self._deltas(self._respond(messages[-1]["content"]))
+
+    async def _simulate_call(self) -> None:
+        delay_ms = self.latency_ms + self._random.uniform(-self.jitter_ms, self.jitter_ms)
+        await asyncio.sleep(max(0.0, delay_ms) / 1000)
+        if self._random.random() < self.error_rate:
+            raise FakeProviderError(self._random.choice([429, 503]))
+
+    @staticmethod
+    async def _deltas(text: str) -> AsyncIterator[str]:
+        for start in range(0, len(text), 16):
+            await asyncio.sleep(0)
+            yield text[start:start + 16]
+
+    def _respond(self, prompt: str) -> str:
+        parts = self._ITEM_RE.split(prompt)
+        if len(parts) > 1:
+            # Micro-batched prompt: answer every item under its own marker
+            header = parts[0]
+            return "\n".join(
+                f"{marker}\n{self._respond(header + body)}"
+                for marker, body in zip(parts[1::2], parts[2::2])
+            )
+
+        count_match = self._COUNT_RE.search(prompt)
+        if not count_match:
+            # Free-form requests such as summary reduction
+            return "This is a fake summary of the combined sections."
+
+        count = int(count_match.group(1))
+        mode_match = self._MODE_RE.search(prompt)
+        mode = mode_match.group(1) if mode_match else "open_ended"
+        content_random = random.Random(prompt)
+
+        cards = []
+        for i in range(count):
+            topic = content_random.randrange(10_000)
+            if mode == "multiple_choice":
+                cards.append({
+                    "question": f"Fake question {i + 1} about topic {topic}?",
+                    "options": {key: f"Option {key} for topic {topic}" for key in "ABCD"},
+                    "correct_answer": content_random.choice("ABCD"),
+                })
+            elif mode == "true_false":
+                cards.append({
+                    "question": f"Fake statement {i + 1} about topic {topic}.",
+                    "answer": content_random.choice(["True", "False"]),
+                })
+            else:
+                cards.append({
+                    "question": f"Fake question {i + 1} about topic {topic}?",
+                    "answer": f"Fake answer about topic {topic}.",
+                })
+
+        result = {"cards": cards}
+        if '"summary"' in prompt:
+            result["summary"] = f"Fake summary covering {count} cards."
+        return json.dumps(result)
+
+
+def create_llm_provider() -> LLMProvider:
+    """Build the provider selected by ``settings.llm_provider``."""
+    if settings.llm_provider == "groq":
+        return GroqProvider(api_key=settings.groq_api_key)
+    if settings.llm_provider == "fake":
+        return FakeLLMProvider(
+            latency_ms=settings.fake_llm_latency_ms,
+            jitter_ms=settings.fake_llm_jitter_ms,
+            error_rate=settings.fake_llm_error_rate,
+            seed=settings.fake_llm_seed,
+        )
+    raise ValueError(f"Unknown LLM provider: {settings.llm_provider}")
+
+
+llm_provider = create_llm_provider()
@@ -0,0 +1,192 @@
+import asyncio
+import logging
+import random
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import groq
+
+from ..core.config import settings
+from .request_context import remaining
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Classic token bucket refilled continuously at ``capacity`` per minute."""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.available = float(per_minute)
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.available = min(self.capacity, self.available + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until ``amount`` can be taken (requests above capacity wait for a full bucket)."""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.available >= amount:
+            return 0.0
+        return (amount - self.available) / self.rate
+
+    def take(self, amount: float) -> None:
+        self.available -= min(amount, self.capacity)
+
+
+class LLMCallScheduler:
+    """
+    Schedule outbound model calls under requests-per-minute and tokens-per-minute budgets.
+
+    Each call is charged one request plus its estimated cost (prompt tokens +
+    ``max_tokens``). Callers queue behind an ``asyncio.Lock``, which wakes
+    waiters in FIFO order, so excess calls are admitted fairly in arrival
+    order instead of racing for refilled budget. Calls that fail with 429 or a
+    5xx are retried with full-jitter exponential backoff that never undercuts
+    the server's ``Retry-After``; a 429 also pauses admission for that long
+    so queued calls back off too.
+    """
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int):
+        self._requests = TokenBucket(requests_per_minute)
+        self._tokens = TokenBucket(tokens_per_minute)
+        self._lock = asyncio.Lock()
+        self._paused_until = 0.0
+
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+        self.admitted = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    async def acquire(self, tokens: int) -> None:
+        """Wait until the call fits both budgets, then charge it."""
+        start = time.monotonic()
+        self.queue_depth += 1
+        self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+        try:
+            async with self._lock:
+                while True:
+                    now = time.monotonic()
+                    wait = max(
+                        self._paused_until - now,
+                        self._requests.wait_time(1, now),
+                        self._tokens.wait_time(tokens, now),
+                    )
+                    if wait <= 0:
+                        break
+                    await asyncio.sleep(wait)
+                self._requests.take(1)
+                self._tokens.take(tokens)
+        finally:
+            self.queue_depth -= 1
+
+        waited = time.monotonic() - start
+        self.admitted += 1
+        self.total_wait_seconds += waited
+        self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+    def pause(self, seconds: float) -> None:
+        """Hold every queued call for ``seconds`` after the provider rate-limits us."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def estimated_wait(self, tokens: int) -> float:
+        """Seconds a call of ``tokens`` would wait for budget right now, ignoring queued callers."""
+        now = time.monotonic()
+        return max(
+            self._paused_until - now,
+            self._requests.wait_time(1, now),
+            self._tokens.wait_time(tokens, now),
+        )
+
+    def try_take(self, tokens: int) -> bool:
+        """Charge a call only if it fits the budgets now and nobody is queued."""
+        if self._lock.locked() or self.queue_depth or self.estimated_wait(tokens) > 0:
+            return False
+        self._requests.take(1)
+        self._tokens.take(tokens)
+        self.admitted += 1
+        return True
+
+    async def call(self, fn: Callable[[], Awaitable[Any]], tokens: int, max_retries: Optional[int] = None) -> Any:
+        """
+        Run ``fn`` under the budgets, retrying rate limits and server errors
+        up to ``max_retries`` times (default ``settings.llm_max_retries``).
+        """
+        if max_retries is None:
+            max_retries = settings.llm_max_retries
+        attempt = 0
+        while True:
+            await self.acquire(tokens)
+            try:
+                return await fn()
+            except Exception as e:
+                status_code = getattr(e, "status_code", None)
+                if not is_retryable(e, status_code):
+                    raise
+
+                backoff = min(
+                    settings.llm_backoff_max_seconds,
+                    settings.llm_backoff_base_seconds * 2 ** attempt
+                )
+                delay = random.uniform(0, backoff)
+                retry_after = retry_after_seconds(e)
+                if retry_after is not None:
+                    delay = max(delay, retry_after)
+                if status_code == 429:
+                    # Paused even when not retrying here, so later calls see the limit
+                    self.rate_limited += 1
+                    self.pause(delay)
+                left = remaining()
+                if attempt >= max_retries or (left is not None and delay >= left):
+                    raise
+
+                attempt += 1
+                self.retries += 1
+                logger.warning(f"LLM call failed ({status_code or type(e).__name__}), retry {attempt} in {delay:.2f}s")
+                await asyncio.sleep(delay)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "admitted": self.admitted,
+            "retries": self.retries,
+            "rate_limited": self.rate_limited,
+            "avg_wait_ms": round(1000 * self.total_wait_seconds / self.admitted, 1) if self.admitted else 0.0,
+            "max_wait_ms": round(1000 * self.max_wait_seconds, 1),
+            "requests_available": int(self._requests.available),
+            "tokens_available": int(self._tokens.available),
+        }
+
+
+def is_retryable(e: Exception, status_code: Optional[int]) -> bool:
+    if status_code is not None:
+        return status_code == 429 or status_code >= 500
+    # Connection failures and timeouts carry no status code
+    return isinstance(e, (groq.APIConnectionError, asyncio.TimeoutError))
+
+
+def retry_after_seconds(e: Exception) -> Optional[float]:
+    """Read ``Retry-After`` (seconds or HTTP date) from a provider error, if present."""
+    response = getattr(e, "response", None)
+    headers = getattr(response, "headers", None)
+    value = headers.get("retry-after") if headers is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
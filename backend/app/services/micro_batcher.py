@@ -0,0 +1,114 @@
+import asyncio
+import contextvars
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional
+
+from ..core.config import settings
+
+BatchRunner = Callable[[Hashable, List[Any]], Awaitable[List[Any]]]
+
+
+class RunAlone(Exception):
+    """Raised to a request whose batch closed with no other request in it."""
+
+
+class _Batch:
+    def __init__(self):
+        self.items: List[Any] = []
+        self.futures: List[asyncio.Future] = []
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+
+class MicroBatcher:
+    """
+    Gather compatible requests for a short window and serve them with one call.
+
+    Requests with the same key join the open batch for that key; a batch is
+    sent when ``settings.micro_batch_window_ms`` has passed since its first
+    request, when it reaches ``settings.micro_batch_max_items``, or when
+    ``can_add`` says the next item would not fit. ``run_batch(key, items)``
+    returns one outcome per item, in order; an outcome that is an exception
+    is raised to that item's caller only. A batch that closes with a single
+    request gains nothing, so that request gets ``RunAlone`` and makes its
+    usual call itself.
+
+    Batches run in a fresh context, so they are not bound to the deadline or
+    usage accounting of whichever request happened to open them.
+    """
+
+    def __init__(self, run_batch: BatchRunner, can_add: Callable[[List[Any], Any], bool] = lambda items, item: True):
+        self._run_batch = run_batch
+        self._can_add = can_add
+        self._open: Dict[Hashable, _Batch] = {}
+        self._running: set = set()
+        self.batches = 0
+        self.items = 0
+        self.max_batch_size = 0
+        self.alone = 0
+        self.fallbacks = 0
+
+    async def submit(self, key: Hashable, item: Any) -> Any:
+        batch = self._open.get(key)
+        if batch is not None and not self._can_add(batch.items, item):
+            self._send(key, batch)
+            batch = None
+        if batch is None:
+            batch = _Batch()
+            self._open[key] = batch
+            batch.timer = asyncio.get_running_loop().call_later(
+                settings.micro_batch_window_ms / 1000, self._send, key, batch
+            )
+
+        future = asyncio.get_running_loop().create_future()
+        batch.items.append(item)
+        batch.futures.append(future)
+        if len(batch.items) >= settings.micro_batch_max_items:
+            self._send(key, batch)
+        return await future
+
+    def _send(self, key: Hashable, batch: _Batch) -> None:
+        if self._open.get(key) is batch:
+            del self._open[key]
+        if batch.timer is not None:
+            batch.timer.cancel()
+            batch.timer = None
+        task = asyncio.create_task(self._run(key, batch), context=contextvars.Context())
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def _run(self, key: Hashable, batch: _Batch) -> None:
+        if len(batch.items) == 1:
+            self.alone += 1
+            if not batch.futures[0].done():
+                batch.futures[0].set_exception(RunAlone())
+            return
+
+        self.batches += 1
+        self.items += len(batch.items)
+        self.max_batch_size = max(self.max_batch_size, len(batch.items))
+        try:
+            outcomes = await self._run_batch(key, batch.items)
+        except Exception as e:
+            outcomes = [e] * len(batch.items)
+        for future, outcome in zip(batch.futures, outcomes):
+            if future.done():
+                # The caller went away
+                continue
+            if isinstance(outcome, BaseException):
+                future.set_exception(outcome)
+            else:
+                future.set_result(outcome)
+
+    def record_fallback(self) -> None:
+        """Count an item whose share of a batch failed and was retried on its own."""
+        self.fallbacks += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": settings.micro_batch_enabled,
+            "batches": self.batches,
+            "batched_items": self.items,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else None,
+            "max_batch_size": self.max_batch_size,
+            "ran_alone": self.alone,
+            "fallbacks": self.fallbacks,
+        }
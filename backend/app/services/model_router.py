@@ -0,0 +1,280 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from ..core.config import settings
+from .circuit_breaker import OPEN, CircuitBreaker, CircuitOpenError
+from .hedging import Hedger
+from .llm_scheduler import LLMCallScheduler, is_retryable
+from .request_context import DeadlineExceeded, bounded_timeout
+
+logger = logging.getLogger(__name__)
+
+
+class RequestTooLargeError(Exception):
+    """Raised for a call that no model in the routing table can take."""
+
+    def __init__(self, prompt_tokens: int, max_tokens: int):
+        super().__init__(
+            f"No model fits a request of ~{prompt_tokens} prompt tokens and max_tokens={max_tokens}"
+        )
+        self.prompt_tokens = prompt_tokens
+        self.max_tokens = max_tokens
+
+
+@dataclass
+class ModelRoute:
+    model: str
+    context_window: int
+    max_completion_tokens: int
+    requests_per_minute: int
+    tokens_per_minute: int
+    # Difficulties this model is preferred for; empty means no preference
+    difficulties: List[str] = field(default_factory=list)
+
+    @property
+    def request_token_limit(self) -> int:
+        # Providers reject a single request larger than the per-minute token limit
+        return min(self.context_window, self.tokens_per_minute)
+
+    def fits(self, prompt_tokens: int, max_tokens: int) -> bool:
+        return (
+            max_tokens <= self.max_completion_tokens
+            and prompt_tokens + max_tokens <= self.request_token_limit
+        )
+
+
+class ModelStats:
+    """Per-model attempt outcomes and latency, for tuning the routing table."""
+
+    def __init__(self, window: int = 200):
+        self.attempts = 0
+        self.successes = 0
+        self.failures = 0
+        self.fallbacks = 0
+        self._latencies: deque = deque(maxlen=window)
+
+    def record(self, ok: bool, seconds: float) -> None:
+        self.attempts += 1
+        if ok:
+            self.successes += 1
+            self._latencies.append(seconds)
+        else:
+            self.failures += 1
+
+    @property
+    def latencies(self) -> List[float]:
+        return list(self._latencies)
+
+    def latency_percentile(self, p: float, min_samples: int = 1) -> Optional[float]:
+        """Seconds at percentile ``p`` of recent successful calls, if enough were seen."""
+        if len(self._latencies) < max(1, min_samples):
+            return None
+        latencies = sorted(self._latencies)
+        return latencies[min(len(latencies) - 1, int(p * len(latencies)))]
+
+    def stats(self) -> Dict[str, Any]:
+        def percentile(p: float) -> Optional[float]:
+            value = self.latency_percentile(p)
+            return round(1000 * value, 1) if value is not None else None
+
+        return {
+            "attempts": self.attempts,
+            "successes": self.successes,
+            "failures": self.failures,
+            "success_rate": round(self.successes / self.attempts, 3) if self.attempts else None,
+            "fallbacks": self.fallbacks,
+            "latency_p50_ms": percentile(0.5),
+            "latency_p95_ms": percentile(0.95),
+        }
+
+
+class ModelRouter:
+    """
+    Choose a model for each call from a routing table and fall back down it.
+
+    Each model has its own RPM/TPM scheduler, circuit breaker and
+    statistics. For a call, the candidates are the models whose circuit is
+    not open and whose context window, completion limit and per-request
+    token limit fit the estimated prompt and ``max_tokens``.
+    Models that can admit the call without waiting for budget come first,
+    then models preferred for the request's difficulty, in table order. A 429, 5xx or
+    timeout on one model moves the call to the next candidate; only the
+    last candidate retries in place with backoff. When every fitting model's
+    circuit is open the call fails fast with ``CircuitOpenError``.
+    """
+
+    def __init__(self, routes: List[ModelRoute]):
+        if not routes:
+            raise ValueError("At least one model route is required")
+        self.routes = routes
+        self._schedulers = {
+            route.model: LLMCallScheduler(route.requests_per_minute, route.tokens_per_minute)
+            for route in routes
+        }
+        self._stats = {route.model: ModelStats() for route in routes}
+        self._breakers = {route.model: CircuitBreaker() for route in routes}
+        self.hedger = Hedger()
+
+    @property
+    def max_completion_tokens(self) -> int:
+        return max(route.max_completion_tokens for route in self.routes)
+
+    def request_token_limit(self, max_tokens: int) -> Optional[int]:
+        """
+        The largest per-request token limit among models whose completion
+        limit admits ``max_tokens``; None when no model does. Both limits
+        come from the same model, so a request planned within it fits one.
+        """
+        limits = [route.request_token_limit for route in self.routes if max_tokens <= route.max_completion_tokens]
+        return max(limits) if limits else None
+
+    def fits_any(self, prompt_tokens: int, max_tokens: int) -> bool:
+        return any(route.fits(prompt_tokens, max_tokens) for route in self.routes)
+
+    def candidates(self, prompt_tokens: int, max_tokens: int, difficulty: Optional[str] = None) -> List[ModelRoute]:
+        fitting = [
+            route for route in self.routes
+            if route.fits(prompt_tokens, max_tokens) and self._breakers[route.model].available()
+        ]
+        tokens = prompt_tokens + max_tokens
+
+        def rank(item):
+            position, route = item
+            preferred = not route.difficulties or difficulty in route.difficulties
+            waits = self._schedulers[route.model].estimated_wait(tokens) > 0
+            return (waits, not preferred, position)
+
+        return [route for _, route in sorted(enumerate(fitting), key=rank)]
+
+    async def call(
+        self,
+        fn: Callable[[str], Awaitable[Any]],
+        prompt_tokens: int,
+        max_tokens: int,
+        difficulty: Optional[str] = None,
+        hedge: bool = False
+    ) -> Any:
+        """
+        Run ``fn(model)`` on the best candidate, falling back on rate limits
+        and timeouts. With ``hedge``, slow attempts are hedged (see ``Hedger``);
+        only use it for calls that are safe to run twice.
+        """
+        routes = self.candidates(prompt_tokens, max_tokens, difficulty)
+        if not routes:
+            fitting = [route for route in self.routes if route.fits(prompt_tokens, max_tokens)]
+            if fitting:
+                raise CircuitOpenError(min(self._breakers[route.model].retry_after() for route in fitting))
+            # Budget planning should have rejected this; never send a request every model refuses
+            raise RequestTooLargeError(prompt_tokens, max_tokens)
+
+        for i, route in enumerate(routes):
+            last = i == len(routes) - 1
+            try:
+                return await self._schedulers[route.model].call(
+                    lambda: self._attempt(route.model, fn, prompt_tokens + max_tokens if hedge else None),
+                    tokens=prompt_tokens + max_tokens,
+                    max_retries=None if last else 0
+                )
+            except CircuitOpenError:
+                # The circuit opened while this call was queued
+                if last:
+                    raise
+            except Exception as e:
+                if last or not is_retryable(e, getattr(e, "status_code", None)):
+                    raise
+                self._stats[route.model].fallbacks += 1
+                logger.warning(
+                    f"Model {route.model} failed ({getattr(e, 'status_code', None) or type(e).__name__}), "
+                    f"falling back to {routes[i + 1].model}"
+                )
+
+    async def _attempt(self, model: str, fn: Callable[[str], Awaitable[Any]], hedge_tokens: Optional[int] = None) -> Any:
+        # Calls never outlive the request's deadline
+        timeout = bounded_timeout(settings.llm_call_timeout_seconds)
+        breaker = self._breakers[model]
+        if not breaker.try_acquire():
+            raise CircuitOpenError(breaker.retry_after())
+
+        def call():
+            return asyncio.wait_for(fn(model), timeout=timeout)
+
+        start = time.monotonic()
+        try:
+            if hedge_tokens is None:
+                result = await call()
+            else:
+                stats = self._stats[model]
+                result = await self.hedger.run(
+                    call,
+                    delay=stats.latency_percentile(settings.hedge_percentile, settings.hedge_min_samples),
+                    # A hedge is only sent if the model's budget admits it without waiting
+                    start_hedge=lambda: self._schedulers[model].try_take(hedge_tokens),
+                    history=stats.latencies
+                )
+        except asyncio.CancelledError:
+            breaker.release()
+            raise
+        except asyncio.TimeoutError as e:
+            if timeout < settings.llm_call_timeout_seconds:
+                # Cut short by the request deadline; says nothing about the model
+                breaker.release()
+                raise DeadlineExceeded() from e
+            elapsed = time.monotonic() - start
+            self._stats[model].record(False, elapsed)
+            breaker.record(True, elapsed)
+            raise
+        except Exception as e:
+            elapsed = time.monotonic() - start
+            self._stats[model].record(False, elapsed)
+            breaker.record(_is_outage(e), elapsed)
+            raise
+        elapsed = time.monotonic() - start
+        self._stats[model].record(True, elapsed)
+        breaker.record(False, elapsed)
+        return result
+
+    def circuit_states(self) -> Dict[str, Any]:
+        return {model: breaker.stats() for model, breaker in self._breakers.items()}
+
+    def all_circuits_open(self) -> bool:
+        return all(breaker.stats()["state"] == OPEN for breaker in self._breakers.values())
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            route.model: {
+                **self._stats[route.model].stats(),
+                "scheduler": self._schedulers[route.model].stats(),
+                "circuit": self._breakers[route.model].stats(),
+            }
+            for route in self.routes
+        }
+
+
+def _is_outage(e: Exception) -> bool:
+    """Errors that say the model is unhealthy; rate limits and bad requests do not."""
+    status_code = getattr(e, "status_code", None)
+    return status_code != 429 and is_retryable(e, status_code)
+
+
+def load_routes() -> List[ModelRoute]:
+    """
+    Build the routing table from ``settings.llm_routes``.
+
+    Missing fields default to the global LLM limits; an empty table routes
+    everything to ``settings.llm_model``.
+    """
+    defaults = {
+        "context_window": settings.llm_context_window,
+        "max_completion_tokens": settings.llm_max_completion_tokens,
+        "requests_per_minute": settings.llm_requests_per_minute,
+        "tokens_per_minute": settings.llm_tokens_per_minute,
+    }
+    entries = settings.llm_routes or [{"model": settings.llm_model}]
+    return [ModelRoute(**{**defaults, **entry}) for entry in entries]
+
+
+model_router = ModelRouter(load_routes())
@@ -0,0 +1,127 @@
+import asyncio
+import contextvars
+import logging
+import time
+from collections import defaultdict
+from typing import Any, Awaitable, Dict, Optional
+
+from fastapi import HTTPException, Request, status
+
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# nginx's status for a request the client abandoned; it is never actually sent
+CLIENT_CLOSED_REQUEST = 499
+
+DISCONNECT = "disconnect"
+DEADLINE = "deadline"
+
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("request_deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    """The request's deadline passed before this step could finish."""
+
+
+def start_deadline(seconds: Optional[float] = None) -> contextvars.Token:
+    """Give the current request (and the tasks it starts) a deadline ``seconds`` from now."""
+    seconds = settings.request_deadline_seconds if seconds is None else seconds
+    return _deadline.set(time.monotonic() + seconds)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left before the current request's deadline, or None without one."""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def bounded_timeout(timeout: Optional[float]) -> Optional[float]:
+    """``timeout`` shortened to the time left before the deadline; raises once it has passed."""
+    left = remaining()
+    if left is None:
+        return timeout
+    if left <= 0:
+        raise DeadlineExceeded()
+    return left if timeout is None else min(timeout, left)
+
+
+def deadline_error() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+        detail="Generating flashcards took too long. Please try again with a smaller input."
+    )
+
+
+class CancellationStats:
+    """Work abandoned because the client left or the deadline passed, by pipeline stage."""
+
+    def __init__(self):
+        self.cancelled: Dict[str, Dict[str, int]] = defaultdict(lambda: {DISCONNECT: 0, DEADLINE: 0})
+        self.saved_after_disconnect = 0
+
+    def record(self, stage: str, reason: str) -> None:
+        self.cancelled[stage][reason] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "cancelled": {stage: dict(counts) for stage, counts in self.cancelled.items()},
+            "saved_after_disconnect": self.saved_after_disconnect,
+        }
+
+
+cancellation_stats = CancellationStats()
+
+
+async def run_watched(
+    http_request: Optional[Request],
+    stage: str,
+    work: Awaitable[Any],
+    watch_disconnect: bool = True
+) -> Any:
+    """
+    Run ``work`` until it finishes, the request's deadline passes (504) or,
+    with ``watch_disconnect``, the client disconnects (499). In the last two
+    cases the work is cancelled so it stops holding model budget,
+    generation slots and database connections. Blocking work run through
+    ``asyncio.to_thread`` cannot be interrupted, but is no longer awaited.
+    """
+    task = asyncio.ensure_future(work)
+    try:
+        while True:
+            left = remaining()
+            poll = settings.disconnect_poll_seconds
+            done, _ = await asyncio.wait({task}, timeout=poll if left is None else max(0.0, min(poll, left)))
+            if done:
+                return task.result()
+
+            if left is not None and left <= poll:
+                cancellation_stats.record(stage, DEADLINE)
+                logger.warning(f"Request deadline passed during {stage}, cancelling")
+                raise deadline_error()
+            if watch_disconnect and http_request is not None and await http_request.is_disconnected():
+                cancellation_stats.record(stage, DISCONNECT)
+                logger.info(f"Client disconnected during {stage}, cancelling")
+                raise HTTPException(status_code=CLIENT_CLOSED_REQUEST, detail="Client closed request")
+    except DeadlineExceeded:
+        cancellation_stats.record(stage, DEADLINE)
+        raise deadline_error()
+    finally:
+        if not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+
+async def ensure_connected(http_request: Optional[Request], stage: str, keep_results: bool = False) -> None:
+    """
+    Before committing finished work, give up (499) if the client has left,
+    unless ``keep_results`` says its results are saved regardless.
+    """
+    if http_request is None or not await http_request.is_disconnected():
+        return
+    if keep_results:
+        cancellation_stats.saved_after_disconnect += 1
+        return
+    cancellation_stats.record(stage, DISCONNECT)
+    logger.info(f"Client disconnected before {stage}, discarding results")
+    raise HTTPException(status_code=CLIENT_CLOSED_REQUEST, detail="Client closed request")
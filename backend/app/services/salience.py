@@ -0,0 +1,192 @@
+import math
+from typing import List, Tuple
+
+import numpy as np
+
+# Text is hashed in blocks of about this many bytes to bound temporary arrays
+_BLOCK_BYTES = 1 << 20
+# Longer texts are scored on an evenly strided subset of their sentences of about this size
+MAX_SCORED_BYTES = 2 << 20
+# Sentences with fewer scored words (headings, captions, stray lines) rank last
+MIN_SENTENCE_WORDS = 4
+# Words shorter than this carry little topic and are ignored
+MIN_WORD_BYTES = 3
+MAX_WORD_BYTES = 64
+
+_HASH_BASE = np.uint64(0x100000001B3)
+# Inverse of the (odd) base modulo 2**64, to shift prefix hashes back to offset 0
+_HASH_BASE_INV = np.uint64(pow(0x100000001B3, -1, 2**64))
+
+_WORD_BYTES = np.zeros(256, dtype=bool)
+for _c in b"abcdefghijklmnopqrstuvwxyz0123456789":
+    _WORD_BYTES[_c] = True
+# Any byte of a multi-byte UTF-8 sequence counts as a word byte
+_WORD_BYTES[128:] = True
+
+_LOWER = np.arange(256, dtype=np.uint8)
+_LOWER[ord("A"):ord("Z") + 1] += 32
+
+_SENTENCE_END = np.zeros(256, dtype=bool)
+for _c in b".!?":
+    _SENTENCE_END[_c] = True
+_SPACE = np.zeros(256, dtype=bool)
+for _c in b" \t\r\n\f\v":
+    _SPACE[_c] = True
+
+
+def _powers(n: int, base: np.uint64) -> np.ndarray:
+    powers = np.full(n, base, dtype=np.uint64)
+    powers[0] = 1
+    return np.cumprod(powers, dtype=np.uint64)
+
+
+_POWERS = _powers(_BLOCK_BYTES + 1, _HASH_BASE)
+_INV_POWERS = _powers(_BLOCK_BYTES + 1, _HASH_BASE_INV)
+
+
+def _sentence_bounds(data: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Start and end byte offsets of the sentences in ``data``."""
+    # A sentence ends after . ! ? followed by whitespace, at a blank line or a page break
+    follows_space = np.zeros(len(data), dtype=bool)
+    follows_space[:-1] = _SPACE[data[1:]]
+    ends = _SENTENCE_END[data] & follows_space
+    newline = data == ord("\n")
+    ends[:-1] |= newline[:-1] & newline[1:]
+    ends |= data == ord("\f")
+
+    stops = np.flatnonzero(ends) + 1
+    starts = np.concatenate(([0], stops))
+    stops = np.concatenate((stops, [len(data)]))
+    keep = stops > starts
+    return starts[keep], stops[keep]
+
+
+def _sample_sentences(
+    data: np.ndarray, starts: np.ndarray, ends: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Every n-th sentence, so that about ``MAX_SCORED_BYTES`` remain. Returns
+    the kept sentences' bytes packed together, their bounds in the packed
+    bytes, and their bounds in ``data``.
+    """
+    stride = math.ceil(len(data) / MAX_SCORED_BYTES)
+    starts, ends = starts[::stride], ends[::stride]
+    lengths = ends - starts
+    packed_ends = np.cumsum(lengths)
+    packed_starts = packed_ends - lengths
+    # Sentences end at whitespace or punctuation, so packing never joins two words
+    indexes = np.repeat(starts - packed_starts, lengths) + np.arange(packed_ends[-1] if len(lengths) else 0)
+    return data[indexes], packed_starts, packed_ends, starts, ends
+
+
+def _word_hashes(data: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Hash every word of at least ``MIN_WORD_BYTES`` bytes; return (hashes, start offsets)."""
+    is_word = _WORD_BYTES[data]
+    edges = np.diff(is_word.astype(np.int8), prepend=0, append=0)
+    word_starts = np.flatnonzero(edges == 1)
+    word_ends = np.flatnonzero(edges == -1)
+    long_enough = word_ends - word_starts >= MIN_WORD_BYTES
+    word_starts, word_ends = word_starts[long_enough], word_ends[long_enough]
+
+    # Long tokens (URLs, base64 noise) are hashed on their first bytes only
+    word_ends = np.minimum(word_ends, word_starts + MAX_WORD_BYTES)
+
+    hashes = np.empty(len(word_starts), dtype=np.uint64)
+    first_word = 0
+    while first_word < len(word_starts):
+        block_start = word_starts[first_word]
+        last_word = np.searchsorted(word_ends, block_start + _BLOCK_BYTES, side="right")
+        block_end = word_ends[last_word - 1]
+
+        block = data[block_start:block_end].astype(np.uint64)
+        prefix = np.zeros(len(block) + 1, dtype=np.uint64)
+        np.cumsum(block * _POWERS[:len(block)], out=prefix[1:])
+
+        starts = word_starts[first_word:last_word] - block_start
+        ends = word_ends[first_word:last_word] - block_start
+        hashes[first_word:last_word] = (prefix[ends] - prefix[starts]) * _INV_POWERS[starts]
+        first_word = last_word
+    return hashes, word_starts
+
+
+def select_salient_text(text: str, max_chars: int) -> str:
+    """
+    Pick the most informative sentences of ``text`` that fit in ``max_chars``.
+
+    Each sentence is scored by the mean TF-IDF weight of its words, with
+    sentences as the IDF documents and term frequency taken over the whole
+    text, so terms the document keeps returning to but that are not spread
+    evenly across it count most. Sentences are taken best first until the
+    budget is full and returned in their original order, giving one prompt
+    that covers the whole document instead of its first ``max_chars``
+    characters.
+
+    Tokenizing, hashing and counting all run as NumPy array operations over
+    the UTF-8 bytes, at roughly 0.1 s per MB. Texts over ``MAX_SCORED_BYTES``
+    are scored on an evenly strided subset of their sentences of about that
+    size, so the time spent stays near that of a 2 MB text however long the
+    document; only the subset's sentences can then be selected.
+    """
+    if len(text) <= max_chars:
+        return text
+
+    original = text.encode("utf-8")
+    # ASCII case folding keeps byte offsets aligned with the original text
+    data = _LOWER[np.frombuffer(original, dtype=np.uint8)]
+    sentence_starts, sentence_ends = _sentence_bounds(data)
+    # Offsets into ``original`` of the sentences being scored
+    source_starts, source_ends = sentence_starts, sentence_ends
+    if len(data) > MAX_SCORED_BYTES:
+        data, sentence_starts, sentence_ends, source_starts, source_ends = _sample_sentences(
+            data, sentence_starts, sentence_ends
+        )
+    hashes, word_starts = _word_hashes(data)
+    if not len(hashes):
+        return text[:max_chars]
+
+    sentence_of_word = np.searchsorted(sentence_starts, word_starts, side="right") - 1
+    term_ids, term_of_word, term_counts = np.unique(hashes, return_inverse=True, return_counts=True)
+
+    # Document frequency: the number of sentences each term occurs in
+    pairs = np.sort(sentence_of_word.astype(np.int64) * len(term_ids) + term_of_word)
+    pairs = pairs[np.concatenate(([True], pairs[1:] != pairs[:-1]))]
+    document_frequency = np.bincount(pairs % len(term_ids), minlength=len(term_ids))
+    idf = np.log(len(sentence_starts) / document_frequency)
+    weights = np.log1p(term_counts) * idf
+
+    sentence_count = len(sentence_starts)
+    words_per_sentence = np.bincount(sentence_of_word, minlength=sentence_count)
+    totals = np.bincount(sentence_of_word, weights=weights[term_of_word], minlength=sentence_count)
+    scores = np.where(
+        words_per_sentence >= MIN_SENTENCE_WORDS,
+        totals / np.maximum(words_per_sentence, 1),
+        0.0
+    )
+    # Repeated sentences (boilerplate, copy-paste) are kept only at their first occurrence
+    by_content = np.lexsort((np.arange(sentence_count), words_per_sentence, totals))
+    repeated = (
+        (totals[by_content[1:]] == totals[by_content[:-1]])
+        & (words_per_sentence[by_content[1:]] == words_per_sentence[by_content[:-1]])
+    )
+    scores[by_content[1:][repeated]] = -1.0
+
+    # Budget in bytes is a close, conservative stand-in for characters
+    lengths = sentence_ends - sentence_starts
+    order = np.argsort(-scores, kind="stable")
+    order = order[(lengths[order] <= max_chars) & (scores[order] >= 0)]
+    taken = np.searchsorted(np.cumsum(lengths[order] + 1), max_chars, side="right")
+    selected = np.sort(order[:taken])
+
+    parts: List[str] = []
+    previous_end = -1
+    for index in selected:
+        start, end = source_starts[index], source_ends[index]
+        sentence = original[start:end].decode("utf-8", errors="ignore").strip()
+        if not sentence:
+            continue
+        if parts:
+            parts.append(" " if start == previous_end else "\n")
+        parts.append(sentence)
+        previous_end = end
+    # No sentence fits (e.g. one huge unpunctuated block): fall back to the head
+    return "".join(parts) or text[:max_chars]
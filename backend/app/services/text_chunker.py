@@ -0,0 +1,75 @@
+import re
+from typing import List
+
+PAGE_BREAK = "\f"
+
+_PARAGRAPH_RE = re.compile(r"\n\s*\n")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+
+
+def split_into_chunks(text: str, max_chars: int) -> List[str]:
+    """
+    Split text into chunks of at most ``max_chars`` characters.
+
+    Boundaries are preferred in this order: page breaks (form feeds inserted
+    by the PDF extractor), blank-line paragraph breaks, sentence ends and,
+    only for a single oversized sentence, a hard cut. Adjacent pieces are
+    packed greedily so chunks are as large as the limit allows.
+    """
+    pieces: List[str] = []
+    for page in text.split(PAGE_BREAK):
+        for paragraph in _PARAGRAPH_RE.split(page):
+            paragraph = paragraph.strip()
+            if not paragraph:
+                continue
+            if len(paragraph) <= max_chars:
+                pieces.append(paragraph)
+                continue
+            for sentence in _SENTENCE_RE.split(paragraph):
+                for start in range(0, len(sentence), max_chars):
+                    pieces.append(sentence[start:start + max_chars])
+
+    chunks: List[str] = []
+    current: List[str] = []
+    current_len = 0
+    for piece in pieces:
+        # Account for the "\n\n" separator when joining with the current chunk
+        added = len(piece) + (2 if current else 0)
+        if current and current_len + added > max_chars:
+            chunks.append("\n\n".join(current))
+            current, current_len = [], 0
+            added = len(piece)
+        current.append(piece)
+        current_len += added
+    if current:
+        chunks.append("\n\n".join(current))
+
+    return chunks
+
+
+def group_evenly(chunks: List[str], limit: int) -> List[List[str]]:
+    """Group chunks, in order, into at most ``limit`` runs of consecutive chunks of near-equal length."""
+    groups = min(len(chunks), max(1, limit))
+    bounds = [len(chunks) * i // groups for i in range(groups + 1)]
+    return [chunks[bounds[i]:bounds[i + 1]] for i in range(groups)]
+
+
+def allocate_counts(sizes: List[int], total: int) -> List[int]:
+    """
+    Divide ``total`` cards across chunks in proportion to their sizes.
+
+    Uses the largest-remainder method so the allocation always sums to
+    ``total``. Chunks may receive zero cards when ``total`` is smaller than
+    the number of chunks.
+    """
+    size_sum = sum(sizes)
+    if size_sum == 0 or total <= 0:
+        return [0] * len(sizes)
+
+    quotas = [total * size / size_sum for size in sizes]
+    counts = [int(q) for q in quotas]
+    remaining = total - sum(counts)
+    by_remainder = sorted(range(len(sizes)), key=lambda i: quotas[i] - counts[i], reverse=True)
+    for i in by_remainder[:remaining]:
+        counts[i] += 1
+    return counts
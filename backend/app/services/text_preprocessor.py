@@ -0,0 +1,131 @@
+import logging
+import math
+import re
+from collections import Counter
+from typing import Any, Dict, List
+
+from .text_chunker import PAGE_BREAK
+from .token_budget import count_tokens
+
+logger = logging.getLogger(__name__)
+
+# Lines at the top and bottom of a page that may be running headers or footers
+EDGE_LINES = 3
+# A running line must appear on at least this many pages (and half of them)
+MIN_REPEATS = 3
+
+_DIGITS_RE = re.compile(r"\d+")
+_PAGE_NUMBER_RE = re.compile(
+    r"^[-–—\s]*(?:page\s+)?"
+    r"(?:\d+|m{0,3}(?:cm|cd|d?c{0,3})(?:xc|xl|l?x{0,3})(?:ix|iv|v?i{0,3}))"
+    r"(?:\s*(?:of|/)\s*\d+)?[-–—\s]*$",
+    re.IGNORECASE
+)
+_HYPHEN_BREAK_RE = re.compile(r"(\w)-\n[ \t]*([a-z])")
+_INLINE_SPACE_RE = re.compile(r"[ \t\r\v\u00a0]+")
+_LINE_EDGE_SPACE_RE = re.compile(r" ?\n ?")
+_BLANK_LINES_RE = re.compile(r"\n{3,}")
+
+
+class PreprocessStats:
+    """Running totals of the estimated prompt tokens removed by ``preprocess_text``."""
+
+    def __init__(self):
+        self.requests = 0
+        self.tokens_in = 0
+        self.tokens_out = 0
+
+    def record(self, tokens_in: int, tokens_out: int) -> None:
+        self.requests += 1
+        self.tokens_in += tokens_in
+        self.tokens_out += tokens_out
+
+    def stats(self) -> Dict[str, Any]:
+        saved = self.tokens_in - self.tokens_out
+        return {
+            "requests": self.requests,
+            "tokens_in": self.tokens_in,
+            "tokens_out": self.tokens_out,
+            "tokens_saved": saved,
+            "saved_ratio": round(saved / self.tokens_in, 3) if self.tokens_in else 0.0,
+        }
+
+
+def _line_key(line: str) -> str:
+    # Running headers often differ only by a page or chapter number
+    return _DIGITS_RE.sub("#", " ".join(line.lower().split()))
+
+
+def _is_page_number(line: str) -> bool:
+    return bool(line.strip()) and bool(_PAGE_NUMBER_RE.match(line))
+
+
+def strip_running_lines(pages: List[str]) -> List[str]:
+    """
+    Drop running headers, footers and page numbers from PDF pages.
+
+    A line within ``EDGE_LINES`` of the top or bottom of a page is treated as
+    running text when, ignoring digits and case, it appears in the same zone
+    on at least ``MIN_REPEATS`` pages and on half of all pages. Lines that
+    are only a page number (``12``, ``Page 3 of 9``, ``iv``) are dropped from
+    those zones as well. A page is left as it was when removal would leave
+    nothing of it.
+    """
+    if len(pages) < MIN_REPEATS:
+        return pages
+
+    split = [page.split("\n") for page in pages]
+    counts: Counter = Counter()
+    for lines in split:
+        edges = lines[:EDGE_LINES] + lines[-EDGE_LINES:]
+        counts.update({_line_key(line) for line in edges if line.strip()})
+    threshold = max(MIN_REPEATS, math.ceil(len(pages) / 2))
+    running = {key for key, n in counts.items() if n >= threshold}
+
+    cleaned = []
+    for page, lines in zip(pages, split):
+        kept = []
+        for i, line in enumerate(lines):
+            at_edge = i < EDGE_LINES or i >= len(lines) - EDGE_LINES
+            if at_edge and (_line_key(line) in running or _is_page_number(line)):
+                continue
+            kept.append(line)
+        # On short pages every line is an edge line; never blank a page entirely
+        if not any(line.strip() for line in kept):
+            cleaned.append(page)
+        else:
+            cleaned.append("\n".join(kept))
+    return cleaned
+
+
+def compact_whitespace(text: str) -> str:
+    """Join words hyphenated across line breaks and collapse whitespace runs."""
+    text = _HYPHEN_BREAK_RE.sub(r"\1\2", text)
+    text = _INLINE_SPACE_RE.sub(" ", text)
+    text = _LINE_EDGE_SPACE_RE.sub("\n", text)
+    return _BLANK_LINES_RE.sub("\n\n", text).strip()
+
+
+def preprocess_text(text: str) -> str:
+    """
+    Remove extraction boilerplate before the text is put into a prompt.
+
+    Page breaks (form feeds from the PDF extractor) are kept so chunking can
+    still split on them. The estimated token savings are logged and added
+    to ``preprocess_stats``.
+    """
+    pages = strip_running_lines(text.split(PAGE_BREAK))
+    cleaned = PAGE_BREAK.join(compact_whitespace(page) for page in pages).strip(PAGE_BREAK)
+
+    tokens_in = count_tokens(text)
+    tokens_out = count_tokens(cleaned)
+    preprocess_stats.record(tokens_in, tokens_out)
+    if tokens_in > tokens_out:
+        logger.info(
+            f"Preprocessing saved ~{tokens_in - tokens_out} of {tokens_in} input tokens "
+            f"({100 * (tokens_in - tokens_out) / tokens_in:.1f}%)"
+        )
+    return cleaned
+
+
+preprocess_stats = PreprocessStats()
@@ -0,0 +1,121 @@
+from functools import lru_cache
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from ..core.config import settings
+
+# Approximate output tokens of one generated card, JSON syntax included
+CARD_TOKENS = {
+    "multiple_choice": 100,
+    "true_false": 35,
+    "open_ended": 80,
+}
+SUMMARY_TOKENS = 120
+# The surrounding {"cards": [...]} object and stray whitespace
+RESPONSE_OVERHEAD_TOKENS = 30
+
+# Tokens per character by Unicode range for a Llama 3 style BPE vocabulary,
+# in thousandths. Later ranges override earlier ones.
+_RANGE_COSTS = [
+    ((0x0000, 0x10FFFF), 1000),
+    ((0x0021, 0x007E), 600),   # ASCII punctuation and symbols
+    ((0x0030, 0x0039), 340),   # digits, split in groups of three
+    ((0x0041, 0x005A), 240),   # ASCII letters: ~4 characters per token in English
+    ((0x0061, 0x007A), 240),
+    ((0x0020, 0x0020), 20),    # spaces mostly merge into the following word
+    ((0x0009, 0x000D), 300),
+    ((0x0080, 0x024F), 500),   # Latin-1 and Latin Extended
+    ((0x0370, 0x052F), 450),   # Greek, Cyrillic
+    ((0x0530, 0x077F), 550),   # Armenian, Hebrew, Arabic
+    ((0x0900, 0x0EFF), 1000),  # Indic scripts, Thai, Lao
+    ((0x1100, 0x11FF), 900),   # Hangul Jamo
+    ((0xAC00, 0xD7AF), 900),   # Hangul syllables
+    ((0x3040, 0x30FF), 1000),  # Hiragana, Katakana
+    ((0x3400, 0x9FFF), 1100),  # CJK ideographs
+    ((0xF900, 0xFAFF), 1100),
+    ((0x20000, 0x2FFFF), 1500),
+    ((0x1F000, 0x1FAFF), 2000),  # emoji
+]
+
+
+@lru_cache(maxsize=1)
+def _cost_table() -> np.ndarray:
+    """Per-codepoint token cost in thousandths, built once on first use."""
+    table = np.empty(0x110000, dtype=np.uint16)
+    for (first, last), cost in _RANGE_COSTS:
+        table[first:last + 1] = cost
+    return table
+
+
+def count_tokens(text: str) -> int:
+    """
+    Estimate the model's token count for ``text`` without a network call.
+
+    Every character is costed by its Unicode range from a cached lookup
+    table, so dense English, digits and non-Latin scripts are each priced
+    closer to what the tokenizer actually produces than a flat characters
+    per token ratio. The sum is scaled by ``settings.token_estimate_margin``
+    so estimates err on the high side.
+    """
+    if not text:
+        return 0
+    codepoints = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+    total = int(_cost_table()[codepoints].sum(dtype=np.int64))
+    return int(total * settings.token_estimate_margin) // 1000 + 1
+
+
+def completion_budget(count: int, mode: str, include_summary: bool) -> int:
+    """``max_tokens`` for a response with ``count`` cards of ``mode``."""
+    per_card = CARD_TOKENS.get(mode, CARD_TOKENS["open_ended"])
+    tokens = RESPONSE_OVERHEAD_TOKENS + count * per_card
+    if include_summary:
+        tokens += SUMMARY_TOKENS
+    return int(tokens * settings.token_estimate_margin)
+
+
+def chars_for_tokens(text: str, tokens: int, text_tokens: Optional[int] = None) -> int:
+    """Characters of ``text`` that fit in ``tokens``, at the text's own density."""
+    text_tokens = count_tokens(text) if text_tokens is None else text_tokens
+    if text_tokens <= tokens:
+        return len(text)
+    return max(0, int(len(text) * tokens / text_tokens))
+
+
+class TokenUsageStats:
+    """Predicted versus reported token usage, for tuning the estimates."""
+
+    def __init__(self):
+        self.calls = 0
+        self.predicted_prompt = 0
+        self.actual_prompt = 0
+        self.completion_budget = 0
+        self.actual_completion = 0
+        self.hit_max_tokens = 0
+
+    def record(self, predicted_prompt: int, max_tokens: int, prompt_tokens: Optional[int], completion_tokens: Optional[int]) -> None:
+        # Responses without usage (e.g. some streams) tell us nothing
+        if prompt_tokens is None or completion_tokens is None:
+            return
+        self.calls += 1
+        self.predicted_prompt += predicted_prompt
+        self.actual_prompt += prompt_tokens
+        self.completion_budget += max_tokens
+        self.actual_completion += completion_tokens
+        if completion_tokens >= max_tokens:
+            self.hit_max_tokens += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "predicted_prompt_tokens": self.predicted_prompt,
+            "actual_prompt_tokens": self.actual_prompt,
+            "prompt_estimate_ratio": round(self.predicted_prompt / self.actual_prompt, 3) if self.actual_prompt else None,
+            "completion_budget_tokens": self.completion_budget,
+            "actual_completion_tokens": self.actual_completion,
+            "completion_budget_used": round(self.actual_completion / self.completion_budget, 3) if self.completion_budget else None,
+            "hit_max_tokens": self.hit_max_tokens,
+        }
+
+
+token_usage = TokenUsageStats()
@@ -0,0 +1,122 @@
+import hashlib
+import logging
+import os
+import tempfile
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator, Optional
+
+import anyio
+from fastapi import HTTPException, UploadFile, status
+
+from .file_parser import CHUNK_SIZE, MAX_FILE_SIZE
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_EXTENSIONS = (".pdf", ".docx", ".txt", ".md")
+
+
+@dataclass
+class StoredUpload:
+    path: str
+    size: int
+    sha256: str
+    # Extension matching the sniffed content: .pdf, .docx, .txt or .md
+    extension: str
+
+
+def sniff_extension(head: bytes, filename: Optional[str]) -> Optional[str]:
+    """
+    Extension for a file starting with ``head``, judged by its magic bytes,
+    or None when the content does not match any supported type. Markdown and
+    plain text look alike, so the uploaded name decides between them.
+    """
+    if head.startswith(b"%PDF-"):
+        return ".pdf"
+    if head.startswith(b"PK\x03\x04"):
+        # A ZIP container; python-docx rejects ZIPs that are not Word documents
+        return ".docx"
+    if b"\x00" in head:
+        return None
+    try:
+        # A multi-byte character may be cut at the end of the sniffed bytes
+        head.decode("utf-8")
+    except UnicodeDecodeError as e:
+        if e.start < len(head) - 3:
+            return None
+    name_extension = os.path.splitext(filename or "")[-1].lower()
+    return ".md" if name_extension == ".md" else ".txt"
+
+
+def _too_large() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"File too large (max {MAX_FILE_SIZE // (1024 * 1024)}MB)"
+    )
+
+
+async def store_upload(file: UploadFile, directory: Optional[str] = None, stem: Optional[str] = None) -> StoredUpload:
+    """
+    Copy an upload to disk in ``CHUNK_SIZE`` pieces with non-blocking I/O.
+
+    Only one chunk is held in memory at a time. The copy stops with a 413
+    as soon as it passes ``MAX_FILE_SIZE``, and with a 415 when the first
+    bytes are not a supported document type; the partial file is removed
+    in either case. The stored file is named for its sniffed type, not the
+    client's extension.
+    """
+    if file.size is not None and file.size > MAX_FILE_SIZE:
+        raise _too_large()
+
+    head = await file.read(CHUNK_SIZE)
+    extension = sniff_extension(head, file.filename)
+    if extension is None:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=f"Unsupported file type. Supported: {', '.join(SUPPORTED_EXTENSIONS)}"
+        )
+
+    if directory is None or stem is None:
+        descriptor, path = tempfile.mkstemp(suffix=extension, dir=directory)
+        os.close(descriptor)
+    else:
+        path = os.path.join(directory, f"{stem}{extension}")
+
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        async with await anyio.open_file(path, "wb") as out:
+            chunk = head
+            while chunk:
+                size += len(chunk)
+                if size > MAX_FILE_SIZE:
+                    raise _too_large()
+                digest.update(chunk)
+                await out.write(chunk)
+                chunk = await file.read(CHUNK_SIZE)
+    except BaseException:
+        remove_upload(path)
+        raise
+
+    return StoredUpload(path=path, size=size, sha256=digest.hexdigest(), extension=extension)
+
+
+def remove_upload(path: Optional[str]) -> None:
+    if not path:
+        return
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.warning(f"Failed to remove upload {path}: {str(e)}")
+
+
+@asynccontextmanager
+async def ingested_upload(file: UploadFile) -> AsyncIterator[StoredUpload]:
+    """``store_upload`` into a temporary file that is removed however the block exits."""
+    upload = await store_upload(file)
+    try:
+        yield upload
+    finally:
+        remove_upload(upload.path)
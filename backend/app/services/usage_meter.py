@@ -0,0 +1,195 @@
+import asyncio
+import contextvars
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Set
+from uuid import UUID
+
+from sqlalchemy import insert
+from sqlalchemy.exc import DataError, IntegrityError
+
+from ..core.config import settings
+from ..database import AsyncSessionLocal
+from ..models import AIHistory
+
+logger = logging.getLogger(__name__)
+
+CACHE_HIT = "hit"
+CACHE_MISS = "miss"
+CACHE_COALESCED = "coalesced"
+
+
+@dataclass
+class GenerationUsage:
+    """LLM calls made on behalf of one generation request."""
+
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    calls: int = 0
+    models: List[str] = field(default_factory=list)
+
+    def add(self, model: str, prompt_tokens: Optional[int], completion_tokens: Optional[int]) -> None:
+        self.calls += 1
+        if model not in self.models:
+            self.models.append(model)
+        if prompt_tokens is not None:
+            self.prompt_tokens = (self.prompt_tokens or 0) + prompt_tokens
+        if completion_tokens is not None:
+            self.completion_tokens = (self.completion_tokens or 0) + completion_tokens
+
+
+# Set per request; tasks started from the request (chunks, hedges, the
+# single-flight leader) copy the context and add to the same object
+current_usage: contextvars.ContextVar[Optional[GenerationUsage]] = contextvars.ContextVar(
+    "current_usage", default=None
+)
+
+
+def record_llm_call(model: str, prompt_tokens: Optional[int], completion_tokens: Optional[int]) -> None:
+    usage = current_usage.get()
+    if usage is not None:
+        usage.add(model, prompt_tokens, completion_tokens)
+
+
+class UsageMeter:
+    """
+    Buffer one ``ai_history`` row per generation and write them in bulk.
+
+    ``record`` only appends to an in-memory list, so metering never adds a
+    database round trip to a request. The buffer is flushed with a single
+    multi-row INSERT every ``settings.metering_flush_seconds`` or as soon as
+    it holds ``metering_batch_size`` rows, and once more on shutdown. When
+    the database rejects the batch's data, the rows are retried one at a
+    time and those it rejects again are logged and discarded, so one bad
+    row cannot block every later flush. Rows from a flush that failed for
+    any other reason (connection errors, timeouts) go back to the buffer;
+    past ``metering_max_buffer`` rows the oldest are dropped and counted.
+    """
+
+    def __init__(self):
+        self._buffer: List[Dict[str, Any]] = []
+        self._lock = asyncio.Lock()
+        self._timer: Optional[asyncio.Task] = None
+        self._flushes: Set[asyncio.Task] = set()
+        self.recorded = 0
+        self.written = 0
+        self.dropped = 0
+        self.rejected = 0
+        self.failed_flushes = 0
+
+    def record(
+        self,
+        input_text: str,
+        user_id: Optional[UUID],
+        usage: GenerationUsage,
+        generated_flashcards: int,
+        latency_seconds: float,
+        cache_status: str,
+        succeeded: bool
+    ) -> None:
+        if not settings.metering_enabled:
+            return
+        self.recorded += 1
+        self._buffer.append({
+            "user_id": user_id,
+            "input_text": input_text[:settings.metering_input_chars],
+            "model_used": ",".join(usage.models)[:100],
+            "generated_flashcards": generated_flashcards,
+            "prompt_tokens": usage.prompt_tokens,
+            "completion_tokens": usage.completion_tokens,
+            "llm_calls": usage.calls,
+            "latency_ms": int(1000 * latency_seconds),
+            "cache_status": cache_status,
+            "succeeded": succeeded,
+            "created_at": datetime.now(timezone.utc),
+        })
+        self._trim()
+        if len(self._buffer) >= settings.metering_batch_size and not self._flushes:
+            task = asyncio.create_task(self.flush())
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+
+    def _trim(self) -> None:
+        overflow = len(self._buffer) - settings.metering_max_buffer
+        if overflow > 0:
+            del self._buffer[:overflow]
+            self.dropped += overflow
+            logger.warning(f"Usage metering buffer full, dropped {overflow} records")
+
+    async def flush(self) -> int:
+        """Write all buffered rows in one INSERT; returns how many were written."""
+        async with self._lock:
+            rows, self._buffer = self._buffer, []
+            if not rows:
+                return 0
+            try:
+                await self._insert(rows)
+            except (IntegrityError, DataError) as e:
+                logger.warning(f"Database rejected {len(rows)} usage records, writing them one at a time: {e}")
+                return await self._insert_each(rows)
+            except Exception as e:
+                self._requeue(rows, e)
+                return 0
+            self.written += len(rows)
+            return len(rows)
+
+    async def _insert(self, rows: List[Dict[str, Any]]) -> None:
+        async with AsyncSessionLocal() as db:
+            await db.execute(insert(AIHistory), rows)
+            await db.commit()
+
+    async def _insert_each(self, rows: List[Dict[str, Any]]) -> int:
+        written = 0
+        for position, row in enumerate(rows):
+            try:
+                await self._insert([row])
+            except (IntegrityError, DataError) as e:
+                self.rejected += 1
+                logger.error(f"Discarded a usage record the database rejected: {e}")
+            except Exception as e:
+                self._requeue(rows[position:], e)
+                break
+            else:
+                written += 1
+        self.written += written
+        return written
+
+    def _requeue(self, rows: List[Dict[str, Any]], error: Exception) -> None:
+        self.failed_flushes += 1
+        logger.error(f"Failed to write {len(rows)} usage records: {error}")
+        self._buffer[:0] = rows
+        self._trim()
+
+    async def start(self) -> None:
+        if settings.metering_enabled and self._timer is None:
+            self._timer = asyncio.create_task(self._flush_periodically(), name="usage-meter-flush")
+
+    async def stop(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            await asyncio.gather(self._timer, return_exceptions=True)
+            self._timer = None
+        await asyncio.gather(*self._flushes, return_exceptions=True)
+        written = await self.flush()
+        if written:
+            logger.info(f"Flushed {written} usage records on shutdown")
+
+    async def _flush_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(settings.metering_flush_seconds)
+            await self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": settings.metering_enabled,
+            "recorded": self.recorded,
+            "written": self.written,
+            "buffered": len(self._buffer),
+            "dropped": self.dropped,
+            "rejected": self.rejected,
+            "failed_flushes": self.failed_flushes,
+        }
+
+
+usage_meter = UsageMeter()
@@ -0,0 +1,137 @@
+"""
+Compare the PDF text extractor backends on a corpus of generated PDFs.
+
+Builds prose, two-column and sparse PDFs with reportlab, then extracts each
+one with every backend in a fresh process, reporting pages per second, peak
+RSS of the extracting process, how much that peak grew during extraction,
+and how many pages the pdfium backend handed to pdfplumber. Unix only (peak
+RSS comes from getrusage). Run from the backend directory with the app's
+environment (.env) available:
+
+    python -m benchmarks.pdf_backends --pages 100 --repeat 3
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+
+from app.services.file_parser import PDF_EXTRACTORS, open_pdf
+from benchmarks.pdf_extraction import WORDS, make_pdf
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def make_two_column_pdf(path: str, pages: int, seed: int = 0) -> None:
+    rng = random.Random(seed)
+    pdf = canvas.Canvas(path, pagesize=A4)
+    width, height = A4
+    for page in range(pages):
+        pdf.setFont("Helvetica-Bold", 11)
+        pdf.drawString(40, height - 30, f"Section {page + 1}")
+        pdf.setFont("Times-Roman", 8)
+        for column in (40, width / 2 + 10):
+            for line in range(70):
+                pdf.drawString(column, height - 50 - line * 10.5, _sentence(rng, 7))
+        pdf.drawCentredString(width / 2, 20, str(page + 1))
+        pdf.showPage()
+    pdf.save()
+
+
+def make_sparse_pdf(path: str, pages: int, seed: int = 0) -> None:
+    """Slides-like pages: a heading and a few bullets, with every tenth page blank."""
+    rng = random.Random(seed)
+    pdf = canvas.Canvas(path, pagesize=A4)
+    width, height = A4
+    for page in range(pages):
+        if page % 10 != 9:
+            pdf.setFont("Helvetica-Bold", 20)
+            pdf.drawString(50, height - 80, _sentence(rng, 4))
+            pdf.setFont("Helvetica", 14)
+            for line in range(5):
+                pdf.drawString(70, height - 140 - line * 40, "- " + _sentence(rng, 6))
+        pdf.showPage()
+    pdf.save()
+
+
+CORPUS: Dict[str, Callable[[str, int], None]] = {
+    "prose": make_pdf,
+    "two-column": make_two_column_pdf,
+    "sparse": make_sparse_pdf,
+}
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def measure(path: str, backend: str, repeat: int) -> dict:
+    """Runs in a fresh process so peak RSS belongs to this backend and document alone."""
+    # Load the backend's native library and modules before taking the baseline
+    with open_pdf(path, backend) as pdf:
+        pdf.page_count()
+    baseline = _peak_rss_mb()
+
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with open_pdf(path, backend) as pdf:
+            texts = [pdf.page_text(index) for index in range(pdf.page_count())]
+            fallback_pages = getattr(pdf, "fallback_pages", 0)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    peak = _peak_rss_mb()
+    return {
+        "pages": len(texts),
+        "seconds": best,
+        "chars": sum(len(text) for text in texts),
+        "fallback_pages": fallback_pages,
+        "peak_rss_mb": peak,
+        "rss_growth_mb": peak - baseline,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--pages", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--backends", nargs="+", default=list(PDF_EXTRACTORS), choices=list(PDF_EXTRACTORS))
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as directory:
+        documents: List[str] = []
+        for name, make in CORPUS.items():
+            path = os.path.join(directory, f"{name}.pdf")
+            make(path, args.pages)
+            documents.append(path)
+
+        print(
+            f"{'document':<14}{'backend':<12}{'pages/s':>10}{'chars':>10}"
+            f"{'fallback':>10}{'peak MB':>10}{'+MB':>8}"
+        )
+        for path in documents:
+            name = os.path.splitext(os.path.basename(path))[0]
+            for backend in args.backends:
+                with context.Pool(1) as pool:
+                    result = pool.apply(measure, (path, backend, args.repeat))
+                print(
+                    f"{name:<14}{backend:<12}{result['pages'] / result['seconds']:>10.1f}"
+                    f"{result['chars']:>10}{result['fallback_pages']:>10}"
+                    f"{result['peak_rss_mb']:>10.1f}{result['rss_growth_mb']:>8.1f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Benchmark parallel PDF text extraction against the number of worker processes.
+
+Generates a text-heavy PDF with reportlab, then extracts it serially in
+this process (the old code path) and through the extraction pool with
+1, 2, 4, ... workers up to the core count, reporting pages per second and
+speedup over the serial run. Run from the backend directory with the
+app's environment (.env) available:
+
+    python -m benchmarks.pdf_extraction --pages 200 --repeat 3
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from typing import Callable, List
+
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+
+from app.core.config import settings
+from app.services.document_extraction import extract_document_text
+from app.services.extraction_pool import extraction_pool
+from app.services.file_parser import extract_text_from_pdf
+
+WORDS = (
+    "cell membrane protein enzyme energy photosynthesis respiration nucleus "
+    "chromosome mitosis meiosis gene allele evolution selection population "
+    "ecosystem carbon nitrogen cycle osmosis diffusion receptor hormone"
+).split()
+
+
+def make_pdf(path: str, pages: int, lines_per_page: int = 55, seed: int = 0) -> None:
+    rng = random.Random(seed)
+    pdf = canvas.Canvas(path, pagesize=A4)
+    width, height = A4
+    for page in range(pages):
+        pdf.setFont("Helvetica", 9)
+        pdf.drawString(40, height - 30, f"Chapter {page // 20 + 1} - page {page + 1}")
+        for line in range(lines_per_page):
+            words = " ".join(rng.choice(WORDS) for _ in range(16))
+            pdf.drawString(40, height - 50 - line * 13.5, words.capitalize() + ".")
+        pdf.showPage()
+    pdf.save()
+
+
+def worker_counts(limit: int) -> List[int]:
+    counts = [1]
+    while counts[-1] * 2 <= limit:
+        counts.append(counts[-1] * 2)
+    if counts[-1] != limit:
+        counts.append(limit)
+    return counts
+
+
+def best_of(repeat: int, run: Callable[[], float]) -> float:
+    return min(run() for _ in range(repeat))
+
+
+def time_serial(path: str) -> float:
+    start = time.perf_counter()
+    extract_text_from_pdf(path)
+    return time.perf_counter() - start
+
+
+async def time_pool(path: str, repeat: int) -> List[float]:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await extract_document_text(path)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+async def run_pool(path: str, workers: int, repeat: int) -> float:
+    settings.extraction_workers = workers
+    await extraction_pool.start()
+    try:
+        # One untimed run so every worker has imported the parsers
+        await extract_document_text(path)
+        return min(await time_pool(path, repeat))
+    finally:
+        extraction_pool.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    # Ranges as small as the benchmark needs to use every worker
+    settings.extraction_min_pages_per_task = 1
+    settings.extraction_timeout_seconds = 600
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "benchmark.pdf")
+        make_pdf(path, args.pages)
+        print(f"{args.pages} pages, {os.path.getsize(path) / 1024:.0f} KiB, {os.cpu_count()} cores")
+
+        serial = best_of(args.repeat, lambda: time_serial(path))
+        print(f"{'mode':<12}{'seconds':>10}{'pages/s':>10}{'speedup':>10}")
+        print(f"{'serial':<12}{serial:>10.2f}{args.pages / serial:>10.1f}{1.0:>10.2f}")
+        for workers in worker_counts(args.max_workers):
+            elapsed = asyncio.run(run_pool(path, workers, args.repeat))
+            label = f"{workers} worker" + ("s" if workers > 1 else "")
+            print(f"{label:<12}{elapsed:>10.2f}{args.pages / elapsed:>10.1f}{serial / elapsed:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+import random
+
+import numpy as np
+
+from app.services.card_dedupe import NUM_PERMUTATIONS, QuestionIndex, dedupe_cards, minhash_signatures
+
+
+def test_signatures_ignore_case_punctuation_and_function_words():
+    a, b, c = minhash_signatures([
+        "What is the role of the mitochondria?",
+        "what's the role of mitochondria",
+        "How do plants absorb water?",
+    ])
+    assert a.shape == (NUM_PERMUTATIONS,)
+    assert np.array_equal(a, b)
+    assert (a == c).mean() < 0.3
+
+
+def test_index_detects_near_duplicates():
+    index = QuestionIndex(["What is the function of the cell membrane?"], threshold=0.7)
+    assert len(index) == 1
+    assert index.is_duplicate("What is the function of a cell membrane?")
+    assert not index.is_duplicate("What does the Golgi apparatus do?")
+
+
+def test_add_if_new_grows_the_index():
+    index = QuestionIndex(threshold=0.7)
+    rng = random.Random(0)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    questions = [
+        " ".join("".join(rng.choice(letters) for _ in range(6)) for _ in range(5)) + "?" for _ in range(40)
+    ]
+    assert all(index.add_if_new(q) for q in questions)
+    assert len(index) == 40
+    assert not index.add_if_new(questions[17])
+
+
+def test_dedupe_cards_drops_duplicates_and_empty_questions():
+    cards = [
+        {"question": "What is osmosis?"},
+        {"question": "What is osmosis"},
+        {"question": ""},
+        {"question": "Define diffusion."},
+    ]
+    kept, removed = dedupe_cards(cards, QuestionIndex(threshold=0.7))
+    assert [card["question"] for card in kept] == ["What is osmosis?", "Define diffusion."]
+    assert removed == 2
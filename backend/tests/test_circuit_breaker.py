@@ -0,0 +1,104 @@
+import pytest
+
+from app.core.config import settings
+from app.services import circuit_breaker
+from app.services.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(circuit_breaker, "time", clock)
+    for name, value in {
+        "breaker_enabled": True,
+        "breaker_window_seconds": 60,
+        "breaker_min_calls": 4,
+        "breaker_failure_ratio": 0.5,
+        "breaker_slow_call_seconds": 10.0,
+        "breaker_slow_call_ratio": 0.75,
+        "breaker_open_seconds": 30,
+        "breaker_half_open_probes": 1,
+    }.items():
+        monkeypatch.setattr(settings, name, value)
+    return clock
+
+
+def _trip(breaker: CircuitBreaker) -> None:
+    for failed in (False, True, False, True):
+        breaker.record(failed, 0.1)
+
+
+def test_opens_at_the_failure_ratio_once_enough_calls_are_seen(clock):
+    breaker = CircuitBreaker()
+    for _ in range(3):
+        breaker.record(True, 0.1)
+    assert breaker.state == CLOSED
+    breaker.record(False, 0.1)
+    assert breaker.state == OPEN
+    assert not breaker.try_acquire()
+    assert breaker.rejected == 1
+    assert breaker.retry_after() == 30
+
+
+def test_slow_calls_open_the_circuit(clock):
+    breaker = CircuitBreaker()
+    for seconds in (12, 15, 11, 0.5):
+        breaker.record(False, seconds)
+    assert breaker.state == OPEN
+
+
+def test_old_outcomes_leave_the_window(clock):
+    breaker = CircuitBreaker()
+    breaker.record(True, 0.1)
+    breaker.record(True, 0.1)
+    clock.now += 61
+    breaker.record(True, 0.1)
+    breaker.record(False, 0.1)
+    assert breaker.state == CLOSED
+
+
+def test_half_open_probe_closes_on_success(clock):
+    breaker = CircuitBreaker()
+    _trip(breaker)
+    clock.now += 30
+    assert breaker.try_acquire()
+    assert breaker.state == HALF_OPEN
+    # Only one probe at a time
+    assert not breaker.try_acquire()
+    breaker.record(False, 0.1)
+    assert breaker.state == CLOSED
+
+
+def test_half_open_probe_reopens_on_failure(clock):
+    breaker = CircuitBreaker()
+    _trip(breaker)
+    clock.now += 30
+    assert breaker.try_acquire()
+    breaker.record(True, 0.1)
+    assert breaker.state == OPEN
+    assert breaker.times_opened == 2
+
+
+def test_released_probe_can_be_reused(clock):
+    breaker = CircuitBreaker()
+    _trip(breaker)
+    clock.now += 30
+    assert breaker.try_acquire()
+    breaker.release()
+    assert breaker.try_acquire()
+
+
+def test_disabled_breaker_lets_everything_through(clock, monkeypatch):
+    monkeypatch.setattr(settings, "breaker_enabled", False)
+    breaker = CircuitBreaker()
+    _trip(breaker)
+    assert breaker.state == CLOSED
+    assert breaker.try_acquire()
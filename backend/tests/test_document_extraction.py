@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+
+from app.core.config import settings
+from app.services import document_extraction
+from app.services.document_extraction import extract_document_text, split_pages, spread_order
+from app.services.file_parser import count_pdf_pages
+
+
+def test_split_pages_is_contiguous_and_ordered():
+    ranges = split_pages(list(range(50)), workers=4, min_pages=8)
+    assert len(ranges) == 4
+    assert [page for part in ranges for page in part] == list(range(50))
+    assert max(map(len, ranges)) - min(map(len, ranges)) <= 2
+
+
+def test_split_pages_respects_min_pages():
+    assert split_pages(list(range(10)), workers=4, min_pages=8) == [list(range(10))]
+    assert len(split_pages(list(range(20)), workers=8, min_pages=8)) == 2
+
+
+def test_split_pages_keeps_selected_indexes():
+    assert split_pages([2, 3, 9, 10], workers=2, min_pages=1) == [[2, 3], [9, 10]]
+
+
+def test_split_pages_of_nothing():
+    assert split_pages([], workers=4, min_pages=8) == []
+
+
+def test_spread_order_covers_every_index_evenly():
+    assert spread_order(8) == [0, 4, 2, 6, 1, 5, 3, 7]
+    assert sorted(spread_order(13)) == list(range(13))
+    assert spread_order(1) == [0]
+    assert spread_order(0) == []
+
+
+@pytest.fixture
+def fake_pdf(monkeypatch):
+    """A 100-page PDF whose pages are extracted in-process, each holding 100 tokens."""
+    extracted = []
+
+    async def run(fn, *args, shed=False):
+        if fn is count_pdf_pages:
+            return 100
+        page_indexes = args[1]
+        extracted.append(list(page_indexes))
+        return [f"page {index}" for index in page_indexes]
+
+    monkeypatch.setattr(document_extraction, "_run", run)
+    monkeypatch.setattr(document_extraction, "count_tokens", lambda text: 100)
+    monkeypatch.setattr(settings, "extraction_workers", 2)
+    monkeypatch.setattr(settings, "extraction_min_pages_per_task", 10)
+    return extracted
+
+
+def test_whole_pdf_without_a_budget(fake_pdf):
+    text = asyncio.run(extract_document_text("book.pdf"))
+    assert text.split("\f") == [f"page {index}" for index in range(100)]
+    assert len(fake_pdf) == 2
+
+
+def test_budget_samples_pages_across_the_document(fake_pdf):
+    text = asyncio.run(extract_document_text("book.pdf", max_tokens=3000))
+    pages = [int(page.split()[1]) for page in text.split("\f")]
+    # Three ranges of ten pages reach the budget; a fourth was already running
+    assert len(fake_pdf) == 4
+    assert pages == sorted(pages)
+    assert pages[0] == 0 and pages[-1] >= 50
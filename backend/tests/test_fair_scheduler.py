@@ -0,0 +1,120 @@
+import asyncio
+from collections import Counter
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.services.fair_scheduler import ANONYMOUS, FREE, PREMIUM, FairScheduler, Ticket
+
+
+@pytest.fixture(autouse=True)
+def scheduler_settings(monkeypatch):
+    monkeypatch.setattr(settings, "fair_max_concurrent", 1)
+    monkeypatch.setattr(settings, "fair_tier_weights", {PREMIUM: 3, FREE: 1, ANONYMOUS: 1})
+    monkeypatch.setattr(settings, "fair_user_concurrency", {PREMIUM: 1, FREE: 1, ANONYMOUS: 1})
+    monkeypatch.setattr(settings, "fair_tier_concurrency", {})
+    monkeypatch.setattr(settings, "fair_queue_timeout_seconds", 30)
+
+
+async def _serve(scheduler: FairScheduler, holder: Ticket, tickets, grants: int):
+    """Queue ``tickets`` behind ``holder`` and return the order in which ``grants`` of them get the slot."""
+    order = []
+
+    async def request(ticket: Ticket):
+        await scheduler.acquire(ticket)
+        order.append(ticket)
+
+    tasks = [asyncio.create_task(request(ticket)) for ticket in tickets]
+    await asyncio.sleep(0)
+    current = holder
+    for granted in range(1, grants + 1):
+        scheduler.release(current)
+        while len(order) < granted:
+            await asyncio.sleep(0)
+        current = order[-1]
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return order
+
+
+def test_free_slot_is_granted_immediately():
+    async def scenario():
+        scheduler = FairScheduler()
+        await scheduler.acquire(Ticket("user:a", FREE))
+        return scheduler.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["running"] == 1
+    assert stats["tiers"][FREE]["admitted"] == 1
+
+
+def test_slots_are_shared_by_tier_weight():
+    async def scenario():
+        scheduler = FairScheduler()
+        holder = await scheduler.acquire(Ticket("user:holder", FREE))
+        tickets = [Ticket(f"user:p{n}", PREMIUM) for n in range(10)] + [Ticket(f"user:f{n}", FREE) for n in range(10)]
+        return await _serve(scheduler, holder, tickets, 8)
+
+    order = asyncio.run(scenario())
+    assert Counter(ticket.tier for ticket in order) == {PREMIUM: 6, FREE: 2}
+
+
+def test_users_within_a_tier_take_turns():
+    async def scenario():
+        scheduler = FairScheduler()
+        holder = await scheduler.acquire(Ticket("user:holder", FREE))
+        tickets = [Ticket("user:a", FREE)] * 3 + [Ticket("user:b", FREE)]
+        return await _serve(scheduler, holder, tickets, 3)
+
+    order = asyncio.run(scenario())
+    assert [ticket.key for ticket in order] == ["user:a", "user:b", "user:a"]
+
+
+def test_user_concurrency_cap_holds_back_only_that_user(monkeypatch):
+    monkeypatch.setattr(settings, "fair_max_concurrent", 4)
+
+    async def scenario():
+        scheduler = FairScheduler()
+        await scheduler.acquire(Ticket("user:a", FREE))
+        second = asyncio.create_task(scheduler.acquire(Ticket("user:a", FREE)))
+        await scheduler.acquire(Ticket("user:b", FREE))
+        await asyncio.sleep(0)
+        blocked = not second.done()
+        second.cancel()
+        await asyncio.gather(second, return_exceptions=True)
+        return blocked, scheduler.stats()["running"]
+
+    assert asyncio.run(scenario()) == (True, 2)
+
+
+def test_tier_cap_bounds_anonymous_callers_across_addresses(monkeypatch):
+    monkeypatch.setattr(settings, "fair_max_concurrent", 4)
+    monkeypatch.setattr(settings, "fair_tier_concurrency", {ANONYMOUS: 2})
+
+    async def scenario():
+        scheduler = FairScheduler()
+        first = await scheduler.acquire(Ticket("anonymous:10.0.0.1", ANONYMOUS))
+        await scheduler.acquire(Ticket("anonymous:10.0.0.2", ANONYMOUS))
+        third = asyncio.create_task(scheduler.acquire(Ticket("anonymous:10.0.0.3", ANONYMOUS)))
+        await scheduler.acquire(Ticket("user:a", FREE))
+        await asyncio.sleep(0)
+        blocked = not third.done()
+        scheduler.release(first)
+        await third
+        return blocked, scheduler.stats()["tiers"][ANONYMOUS]["running"]
+
+    assert asyncio.run(scenario()) == (True, 2)
+
+
+def test_requests_are_shed_after_the_queue_timeout():
+    async def scenario():
+        scheduler = FairScheduler()
+        await scheduler.acquire(Ticket("user:a", FREE))
+        await scheduler.acquire(Ticket("user:b", FREE), timeout=0.01)
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(scenario())
+    assert error.value.status_code == 429
+    assert error.value.headers["Retry-After"] == "1"
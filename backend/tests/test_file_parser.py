@@ -0,0 +1,86 @@
+import pytest
+from reportlab.pdfgen import canvas
+
+from app.services.file_parser import (
+    PdfExtractor,
+    PdfiumExtractor,
+    PdfplumberExtractor,
+    extract_text_from_file,
+    open_pdf,
+    parse_page_ranges,
+    select_pages,
+)
+
+
+@pytest.fixture
+def hyphenated_pdf(tmp_path):
+    path = str(tmp_path / "hyphenated.pdf")
+    pdf = canvas.Canvas(path)
+    pdf.drawString(50, 800, "The process of photo-")
+    pdf.drawString(50, 786, "synthesis makes sugar.")
+    pdf.showPage()
+    # A blank page, as a scanned page looks to a text extractor
+    pdf.showPage()
+    pdf.save()
+    return path
+
+
+def test_extractor_base_class_is_abstract():
+    with pytest.raises(TypeError):
+        PdfExtractor("unused.pdf")
+
+
+def test_pdfium_rejoins_hyphenated_line_breaks(hyphenated_pdf):
+    with PdfiumExtractor(hyphenated_pdf) as pdf:
+        text = pdf.page_text(0)
+        assert "photosynthesis" in text
+        assert "\ufffe" not in text
+        assert pdf.fallback_pages == 0
+
+
+def test_pdfium_does_not_fall_back_on_blank_pages(hyphenated_pdf):
+    with PdfiumExtractor(hyphenated_pdf) as pdf:
+        assert pdf.page_text(1) == ""
+        assert pdf.fallback_pages == 0
+
+
+def test_backends_agree_on_page_count(hyphenated_pdf):
+    with open_pdf(hyphenated_pdf, "pdfium") as a, open_pdf(hyphenated_pdf, "pdfplumber") as b:
+        assert a.page_count() == b.page_count() == 2
+        assert isinstance(b, PdfplumberExtractor)
+
+
+def test_unknown_backend_is_rejected(hyphenated_pdf):
+    with pytest.raises(ValueError):
+        open_pdf(hyphenated_pdf, "tesseract")
+
+
+def test_parse_page_ranges():
+    assert parse_page_ranges("3") == [(3, 3)]
+    assert parse_page_ranges("1-5, 8 ,12-") == [(1, 5), (8, 8), (12, None)]
+    assert parse_page_ranges("10 - 25") == [(10, 25)]
+
+
+@pytest.mark.parametrize("spec", ["", "0", "5-3", "a-b", "1,,2", "-4", "1-2-3"])
+def test_parse_page_ranges_rejects_invalid_selections(spec):
+    with pytest.raises(ValueError):
+        parse_page_ranges(spec)
+
+
+def test_select_pages():
+    assert select_pages(None, 3) == [0, 1, 2]
+    # Overlaps are merged, ranges are clipped to the document and sorted
+    assert select_pages("8,1-3,2,12-", 14) == [0, 1, 2, 7, 11, 12, 13]
+    assert select_pages("2-100", 4) == [1, 2, 3]
+
+
+def test_select_pages_rejects_pages_past_the_end():
+    with pytest.raises(ValueError, match="out of range"):
+        select_pages("5", 4)
+
+
+def test_page_selection_is_pdf_only(tmp_path):
+    path = tmp_path / "notes.txt"
+    path.write_text("Some notes.")
+    with pytest.raises(ValueError, match="only supported for PDF"):
+        extract_text_from_file(str(path), pages="1")
@@ -0,0 +1,14 @@
+import pytest
+from pydantic import ValidationError
+
+from app.schemas import MAX_FLASHCARD_COUNT, FlashcardsRequest
+
+
+def test_count_defaults_to_ten():
+    assert FlashcardsRequest(text="Cells divide.").count == 10
+
+
+@pytest.mark.parametrize("count", [None, 0, -3, MAX_FLASHCARD_COUNT + 1])
+def test_count_out_of_range_is_rejected(count):
+    with pytest.raises(ValidationError):
+        FlashcardsRequest(text="Cells divide.", count=count)
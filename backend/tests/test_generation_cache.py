@@ -0,0 +1,43 @@
+import asyncio
+
+from app.services.generation_cache import KEY_PREFIX, GenerationCache, generation_key, normalize_text
+
+
+def test_normalize_text_collapses_whitespace_and_compatibility_forms():
+    assert normalize_text("  Cell biology\n\n is\tfun  ") == "Cell biology is fun"
+    assert normalize_text("ﬁnal") == "final"
+
+
+def test_generation_key_ignores_whitespace_differences():
+    a = generation_key("The cell  membrane.\n", 10, "open_ended", "intermediate", True)
+    b = generation_key("The cell membrane.", 10, "open_ended", "intermediate", True)
+    assert a == b
+    assert a.startswith(KEY_PREFIX)
+
+
+def test_generation_key_depends_on_every_parameter():
+    base = ("The cell membrane.", 10, "open_ended", "intermediate", True)
+    keys = {
+        generation_key(*base),
+        generation_key("The cell wall.", *base[1:]),
+        generation_key(base[0], 5, *base[2:]),
+        generation_key(*base[:2], "multiple_choice", *base[3:]),
+        generation_key(*base[:3], "advanced", base[4]),
+        generation_key(*base[:4], False),
+    }
+    assert len(keys) == 6
+
+
+def test_cache_hands_back_independent_copies():
+    cache = GenerationCache(max_entries=4, ttl_seconds=60)
+
+    async def scenario():
+        assert await cache.get("k") is None
+        await cache.set("k", {"cards": [{"question": "Q"}]})
+        first = await cache.get("k")
+        first["cards"].clear()
+        return await cache.get("k")
+
+    assert asyncio.run(scenario()) == {"cards": [{"question": "Q"}]}
+    assert cache.stats()["hits"] == 2
+    assert cache.stats()["misses"] == 1
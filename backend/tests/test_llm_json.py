@@ -0,0 +1,46 @@
+import json
+
+from app.services.llm_json import CardStreamParser, extract_summary, parse_flashcards_output
+
+CARDS = [
+    {"question": "What is osmosis?", "answer": "Diffusion of water"},
+    {"question": "What is ATP?", "answer": "The cell's energy currency"},
+]
+
+
+def test_valid_output_is_complete():
+    raw = json.dumps({"cards": CARDS, "summary": "Cells."})
+    assert parse_flashcards_output(raw) == ({"cards": CARDS, "summary": "Cells."}, True)
+
+
+def test_code_fences_trailing_commas_and_bare_arrays():
+    fenced = "Here you go:\n```json\n" + json.dumps({"cards": CARDS})[:-2] + ",]}\n```"
+    assert parse_flashcards_output(fenced) == ({"cards": CARDS}, True)
+    assert parse_flashcards_output(json.dumps(CARDS)) == ({"cards": CARDS}, True)
+
+
+def test_truncated_output_salvages_complete_cards():
+    raw = json.dumps({"summary": "Cells.", "cards": CARDS})[:-30]
+    result, complete = parse_flashcards_output(raw)
+    assert not complete
+    assert result == {"cards": CARDS[:1], "summary": "Cells."}
+
+
+def test_items_that_are_not_cards_are_dropped():
+    raw = json.dumps({"cards": ["text", CARDS[0], {"answer": "no question"}, {"question": ""}]})
+    assert parse_flashcards_output(raw) == ({"cards": CARDS[:1]}, False)
+
+
+def test_unparseable_output_yields_no_cards():
+    assert parse_flashcards_output("Sorry, I cannot help with that.") == ({"cards": []}, False)
+
+
+def test_stream_parser_returns_cards_as_they_complete():
+    raw = json.dumps({"cards": CARDS + ["text"], "summary": "Cells."})
+    parser = CardStreamParser()
+    cards = []
+    for i in range(0, len(raw), 7):
+        cards.extend(parser.feed(raw[i:i + 7]))
+    assert cards == CARDS
+    assert parser.text == raw
+    assert extract_summary(parser.text) == "Cells."
@@ -0,0 +1,50 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.llm_scheduler import TokenBucket, retry_after_seconds
+
+
+def test_bucket_starts_full_and_charges_takes():
+    bucket = TokenBucket(60)
+    now = bucket._updated
+    assert bucket.wait_time(60, now) == 0.0
+    bucket.take(45)
+    assert bucket.available == pytest.approx(15)
+
+
+def test_bucket_wait_time_follows_the_refill_rate():
+    bucket = TokenBucket(60)  # one per second
+    now = bucket._updated
+    bucket.take(60)
+    assert bucket.wait_time(10, now) == pytest.approx(10)
+    assert bucket.wait_time(10, now + 4) == pytest.approx(6)
+    assert bucket.wait_time(10, now + 10) == 0.0
+
+
+def test_bucket_never_exceeds_capacity():
+    bucket = TokenBucket(60)
+    now = bucket._updated
+    bucket.wait_time(1, now + 3600)
+    assert bucket.available == pytest.approx(60)
+
+
+def test_requests_above_capacity_wait_for_a_full_bucket():
+    bucket = TokenBucket(60)
+    now = bucket._updated
+    bucket.take(30)
+    assert bucket.wait_time(500, now) == pytest.approx(30)
+    bucket.take(500)
+    assert bucket.available == pytest.approx(-30)
+
+
+def _error(headers):
+    return Exception() if headers is None else SimpleNamespace(response=SimpleNamespace(headers=headers))
+
+
+def test_retry_after_seconds():
+    assert retry_after_seconds(_error({"retry-after": "2.5"})) == 2.5
+    assert retry_after_seconds(_error({"retry-after": "Wed, 21 Oct 2015 07:28:00 GMT"})) == 0.0
+    assert retry_after_seconds(_error({"retry-after": "soon"})) is None
+    assert retry_after_seconds(_error({})) is None
+    assert retry_after_seconds(_error(None)) is None
@@ -0,0 +1,49 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.services import ai_flashcard_generator
+from app.services.ai_flashcard_generator import plan_generation_budget
+from app.services.model_router import ModelRoute, ModelRouter, RequestTooLargeError
+
+
+def _router() -> ModelRouter:
+    # A large request limit with a small completion limit, and the reverse
+    return ModelRouter([
+        ModelRoute("wide", context_window=131072, max_completion_tokens=8192,
+                   requests_per_minute=30, tokens_per_minute=30000),
+        ModelRoute("long", context_window=131072, max_completion_tokens=32768,
+                   requests_per_minute=30, tokens_per_minute=12000),
+    ])
+
+
+def test_request_limit_comes_from_models_that_admit_the_completion():
+    router = _router()
+    assert router.request_token_limit(4000) == 30000
+    assert router.request_token_limit(20000) == 12000
+    assert router.request_token_limit(40000) is None
+
+
+def test_planned_budgets_always_have_a_candidate(monkeypatch):
+    router = _router()
+    monkeypatch.setattr(ai_flashcard_generator, "model_router", router)
+    for count in (10, 50, 80):
+        max_tokens, input_tokens = plan_generation_budget(count, "multiple_choice", "intermediate", True)
+        assert router.candidates(input_tokens, max_tokens)
+
+
+@pytest.mark.parametrize("count, status_code", [(100, 413), (250, 413), (400, 400)])
+def test_requests_no_single_model_fits_are_rejected(monkeypatch, count, status_code):
+    monkeypatch.setattr(ai_flashcard_generator, "model_router", _router())
+    with pytest.raises(HTTPException) as error:
+        plan_generation_budget(count, "multiple_choice", "intermediate", True)
+    assert error.value.status_code == status_code
+
+
+def test_call_refuses_requests_no_model_fits():
+    async def never_called(model):
+        raise AssertionError(model)
+
+    with pytest.raises(RequestTooLargeError):
+        asyncio.run(_router().call(never_called, prompt_tokens=2000, max_tokens=11672))
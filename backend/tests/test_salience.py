@@ -0,0 +1,45 @@
+import random
+
+from app.services import salience
+from app.services.salience import select_salient_text
+
+
+def _document(sentences: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    vocabulary = ["".join(rng.choice("abcdefghij") for _ in range(6)) for _ in range(400)]
+    return " ".join(
+        f"Part {n} " + " ".join(rng.choice(vocabulary) for _ in range(12)) + "." for n in range(sentences)
+    )
+
+
+def test_short_text_is_returned_whole():
+    assert select_salient_text("Cells divide.", 100) == "Cells divide."
+
+
+def test_selection_fits_the_budget_and_keeps_sentence_order():
+    text = _document(500)
+    selected = select_salient_text(text, 2000)
+    assert 0 < len(selected) <= 2000
+    parts = [int(line.split()[1]) for line in selected.replace(". ", ".\n").splitlines()]
+    assert parts == sorted(parts)
+
+
+def test_long_text_scoring_is_bounded(monkeypatch):
+    monkeypatch.setattr(salience, "MAX_SCORED_BYTES", 20_000)
+    scored = []
+    word_hashes = salience._word_hashes
+
+    def spy(data):
+        scored.append(len(data))
+        return word_hashes(data)
+
+    monkeypatch.setattr(salience, "_word_hashes", spy)
+    text = _document(5000)
+    assert len(text) > 20 * 20_000
+    selected = select_salient_text(text, 4000)
+
+    # Strided sentences of about the bound are scored, drawn from the whole text
+    assert scored and scored[0] <= 20_000 + 200
+    parts = [int(line.split()[1]) for line in selected.splitlines()]
+    assert len(selected) <= 4000
+    assert min(parts) < 1000 and max(parts) > 4000
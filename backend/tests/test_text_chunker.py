@@ -0,0 +1,62 @@
+import asyncio
+import random
+import re
+
+from app.core.config import settings
+from app.services.ai_flashcard_generator import _split_for_chunks
+from app.services.text_chunker import allocate_counts, group_evenly, split_into_chunks
+
+
+def test_short_text_is_one_chunk():
+    assert split_into_chunks("One paragraph.\n\nAnother one.", 100) == ["One paragraph.\n\nAnother one."]
+
+
+def test_chunks_respect_the_limit_and_keep_all_text():
+    pages = [f"Page {n} opens here. " + "It continues with more detail. " * 8 for n in range(6)]
+    text = "\f".join(pages)
+    chunks = split_into_chunks(text, 120)
+    assert all(len(chunk) <= 120 for chunk in chunks)
+    assert "".join(chunks).replace("\n", "").replace(" ", "") == text.replace("\f", "").replace(" ", "")
+
+
+def test_page_and_paragraph_breaks_are_preferred():
+    text = "First page text.\fSecond page.\n\nSecond paragraph."
+    assert split_into_chunks(text, 20) == ["First page text.", "Second page.", "Second paragraph."]
+
+
+def test_oversized_sentence_is_cut_hard():
+    assert split_into_chunks("x" * 25, 10) == ["x" * 10, "x" * 10, "x" * 5]
+
+
+def test_allocate_counts_is_proportional_and_exact():
+    assert allocate_counts([100, 100, 200], 8) == [2, 2, 4]
+    assert sum(allocate_counts([7, 13, 29, 1], 10)) == 10
+    assert allocate_counts([10, 10, 10], 2).count(0) == 1
+
+
+def test_allocate_counts_of_nothing():
+    assert allocate_counts([0, 0], 5) == [0, 0]
+    assert allocate_counts([5, 5], 0) == [0, 0]
+
+
+def test_group_evenly_keeps_every_chunk_in_order():
+    chunks = [str(i) for i in range(10)]
+    assert group_evenly(chunks, 4) == [["0", "1"], ["2", "3", "4"], ["5", "6"], ["7", "8", "9"]]
+    assert group_evenly(chunks[:3], 4) == [["0"], ["1"], ["2"]]
+
+
+def test_chunks_over_the_limit_are_reduced_not_dropped(monkeypatch):
+    monkeypatch.setattr(settings, "generation_max_chunks", 2)
+    rng = random.Random(0)
+    vocabulary = ["".join(rng.choice("abcdefgh") for _ in range(5)) for _ in range(60)]
+    pages = [
+        " ".join(f"Part topic{n} " + " ".join(rng.sample(vocabulary, 5)) + "." for _ in range(6))
+        for n in range(6)
+    ]
+    chunks = asyncio.run(_split_for_chunks("\f".join(pages), 300, 10_000))
+    assert len(chunks) == 2
+    assert all(len(chunk) <= 300 for chunk in chunks)
+    # Each chunk is drawn from its own half of the pages, not just the first page of it
+    first, second = ({int(n) for n in re.findall(r"topic(\d)", chunk)} for chunk in chunks)
+    assert first <= {0, 1, 2} and second <= {3, 4, 5}
+    assert len(first | second) > 2
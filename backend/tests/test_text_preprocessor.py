@@ -0,0 +1,47 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.services.ai_flashcard_generator import generate_flashcards_with_groq
+from app.services.text_preprocessor import compact_whitespace, preprocess_text, strip_running_lines
+
+
+TOPICS = ["Cells", "Enzymes", "Osmosis", "Mitosis", "Meiosis", "Genes"]
+
+
+def _page(number: int, topic: str) -> str:
+    body = [f"{topic} line {word}" for word in ("alpha", "beta", "gamma", "delta")]
+    return "\n".join([f"Intro to Biology - Chapter {number // 10 + 1}", topic, *body, f"Page {number}"])
+
+
+def test_running_headers_and_page_numbers_are_removed():
+    pages = [_page(n, topic) for n, topic in enumerate(TOPICS, 1)]
+    cleaned = preprocess_text("\f".join(pages)).split("\f")
+    assert len(cleaned) == 6
+    assert cleaned[0] == "Cells\nCells line alpha\nCells line beta\nCells line gamma\nCells line delta"
+    assert not any("Intro to Biology" in page or "Page" in page for page in cleaned)
+
+
+def test_few_pages_are_left_alone():
+    pages = [_page(1, "Cells"), _page(2, "Genes")]
+    assert strip_running_lines(pages) == pages
+
+
+def test_short_pages_are_never_emptied():
+    # Every line of a page this short is an edge line, and all of them repeat
+    pages = ["Slide title\nSame bullet\n3"] * 40
+    assert strip_running_lines(pages) == pages
+    assert preprocess_text("\f".join(pages))
+
+
+def test_compact_whitespace():
+    assert compact_whitespace("photo-\n  synthesis  makes\t\tsugar\n\n\n\nEnd ") == (
+        "photosynthesis makes sugar\n\nEnd"
+    )
+
+
+def test_generation_rejects_text_that_is_only_whitespace():
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(generate_flashcards_with_groq(" \f\n\f ", count=3))
+    assert error.value.status_code == 400
@@ -0,0 +1,83 @@
+import asyncio
+
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from app.core.config import settings
+from app.services import usage_meter as usage_meter_module
+from app.services.usage_meter import CACHE_MISS, GenerationUsage, UsageMeter
+
+
+class FakeSession:
+    """Stands in for a database session; fails inserts the way ``database`` says."""
+
+    def __init__(self, database):
+        self.database = database
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def execute(self, statement, rows):
+        if self.database.down:
+            raise OperationalError("INSERT", None, Exception("connection refused"))
+        if any(row["input_text"] == "bad" for row in rows):
+            raise IntegrityError("INSERT", None, Exception("foreign key violation"))
+        self.database.pending = list(rows)
+
+    async def commit(self):
+        self.database.rows.extend(self.database.pending)
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.down = False
+        self.rows = []
+        self.pending = []
+
+    def __call__(self):
+        return FakeSession(self)
+
+
+def _record(meter: UsageMeter, text: str) -> None:
+    meter.record(text, None, GenerationUsage(), 5, 1.0, CACHE_MISS, True)
+
+
+def _meter(monkeypatch, database: FakeDatabase) -> UsageMeter:
+    monkeypatch.setattr(settings, "metering_enabled", True)
+    monkeypatch.setattr(settings, "metering_batch_size", 1000)
+    monkeypatch.setattr(usage_meter_module, "AsyncSessionLocal", database)
+    return UsageMeter()
+
+
+def test_rejected_rows_are_discarded_and_the_rest_written(monkeypatch):
+    database = FakeDatabase()
+    meter = _meter(monkeypatch, database)
+    for text in ("a", "bad", "b"):
+        _record(meter, text)
+
+    assert asyncio.run(meter.flush()) == 2
+    assert [row["input_text"] for row in database.rows] == ["a", "b"]
+    assert meter.stats()["buffered"] == 0
+    assert meter.stats()["rejected"] == 1
+
+    # The bad row does not come back to fail the next flush
+    _record(meter, "c")
+    assert asyncio.run(meter.flush()) == 1
+
+
+def test_rows_are_kept_when_the_database_is_unreachable(monkeypatch):
+    database = FakeDatabase()
+    meter = _meter(monkeypatch, database)
+    for text in ("a", "b"):
+        _record(meter, text)
+
+    database.down = True
+    assert asyncio.run(meter.flush()) == 0
+    assert meter.stats()["buffered"] == 2
+    assert meter.stats()["failed_flushes"] == 1
+
+    database.down = False
+    assert asyncio.run(meter.flush()) == 2
+    assert len(database.rows) == 2